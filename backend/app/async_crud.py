@@ -0,0 +1,57 @@
+# Async DB operations (DB_ASYNC=1)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud
+from app.models import User, Question, Response
+from app.schemas import UserCreate, ResponseCreate
+from app.services.selection import answered_counts_query, blocked_question_ids_query, choose_question
+from app.services.sentiment_worker import sentiment_worker
+from app.services.directory_sync import user_fingerprint
+from app.services.org_hierarchy import update_org_closure
+from app.services.user_state import STATE_WRITE_BEHIND, state_buffer, state_change, upsert_statement
+
+# Create a new user
+async def create_user(db: AsyncSession, user: UserCreate):
+    new_user = User(**user.dict(), fingerprint=user_fingerprint(user.dict()))
+    db.add(new_user)
+    await db.commit()
+    employee_id = new_user.employee_id
+    await db.run_sync(lambda session: update_org_closure(session, [employee_id]))
+    await db.refresh(new_user)
+    return new_user
+
+# Fetch questions based on type (same order as crud.get_questions_by_type, so both give the same ETag)
+async def get_questions_by_type(db: AsyncSession, question_type: str):
+    result = await db.execute(
+        select(*Question.__table__.columns)
+        .where(Question.question_type == question_type)
+        .order_by(Question.difficulty_level, Question.question_id)
+    )
+    return result.all()
+
+# Submit a response; keyed submissions go through the same claim-and-replay path as the sync API
+async def submit_response(db: AsyncSession, response: ResponseCreate):
+    if response.idempotency_key is not None:
+        return await db.run_sync(lambda session: crud.submit_response(session, response))
+    new_response = Response(**response.dict(exclude={"idempotency_key"}))
+    db.add(new_response)
+    await db.commit()
+    await db.refresh(new_response)
+    sentiment_worker.submit(new_response.response_id, new_response.response_text)
+    return new_response
+
+# Pick the next eligible question for a user from the cached catalog
+async def pick_next_question(db: AsyncSession, questions, user_id=None):
+    if not questions or user_id is None:
+        return choose_question(questions, set(), {})
+    blocked = {row.question_id for row in await db.execute(blocked_question_ids_query(user_id))}
+    answered = {row.question_id: row.answered for row in await db.execute(answered_counts_query(user_id))}
+    return choose_question(questions, blocked, answered)
+
+# Record a defer/skip click
+async def record_state_action(db: AsyncSession, user_id, question_id, action):
+    if STATE_WRITE_BEHIND:
+        state_buffer.record(user_id, question_id, action)
+        return
+    await db.execute(upsert_statement(db), [state_change(user_id, question_id, action)])
+    await db.commit()
@@ -1,25 +1,228 @@
 # DB operations
+import uuid
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 from app.models import User, Question, Response, MLQuestionScore
-from app.schemas import UserCreate, QuestionCreate, ResponseCreate
+from app.schemas import UserCreate, QuestionCreate, ResponseCreate, ResponseBatchItem, ResponseOut, ResponseBatchItemOut
 from sqlalchemy.sql import func
+from app.services.question_index import on_question_saved
+from app.services.question_cache import question_catalog
+from app.services.sentiment_worker import sentiment_worker
+from app.services.directory_sync import user_fingerprint
+from app.services.org_hierarchy import update_org_closure
+from app.services.pagination import PAGE_SIZE, cursor_scope, keyset_page, project
+from app.services import idempotency
 
 # Create a new user
 def create_user(db: Session, user: UserCreate):
-    new_user = User(**user.dict())
+    new_user = User(**user.dict(), fingerprint=user_fingerprint(user.dict()))
     db.add(new_user)
     db.commit()
+    update_org_closure(db, [new_user.employee_id])
     db.refresh(new_user)
     return new_user
 
-# Fetch questions based on type
+# Fetch questions based on type (plain column rows, no ORM identity map or change tracking)
+# (in list order, so the catalog body and its ETag don't change between reloads)
 def get_questions_by_type(db: Session, question_type: str):
-    return db.query(Question).filter(Question.question_type == question_type).all()
+    return (
+        db.query(*Question.__table__.columns)
+        .filter(Question.question_type == question_type)
+        .order_by(Question.difficulty_level, Question.question_id)
+        .all()
+    )
+
+# One page of questions in (difficulty_level, question_id) order; served by idx_questions_difficulty,
+# or by idx_questions_category / idx_questions_type when filtering on those
+def list_questions(db: Session, category=None, question_type=None, min_difficulty=None, max_difficulty=None,
+                   fields=None, cursor=None, limit=PAGE_SIZE):
+    where = []
+    if category is not None:
+        where.append(Question.category == category)
+    if question_type is not None:
+        where.append(Question.question_type == question_type)
+    if min_difficulty is not None:
+        where.append(Question.difficulty_level >= min_difficulty)
+    if max_difficulty is not None:
+        where.append(Question.difficulty_level <= max_difficulty)
+    scope = cursor_scope(category=category, question_type=question_type,
+                         min_difficulty=min_difficulty, max_difficulty=max_difficulty)
+    return keyset_page(
+        db, project(Question.__table__.columns, fields), (Question.difficulty_level, Question.question_id),
+        where, scope, cursor, limit,
+    )
+
+# One page of responses by submitted_at (newest first unless order="asc"). Filtering on a user or
+# question seeks idx_responses_user / idx_responses_question, which end in the same sort key.
+def list_responses(db: Session, user_id=None, question_id=None, start=None, end=None, sentiment=None,
+                   fields=None, cursor=None, limit=PAGE_SIZE, order="desc"):
+    where = []
+    if user_id is not None:
+        where.append(Response.user_id == user_id)
+    if question_id is not None:
+        where.append(Response.question_id == question_id)
+    if start is not None:
+        where.append(Response.submitted_at >= start)
+    if end is not None:
+        where.append(Response.submitted_at < end)
+    if sentiment is not None:
+        where.append(Response.sentiment == sentiment)
+    scope = cursor_scope(user_id=user_id, question_id=question_id, start=start, end=end, sentiment=sentiment, order=order)
+    return keyset_page(
+        db, project(Response.__table__.columns, fields), (Response.submitted_at, Response.response_id),
+        where, scope, cursor, limit, descending=order == "desc",
+    )
+
+# Create a new question
+def create_question(db: Session, question: QuestionCreate):
+    new_question = Question(**question.dict())
+    db.add(new_question)
+    db.commit()
+    db.refresh(new_question)
+    on_question_saved(new_question)
+    question_catalog.invalidate()
+    return new_question
+
+# Edit an existing question
+def update_question(db: Session, question_id, question: QuestionCreate):
+    existing = db.query(Question).filter(Question.question_id == question_id).first()
+    if existing is None:
+        return None
+    for field, value in question.dict().items():
+        setattr(existing, field, value)
+    db.commit()
+    db.refresh(existing)
+    on_question_saved(existing)
+    question_catalog.invalidate()
+    return existing
 
 # Submit a response
 def submit_response(db: Session, response: ResponseCreate):
-    new_response = Response(**response.dict())
+    if response.idempotency_key is not None:
+        return _submit_once(db, response)
+    new_response = Response(**response.dict(exclude={"idempotency_key"}))
     db.add(new_response)
     db.commit()
     db.refresh(new_response)
-    return new_response
\ No newline at end of file
+    sentiment_worker.submit(new_response.response_id, new_response.response_text)
+    return new_response
+
+# Keyed submission: a key seen before returns its first result; a new one is stored with the response
+def _submit_once(db: Session, response: ResponseCreate):
+    key = response.idempotency_key
+    replayed = idempotency.replay(db, response)
+    if replayed is not None:
+        return replayed
+    row = {"response_id": uuid.uuid4(), **response.dict(exclude={"idempotency_key"})}
+    submitted_at = db.execute(insert(Response).values(row).returning(Response.submitted_at)).scalar_one()
+    stored = ResponseOut(**row, submitted_at=submitted_at, idempotency_key=key)
+    entry = {idempotency.scoped_key(response): (idempotency.fingerprint(response), stored.model_dump_json())}
+    if idempotency.claim(db, entry):
+        # A concurrent request with the same key won; its result is the answer
+        db.rollback()
+        return idempotency.replay(db, response)
+    db.commit()
+    idempotency.remember(entry)
+    sentiment_worker.submit(row["response_id"], row["response_text"])
+    idempotency.maybe_purge(db)
+    return stored
+
+# Rows per multi-row INSERT statement
+BATCH_INSERT_CHUNK = 1000
+
+# Submit many responses in one transaction, reporting errors per item
+def submit_responses_batch(db: Session, responses: list[ResponseBatchItem]):
+    question_ids = {r.question_id for r in responses}
+    user_ids = {r.user_id for r in responses if r.user_id is not None}
+    known_questions = {row.question_id for row in db.query(Question.question_id).filter(Question.question_id.in_(question_ids))}
+    known_users = {row.user_id for row in db.query(User.user_id).filter(User.user_id.in_(user_ids))} if user_ids else set()
+
+    results = [ResponseBatchItemOut(index=i) for i in range(len(responses))]
+    rows, row_indexes = [], []
+    for i, response in enumerate(responses):
+        if response.answer_error() is not None:
+            results[i].error = response.answer_error()
+        elif response.question_id not in known_questions:
+            results[i].error = "unknown question_id"
+        elif response.user_id is not None and response.user_id not in known_users:
+            results[i].error = "unknown user_id"
+        else:
+            rows.append({"response_id": uuid.uuid4(), **response.dict(exclude={"idempotency_key"})})
+            row_indexes.append(i)
+    rows, row_indexes, repeats = _skip_replays(db, responses, rows, row_indexes, results)
+
+    for start in range(0, len(rows), BATCH_INSERT_CHUNK):
+        chunk = rows[start:start + BATCH_INSERT_CHUNK]
+        inserted = db.execute(
+            insert(Response).values(chunk).returning(Response.response_id, Response.submitted_at)
+        ).all()
+        submitted_at = {row.response_id: row.submitted_at for row in inserted}
+        for row, i in zip(chunk, row_indexes[start:start + BATCH_INSERT_CHUNK]):
+            results[i].response_id = row["response_id"]
+            results[i].submitted_at = submitted_at.get(row["response_id"])
+    entries = {}
+    for row, i in zip(rows, row_indexes):
+        key = responses[i].idempotency_key
+        if key is not None:
+            body = ResponseOut(**row, submitted_at=results[i].submitted_at, idempotency_key=key).model_dump_json()
+            entries[idempotency.scoped_key(responses[i])] = (idempotency.fingerprint(responses[i]), body)
+    lost = idempotency.claim(db, entries)
+    if lost:
+        # Concurrent requests claimed these keys first: drop this batch's copies, report theirs
+        lost_rows = {i: row for row, i in zip(rows, row_indexes) if idempotency.scoped_key(responses[i]) in lost}
+        db.execute(delete(Response).where(Response.response_id.in_([row["response_id"] for row in lost_rows.values()])))
+        stored = idempotency.lookup(db, lost)
+        for i in lost_rows:
+            _replay_into(results[i], responses[i], stored[idempotency.scoped_key(responses[i])])
+        rows = [row for row, i in zip(rows, row_indexes) if i not in lost_rows]
+        entries = {key: entry for key, entry in entries.items() if key not in lost}
+    db.commit()
+    idempotency.remember(entries)
+    for i, first in repeats:
+        results[i] = results[first].model_copy(update={"index": i, "replayed": True})
+    idempotency.replayed(len(repeats))
+
+    for row in rows:
+        sentiment_worker.submit(row["response_id"], row["response_text"])
+    if entries:
+        idempotency.maybe_purge(db)
+    return results
+
+# Takes already-submitted items out of a batch before insert: keys used by earlier requests get their
+# stored result, a key repeated within the batch gets the first item's result (as (index, first) pairs)
+def _skip_replays(db: Session, responses, rows, row_indexes, results):
+    keys = {idempotency.scoped_key(responses[i]) for i in row_indexes} - {None}
+    if not keys:
+        return rows, row_indexes, []
+    stored = idempotency.lookup(db, keys)
+    first_index, fresh_rows, fresh_indexes, repeats = {}, [], [], []
+    for row, i in zip(rows, row_indexes):
+        key = idempotency.scoped_key(responses[i])
+        if key in stored:
+            _replay_into(results[i], responses[i], stored[key])
+            continue
+        if key is not None and key in first_index:
+            first = first_index[key]
+            try:
+                idempotency.check(responses[i], (idempotency.fingerprint(responses[first]), None))
+                repeats.append((i, first))
+            except idempotency.IdempotencyConflict as e:
+                results[i].error = str(e)
+            continue
+        if key is not None:
+            first_index[key] = i
+        fresh_rows.append(row)
+        fresh_indexes.append(i)
+    return fresh_rows, fresh_indexes, repeats
+
+def _replay_into(result, response, entry):
+    try:
+        idempotency.check(response, entry)
+    except idempotency.IdempotencyConflict as e:
+        result.error = str(e)
+        return
+    stored = ResponseOut.model_validate_json(entry[1])
+    result.response_id = stored.response_id
+    result.submitted_at = stored.submitted_at
+    result.replayed = True
+    idempotency.replayed()
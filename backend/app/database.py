@@ -1,7 +1,9 @@
 # Database connection
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
 import os
 from dotenv import load_dotenv
 
@@ -9,15 +11,69 @@ from dotenv import load_dotenv
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+# Optional async engine alongside the sync one (DB_ASYNC=1)
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def engine_options(url):
+    options = {"pool_pre_ping": True, "query_cache_size": DB_STATEMENT_CACHE_SIZE}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+def async_database_url(url):
+    url = make_url(url)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    if url.drivername == "postgresql+asyncpg" and "prepared_statement_cache_size" not in url.query:
+        url = url.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+    return url
+
 # Database engine & session
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(DATABASE_URL))
+    AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Dependency for DB session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency for async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# INSERT with ON CONFLICT support for the session's dialect (Postgres, or SQLite locally)
+def dialect_insert(db, model):
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+# The DB clock as a naive timestamp, like the TIMESTAMP columns it gets compared with
+# (Postgres returns now() as timestamptz in the session time zone, SQLite as naive UTC)
+def db_now(db):
+    return db.query(func.now()).scalar().replace(tzinfo=None)
@@ -1,17 +1,87 @@
 # Entry point
+import os
+import threading
 from fastapi import FastAPI
-from app.database import engine, Base
-from app.routes import users, questions, responses
+from app.database import engine, async_engine, Base, DB_ASYNC, SessionLocal
+from app.routes import users, questions, responses, insights, metrics, prompts
+from app.services.sentiment_worker import sentiment_worker
+from app.services.user_state import STATE_WRITE_BEHIND, state_buffer
+from app.services.ml import warm_up
+from app.services.ml_executor import ml_executor
+from app.services.question_index import index_saver
+from app.services.rollups import rollup_job
+from app.services.comment_clusters import cluster_job
+from app.services.partitions import partition_job
+from app.services.prompt_scheduler import prompt_scheduler
+from app.services.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, profiler
 
-# Initialize DB schema
-Base.metadata.create_all(bind=engine)
+# Schema creation is opt-in (database/schema.sql is the source of truth)
+DB_CREATE_SCHEMA = os.getenv("DB_CREATE_SCHEMA", "0") == "1"
+# Load the sentiment lexicon and question index in the background after startup
+ML_WARMUP = os.getenv("ML_WARMUP", "0") == "1"
 
 app = FastAPI(title="PulseBot API")
 
+# Prometheus metrics on by default (METRICS_ENABLED=0 turns the middleware and SQL hooks off)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "sync")
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine, "async")
+
 # Include routers
+if DB_ASYNC:
+    from app.routes import async_api
+
+    # Async handlers win for the hot paths; everything else falls through to the sync routers
+    app.include_router(async_api.users_router, prefix="/users", tags=["Users"])
+    app.include_router(async_api.questions_router, prefix="/questions", tags=["Questions"])
+    app.include_router(async_api.responses_router, prefix="/responses", tags=["Responses"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(questions.router, prefix="/questions", tags=["Questions"])
 app.include_router(responses.router, prefix="/responses", tags=["Responses"])
+app.include_router(insights.router, prefix="/insights", tags=["Insights"])
+app.include_router(prompts.router, prefix="/prompts", tags=["Prompts"])
+if METRICS_ENABLED:
+    app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+
+@app.on_event("startup")
+def init_schema():
+    if DB_CREATE_SCHEMA:
+        Base.metadata.create_all(bind=engine)
+
+def warm_up_models():
+    db = SessionLocal()
+    try:
+        warm_up(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_background_workers():
+    if ML_WARMUP:
+        threading.Thread(target=warm_up_models, name="ml-warmup", daemon=True).start()
+    ml_executor.start()
+    sentiment_worker.start()
+    if STATE_WRITE_BEHIND:
+        state_buffer.start()
+    rollup_job.start()
+    cluster_job.start()
+    partition_job.start()
+    prompt_scheduler.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    sentiment_worker.stop()
+    ml_executor.stop()
+    index_saver.flush()
+    if STATE_WRITE_BEHIND:
+        state_buffer.stop()
+    rollup_job.stop()
+    cluster_job.stop()
+    partition_job.stop()
+    prompt_scheduler.stop()
+    profiler.stop()
 
 @app.get("/")
 def health_check():
@@ -1,5 +1,7 @@
 # SQLAlchemy models
-from sqlalchemy import Column, String, Text, Integer, Boolean, ForeignKey, TIMESTAMP, Float
+from sqlalchemy import (
+    Column, String, Text, Integer, Boolean, ForeignKey, TIMESTAMP, Float, Index, Date, LargeBinary, PrimaryKeyConstraint,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -21,6 +23,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     email_hash = Column(String, unique=True, nullable=False)
     created_at = Column(TIMESTAMP, default=func.now())
+    fingerprint = Column(String)  # hash of the directory fields, maintained by /users/sync
 
 # Question Model
 class Question(Base):
@@ -32,6 +35,13 @@ class Question(Base):
     difficulty_level = Column(Integer, nullable=False)
     last_used_at = Column(TIMESTAMP, default=None)
 
+    # Filter column(s) first, then the list endpoint's sort key (difficulty_level, question_id)
+    __table_args__ = (
+        Index("idx_questions_category", "category", "difficulty_level", "question_id"),
+        Index("idx_questions_type", "question_type", "difficulty_level", "question_id"),
+        Index("idx_questions_difficulty", "difficulty_level", "question_id"),
+    )
+
 # Response Model
 class Response(Base):
     __tablename__ = "responses"
@@ -43,6 +53,30 @@ class Response(Base):
     response_radio = Column(Text, nullable=True)
     sentiment = Column(String, nullable=True)
     submitted_at = Column(TIMESTAMP, default=func.now())
+    sentiment_scored_at = Column(TIMESTAMP, nullable=True)  # when sentiment was set; rollups fold labels by it
+
+    # The first three end in (submitted_at, response_id), the keyset order of listings and exports;
+    # the last one finds newly scored rows for the rollups
+    __table_args__ = (
+        Index("idx_responses_user", "user_id", "submitted_at", "response_id"),
+        Index("idx_responses_question", "question_id", "submitted_at", "response_id"),
+        Index("idx_responses_submitted_at", "submitted_at", "response_id"),
+        Index("idx_responses_sentiment_scored_at", "sentiment_scored_at"),
+    )
+
+# Per-user defer/skip state, one row per (user, question)
+class UserQuestionState(Base):
+    __tablename__ = "user_question_state"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.question_id", ondelete="CASCADE"), primary_key=True)
+    defer_count = Column(Integer, nullable=False, default=0)
+    skipped = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(TIMESTAMP, default=func.now())
+
+    # The primary key index also carries the state, so selection reads it without touching the table
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "question_id", postgresql_include=["defer_count", "skipped"]),
+    )
 
 # ML Question Scores Model
 class MLQuestionScore(Base):
@@ -51,4 +85,138 @@ class MLQuestionScore(Base):
     question_id = Column(UUID(as_uuid=True), ForeignKey("questions.question_id"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=False)
     relevance_score = Column(Float, nullable=False)
-    updated_at = Column(TIMESTAMP, default=func.now())
\ No newline at end of file
+    updated_at = Column(TIMESTAMP, default=func.now())
+
+    __table_args__ = (
+        Index("idx_ml_scores", "user_id", "question_id", unique=True),
+        Index("idx_ml_scores_rank", "user_id", relevance_score.desc()),
+    )
+
+# When batch scoring last ranked each user, including users none of whose feedback matched a question
+class MLUserWatermark(Base):
+    __tablename__ = "ml_user_watermarks"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    scored_at = Column(TIMESTAMP, nullable=False)
+
+# Daily response rollup per question and org slice (department, band, direct manager)
+class ResponseRollup(Base):
+    __tablename__ = "response_rollups"
+    day = Column(Date, primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.question_id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String, primary_key=True)
+    department = Column(String, primary_key=True)
+    band = Column(String, primary_key=True)
+    manager_id = Column(String, primary_key=True)
+    response_count = Column(Integer, nullable=False, default=0)
+    emoji_count = Column(Integer, nullable=False, default=0)
+    emoji_sum = Column(Integer, nullable=False, default=0)
+    emoji_1 = Column(Integer, nullable=False, default=0)
+    emoji_2 = Column(Integer, nullable=False, default=0)
+    emoji_3 = Column(Integer, nullable=False, default=0)
+    emoji_4 = Column(Integer, nullable=False, default=0)
+    emoji_5 = Column(Integer, nullable=False, default=0)
+    sentiment_positive = Column(Integer, nullable=False, default=0)
+    sentiment_neutral = Column(Integer, nullable=False, default=0)
+    sentiment_negative = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_response_rollups_question", "question_id", "day"),
+        Index("idx_response_rollups_department", "department", "day"),
+        Index("idx_response_rollups_manager", "manager_id", "day"),
+    )
+
+# Radio option tallies, same keys as ResponseRollup plus the option
+class ResponseRadioRollup(Base):
+    __tablename__ = "response_radio_rollups"
+    day = Column(Date, primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.question_id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String, primary_key=True)
+    department = Column(String, primary_key=True)
+    band = Column(String, primary_key=True)
+    manager_id = Column(String, primary_key=True)
+    option = Column(String, primary_key=True)
+    response_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_response_radio_rollups_manager", "manager_id", "day"),
+    )
+
+# Manager hierarchy closure over employee ids: one row per (ancestor, descendant) path,
+# each employee being its own ancestor at depth 0; maintained by services/org_hierarchy.py
+class OrgClosure(Base):
+    __tablename__ = "org_closure"
+    ancestor_id = Column(String, primary_key=True)
+    descendant_id = Column(String, primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("idx_org_closure_descendant", "descendant_id", "depth"),
+    )
+
+# Comment clusters per question (services/comment_clusters.py); the representative's MinHash
+# signature is kept so the LSH index can be rebuilt from this table after a restart
+class CommentCluster(Base):
+    __tablename__ = "comment_clusters"
+    cluster_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.question_id", ondelete="CASCADE"), nullable=False)
+    representative_id = Column(UUID(as_uuid=True), nullable=False)
+    representative_text = Column(Text, nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False, default=0)
+    created_at = Column(TIMESTAMP, default=func.now())
+
+    __table_args__ = (
+        Index("idx_comment_clusters_question", "question_id", "size"),
+    )
+
+# Cluster membership per comment; response ids aren't foreign keys so members are written in bulk
+# without touching responses, and archived responses don't block anything
+class CommentClusterMember(Base):
+    __tablename__ = "comment_cluster_members"
+    response_id = Column(UUID(as_uuid=True), primary_key=True)
+    cluster_id = Column(UUID(as_uuid=True), ForeignKey("comment_clusters.cluster_id", ondelete="CASCADE"), nullable=False)
+    similarity = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("idx_comment_cluster_members_cluster", "cluster_id", "similarity"),
+    )
+
+# Pulse campaigns: one question pushed to every connected user (optionally one department) at
+# send_rate prompts per second until ends_at; services/prompt_scheduler.py sends them
+class PromptCampaign(Base):
+    __tablename__ = "prompt_campaigns"
+    campaign_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.question_id", ondelete="CASCADE"), nullable=False)
+    department = Column(String, nullable=True)
+    send_rate = Column(Float, nullable=False)
+    status = Column(String, nullable=False, default="active")  # active, stopped
+    sent_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(TIMESTAMP, default=func.now())
+    ends_at = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index("idx_prompt_campaigns_active", "status", "ends_at"),
+    )
+
+# Who already got a campaign's prompt; the primary key makes each delivery claimable exactly once
+class PromptCampaignDelivery(Base):
+    __tablename__ = "prompt_campaign_deliveries"
+    campaign_id = Column(UUID(as_uuid=True), ForeignKey("prompt_campaigns.campaign_id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    delivered_at = Column(TIMESTAMP, default=func.now())
+
+# Idempotency keys of submitted responses -> the ResponseOut JSON first returned, replayed on retries
+class ResponseIdempotency(Base):
+    __tablename__ = "response_idempotency"
+    idempotency_key = Column(String, primary_key=True)  # scoped: "<user_id>:<client key>"
+    fingerprint = Column(String, nullable=False)  # hash of the submitted answer
+    response = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP, default=func.now())
+
+    __table_args__ = (Index("idx_response_idempotency_created_at", "created_at"),)
+
+# High-water marks for incremental jobs
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+    job_name = Column(String, primary_key=True)
+    watermark = Column(TIMESTAMP, nullable=False)
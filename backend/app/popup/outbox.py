@@ -0,0 +1,170 @@
+# Durable local outbox for answers and defer/skip clicks, flushed to the API in batches
+import json
+import os
+import sqlite3
+import threading
+import time
+import requests
+
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(os.path.expanduser("~"), ".pulsebot", "outbox.db"))
+OUTBOX_FLUSH_SECONDS = float(os.getenv("OUTBOX_FLUSH_SECONDS", "5"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "300"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# Outbox kind -> batch endpoint
+ENDPOINTS = {"response": "/responses/batch", "state": "/responses/update_state/batch"}
+
+
+class Outbox:
+    """SQLite queue of pending API writes; entries survive restarts until the server accepts them."""
+
+    def __init__(self, path=OUTBOX_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        # Entries the server rejected for good, kept for inspection instead of being thrown away
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            "id INTEGER PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, created_at REAL NOT NULL, "
+            "error TEXT NOT NULL, failed_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def put(self, kind, payload):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (kind, payload, created_at) VALUES (?, ?, ?)",
+                (kind, json.dumps(payload), time.time()),
+            )
+
+    def peek(self, kind, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM outbox WHERE kind = ? ORDER BY id LIMIT ?", (kind, limit)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def delete(self, ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in ids])
+
+    # Moves entries to the dead-letter table, each with the server's reason
+    def bury(self, failures):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row_id, error in failures:
+                    self._conn.execute(
+                        "INSERT INTO dead_letter (id, kind, payload, created_at, error, failed_at) "
+                        "SELECT id, kind, payload, created_at, ?, ? FROM outbox WHERE id = ?",
+                        (error, time.time(), row_id),
+                    )
+                    self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def dead_letters(self, limit=100):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, error FROM dead_letter ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, kind, json.loads(payload), error) for row_id, kind, payload, error in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+
+class OutboxFlusher:
+    """Background thread that drains the outbox in batches, backing off while the API is unreachable."""
+
+    def __init__(self, outbox, session, api_url, flush_seconds=OUTBOX_FLUSH_SECONDS, batch_size=OUTBOX_BATCH_SIZE):
+        self.outbox = outbox
+        self.session = session
+        self.api_url = api_url
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.backoff = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Sends at most one batch per kind; returns how many entries left the outbox
+    def flush_once(self):
+        sent = 0
+        for kind, path in ENDPOINTS.items():
+            entries = self.outbox.peek(kind, self.batch_size)
+            if entries:
+                sent += self._send(kind, path, entries)
+        return sent
+
+    # Raises (entries stay queued) while the server can't take them: unavailable, overloaded, or
+    # without the endpoint (404/405, e.g. an older API). A batch rejected as a whole is split until
+    # the rejected entries are isolated; those, and items the server reports as failed, are moved
+    # to the dead-letter table.
+    def _send(self, kind, path, entries):
+        response = self.session.post(
+            f"{self.api_url}{path}", json=[payload for _, payload in entries], timeout=HTTP_TIMEOUT
+        )
+        if response.status_code >= 500 or response.status_code in (404, 405, 408, 429):
+            response.raise_for_status()
+        if response.status_code >= 400:
+            if len(entries) > 1:
+                middle = len(entries) // 2
+                return self._send(kind, path, entries[:middle]) + self._send(kind, path, entries[middle:])
+            error = f"{response.status_code} {response.text[:500]}"
+            print(f"❌ Queued {kind} entry rejected, moved to dead letters: {error[:200]}")
+            self.outbox.bury([(entries[0][0], error)])
+            return 1
+        failures = []
+        if kind == "response":
+            failures = [
+                (entries[result["index"]][0], result["error"]) for result in response.json()["results"] if result["error"]
+            ]
+            for _, error in failures:
+                print(f"❌ Queued response rejected, moved to dead letters: {error}")
+        if failures:
+            self.outbox.bury(failures)
+        failed = {row_id for row_id, _ in failures}
+        self.outbox.delete([row_id for row_id, _ in entries if row_id not in failed])
+        return len(entries)
+
+    # Flush soon instead of waiting for the next interval (unless backing off)
+    def wake(self):
+        if not self.backoff:
+            self._wake.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Keep going while full batches are coming out
+                while self.flush_once() >= self.batch_size:
+                    pass
+                self.backoff = 0.0
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.backoff = min(OUTBOX_MAX_BACKOFF_SECONDS, max(self.flush_seconds, self.backoff * 2))
+                print(f"⚠️ Outbox flush failed ({len(self.outbox)} pending), retrying in {self.backoff:.0f}s: {e}")
+            self._wake.wait(self.backoff or self.flush_seconds)
+            self._wake.clear()
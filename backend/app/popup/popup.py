@@ -2,78 +2,193 @@
 import tkinter as tk
 from tkinter import messagebox
 import requests
+from requests.adapters import HTTPAdapter
+import json
 import threading
 import time
-import random
+import uuid
+from collections import deque
 from dotenv import load_dotenv
 import os
 import sys
+from outbox import HTTP_TIMEOUT, Outbox, OutboxFlusher
 
 # Load environment variables
 load_dotenv()
 
 API_URL = os.getenv("API_URL", "http://localhost:8000")
+USER_ID = os.getenv("USER_ID")
 FEEDBACK_INTERVAL = 10
+PREFETCH_SIZE = int(os.getenv("PREFETCH_SIZE", "3"))
+# Take prompts pushed by the server over /prompts/stream; the timer below is only the fallback
+# for servers without the prompt scheduler
+PROMPT_STREAM = os.getenv("PROMPT_STREAM", "1") == "1"
+# Longer than the server's heartbeat interval, so a silently dead connection is noticed
+PROMPT_STREAM_READ_TIMEOUT = float(os.getenv("PROMPT_STREAM_READ_TIMEOUT", "90"))
+PROMPT_STREAM_MAX_BACKOFF = float(os.getenv("PROMPT_STREAM_MAX_BACKOFF", "300"))
 QUESTION_TYPE_CYCLE = ["comment", "emoji", "radio"]
 popup_active = False
 current_question_type_index = 0
 
+# One keep-alive connection pool shared by the popup, prefetcher and outbox flusher
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+outbox = Outbox()
+outbox_flusher = OutboxFlusher(outbox, session, API_URL)
+
 # --- API Interaction Functions ---
 def fetch_random_question(question_type):
     try:
-        response = requests.get(f"{API_URL}/questions/{question_type}")
+        params = {"user_id": USER_ID} if USER_ID else {}
+        response = session.get(f"{API_URL}/questions/{question_type}/next", params=params, timeout=HTTP_TIMEOUT)
+        if response.status_code == 404:
+            return None
         response.raise_for_status()
-        questions = response.json()
-
-        filtered_questions = [q for q in questions if not q.get("skipped", False) and q.get("defer_count", 0) < 3]
-        return random.choice(filtered_questions) if filtered_questions else None
+        return response.json()
 
     except requests.exceptions.RequestException as e:
         print(f"❌ Error fetching question: {e}")
         return None
 
-def submit_feedback(question_id, user_id, response_text=None, response_emoji=None, response_radio=None):
-    try:
-        payload = {
-            "question_id": question_id,
-            "user_id": user_id,
-            "response_text": response_text,
-            "response_emoji": response_emoji,
-            "response_radio": response_radio
-        }
-        response = requests.post(f"{API_URL}/responses/", json=payload)
-        response.raise_for_status()
-        print("✅ Feedback submitted successfully!")
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error sending feedback: {e}")
+
+class QuestionPrefetcher:
+    """Keeps a few upcoming questions per type ready so the popup never waits on the network."""
+
+    def __init__(self, size=PREFETCH_SIZE):
+        self.size = size
+        self.queues = {question_type: deque() for question_type in QUESTION_TYPE_CYCLE}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def get(self, question_type):
+        with self._lock:
+            queue = self.queues[question_type]
+            question = queue.popleft() if queue else None
+        self._wake.set()
+        return question or fetch_random_question(question_type)
+
+    # Answered/deferred/skipped questions must not come back out of the queue
+    def discard(self, question_id):
+        with self._lock:
+            for question_type, queue in self.queues.items():
+                self.queues[question_type] = deque(q for q in queue if q["question_id"] != question_id)
+        self._wake.set()
+
+    def fill(self):
+        for question_type, queue in self.queues.items():
+            # A few extra attempts, since the server may hand back a question that is already queued
+            for _ in range(self.size * 2):
+                if len(queue) >= self.size:
+                    break
+                question = fetch_random_question(question_type)
+                if question is None:
+                    break
+                with self._lock:
+                    queue = self.queues[question_type]
+                    if all(q["question_id"] != question["question_id"] for q in queue):
+                        queue.append(question)
+
+    def run(self):
+        while True:
+            self.fill()
+            self._wake.wait(FEEDBACK_INTERVAL)
+            self._wake.clear()
+
+
+prefetcher = QuestionPrefetcher()
+
+
+class PromptListener:
+    """Holds the /prompts/stream connection and hands pushed questions to the Tk thread; reconnects
+    with backoff, and switches to the local timer if the server has no prompt scheduler."""
+
+    def __init__(self, on_prompt, on_unavailable):
+        self.on_prompt = on_prompt
+        self.on_unavailable = on_unavailable
+        self.pending = None
+
+    def run(self):
+        backoff = 1
+        while True:
+            try:
+                with session.get(
+                    f"{API_URL}/prompts/stream", params={"user_id": USER_ID}, stream=True,
+                    timeout=(HTTP_TIMEOUT, PROMPT_STREAM_READ_TIMEOUT),
+                ) as response:
+                    if response.status_code in (404, 503):
+                        print("ℹ️ Server does not push prompts, using the local timer.")
+                        self.on_unavailable()
+                        return
+                    response.raise_for_status()
+                    backoff = 1
+                    self.read_events(response)
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Prompt stream dropped: {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, PROMPT_STREAM_MAX_BACKOFF)
+
+    def read_events(self, response):
+        event, data = None, []
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "event":
+                    event = value
+                elif field == "data":
+                    data.append(value)
+                continue
+            if event == "prompt" and data:
+                self.pending = json.loads("\n".join(data))["question"]
+                self.on_prompt()
+            event, data = None, []
+
+# Answers and state changes go to the local outbox; the flusher delivers them in batches. The
+# idempotency key makes re-sends (and a second Submit click on the same prompt) land only once.
+def submit_feedback(question_id, user_id, response_text=None, response_emoji=None, response_radio=None,
+                    idempotency_key=None):
+    payload = {
+        "question_id": question_id,
+        "user_id": user_id,
+        "response_text": response_text,
+        "response_emoji": response_emoji,
+        "response_radio": response_radio,
+        "idempotency_key": idempotency_key or str(uuid.uuid4())
+    }
+    outbox.put("response", payload)
+    prefetcher.discard(question_id)
+    outbox_flusher.wake()
+    print("✅ Feedback queued for submission!")
 
 def update_response_state(question_id, action):
-    """Update defer/skip state in the database."""
-    try:
-        url = f"{API_URL}/responses/update_state"
-        payload = {"question_id": question_id, "action": action}
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        print(f"🔄 Updated response state: {action}")
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Failed to update state: {e}")
+    """Queue a defer/skip state update for the database."""
+    if not USER_ID:
+        print(f"⚠️ USER_ID not set, {action} not recorded.")
+        return
+    outbox.put("state", {"user_id": USER_ID, "question_id": question_id, "action": action})
+    prefetcher.discard(question_id)
+    outbox_flusher.wake()
+    print(f"🔄 Queued response state: {action}")
 
 # --- Popup Window Functions ---
-def show_popup():
+def show_popup(question=None):
     global popup_active, current_question_type_index, selected_emoji_value, selected_radio_value
 
     if popup_active:
         return
 
-    question_type = QUESTION_TYPE_CYCLE[current_question_type_index]
-    current_question_type_index = (current_question_type_index + 1) % len(QUESTION_TYPE_CYCLE)
-
-    question = fetch_random_question(question_type)
+    if question is None:
+        question_type = QUESTION_TYPE_CYCLE[current_question_type_index]
+        current_question_type_index = (current_question_type_index + 1) % len(QUESTION_TYPE_CYCLE)
+        question = prefetcher.get(question_type)
     if not question:
         print("⚠️ No suitable questions available.")
         return
 
     popup_active = True
+    # One key per shown prompt: however often Submit fires, the server keeps one answer
+    answer_key = str(uuid.uuid4())
     popup = tk.Tk()
     popup.title("PulseBot Feedback")
     tk.Label(popup, text=question["question_text"], wraplength=400, font=("Arial", 14)).pack(padx=10, pady=10)
@@ -86,7 +201,7 @@ def show_popup():
         def submit_comment():
             response_text = input_box.get("1.0", tk.END).strip()
             if response_text:
-                submit_feedback(question["question_id"], None, response_text=response_text)
+                submit_feedback(question["question_id"], USER_ID, response_text=response_text, idempotency_key=answer_key)
                 close_popup()
 
         # 🆗 Buttons in Correct Order
@@ -112,7 +227,7 @@ def show_popup():
 
         def submit_emoji():
             if selected_emoji_value:
-                submit_feedback(question["question_id"], None, response_emoji=int(selected_emoji_value))
+                submit_feedback(question["question_id"], USER_ID, response_emoji=int(selected_emoji_value), idempotency_key=answer_key)
                 close_popup()
             else:
                 messagebox.showwarning("Input Required", "Please select an emoji.")
@@ -140,7 +255,7 @@ def show_popup():
 
         def submit_radio():
             if selected_radio_value:
-                submit_feedback(question["question_id"], None, response_radio=selected_radio_value)
+                submit_feedback(question["question_id"], USER_ID, response_radio=selected_radio_value, idempotency_key=answer_key)
                 close_popup()
             else:
                 messagebox.showwarning("Input Required", "Please select an option.")
@@ -166,7 +281,8 @@ def show_popup():
         global popup_active
         popup_active = False
         popup.destroy()
-        threading.Thread(target=start_feedback_timer, daemon=True).start()
+        if not streaming:
+            threading.Thread(target=start_feedback_timer, daemon=True).start()
 
     popup.mainloop()
 
@@ -178,11 +294,34 @@ def start_feedback_timer():
         root.event_generate("<<ShowPopup>>", when="tail")
 
 
+def start_timer_mode():
+    global streaming
+    streaming = False
+    threading.Thread(target=prefetcher.run, name="question-prefetch", daemon=True).start()
+    threading.Thread(target=start_feedback_timer, daemon=True).start()
+
+# A prompt that arrives while a popup is open is dropped; the server paces the next one
+def show_pushed_prompt():
+    question, prompt_listener.pending = prompt_listener.pending, None
+    if question is not None:
+        show_popup(question)
+
+
 root = tk.Tk()
 root.withdraw()
 root.bind("<<ShowPopup>>", lambda e: show_popup())
-
-threading.Thread(target=start_feedback_timer, daemon=True).start()
-
-print(f"PulseBot popup running (interval starts after submission: {FEEDBACK_INTERVAL} seconds)...")
+root.bind("<<PromptPushed>>", lambda e: show_pushed_prompt())
+
+outbox_flusher.start()
+streaming = bool(PROMPT_STREAM and USER_ID)
+prompt_listener = PromptListener(
+    on_prompt=lambda: root.event_generate("<<PromptPushed>>", when="tail"),
+    on_unavailable=start_timer_mode,
+)
+if streaming:
+    threading.Thread(target=prompt_listener.run, name="prompt-stream", daemon=True).start()
+    print("PulseBot popup running (prompts pushed by the server)...")
+else:
+    start_timer_mode()
+    print(f"PulseBot popup running (interval starts after submission: {FEEDBACK_INTERVAL} seconds)...")
 root.mainloop()
\ No newline at end of file
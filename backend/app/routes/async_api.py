@@ -0,0 +1,55 @@
+# Async versions of the hot endpoints (DB_ASYNC=1); registered ahead of the sync routers
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models import Question, User
+from app.schemas import UserCreate, UserOut, QuestionOut, ResponseCreate, ResponseOut, StateUpdateOut
+from app import async_crud
+from app.routes.responses import StateUpdateRequest
+from app.services.idempotency import IdempotencyConflict
+from app.services.question_cache import question_catalog, etag_matches
+from app.services.user_state import STATE_ACTIONS
+
+users_router = APIRouter()
+questions_router = APIRouter()
+responses_router = APIRouter()
+
+@users_router.post("/", response_model=UserOut)
+async def add_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_user(db, user)
+
+@questions_router.get("/{question_type}", response_model=List[QuestionOut])
+async def get_questions(question_type: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    entry = await question_catalog.aget(question_type, lambda: async_crud.get_questions_by_type(db, question_type))
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+@questions_router.get("/{question_type}/next", response_model=QuestionOut)
+async def get_next_question(question_type: str, user_id: Optional[UUID] = None, db: AsyncSession = Depends(get_async_db)):
+    entry = await question_catalog.aget(question_type, lambda: async_crud.get_questions_by_type(db, question_type))
+    question = await async_crud.pick_next_question(db, entry.questions, user_id)
+    if question is None:
+        raise HTTPException(status_code=404, detail="No eligible question")
+    return question
+
+@responses_router.post("/", response_model=ResponseOut)
+async def add_response(response: ResponseCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await async_crud.submit_response(db, response)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@responses_router.post("/update_state", response_model=StateUpdateOut)
+async def update_response_state(request: StateUpdateRequest, db: AsyncSession = Depends(get_async_db)):
+    if request.action not in STATE_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"action must be one of {', '.join(STATE_ACTIONS)}")
+    if await db.get(User, request.user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if await db.get(Question, request.question_id) is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    await async_crud.record_state_action(db, request.user_id, request.question_id, request.action)
+    return {"status": "success", "action": request.action}
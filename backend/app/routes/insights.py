@@ -0,0 +1,46 @@
+# Dashboard insight endpoints (served from rollup tables)
+from datetime import date
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.schemas import CommentClusterOut, InsightOut
+from app.services.comment_clusters import top_clusters
+from app.services.rollups import INSIGHT_GROUPS, query_insights
+
+router = APIRouter()
+
+@router.get("/", response_model=List[InsightOut])
+def get_insights(
+    group_by: Optional[str] = Query(None, description="Comma-separated: " + ", ".join(INSIGHT_GROUPS)),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    question_id: Optional[UUID] = None,
+    category: Optional[str] = None,
+    department: Optional[str] = None,
+    band: Optional[str] = None,
+    manager_id: Optional[str] = None,
+    manager_subtree: Optional[str] = Query(None, description="Employee id; includes their whole reporting line"),
+    db: Session = Depends(get_db),
+):
+    groups = [name.strip() for name in group_by.split(",") if name.strip()] if group_by else []
+    unknown = [name for name in groups if name not in INSIGHT_GROUPS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot group by {', '.join(unknown)}")
+    return query_insights(
+        db, groups, start, end,
+        question_id=question_id, category=category, department=department, band=band, manager_id=manager_id,
+        manager_subtree=manager_subtree,
+    )
+
+# Recurring themes in a comment question's answers (filled by the comment clustering job)
+@router.get("/clusters", response_model=List[CommentClusterOut])
+def get_comment_clusters(
+    question_id: UUID,
+    limit: int = Query(10, ge=1, le=100),
+    examples: int = Query(3, ge=0, le=20, description="Closest comments returned per cluster"),
+    min_size: int = Query(2, ge=1),
+    db: Session = Depends(get_db),
+):
+    return top_clusters(db, question_id, limit, examples, min_size)
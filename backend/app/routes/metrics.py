@@ -0,0 +1,35 @@
+# Prometheus scrape endpoint and the opt-in sampling profiler
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from app.services.metrics import CONTENT_TYPE, METRICS_PROFILER, profiler, registry
+
+router = APIRouter()
+
+@router.get("")
+def get_metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+# Profiler controls are only served when METRICS_PROFILER=1
+def require_profiler():
+    if not METRICS_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler disabled (set METRICS_PROFILER=1)")
+
+@router.post("/profile/start")
+def start_profiler(interval: Optional[float] = None):
+    require_profiler()
+    profiler.start(interval)
+    return profiler.stats()
+
+@router.post("/profile/stop")
+def stop_profiler():
+    require_profiler()
+    profiler.stop()
+    return profiler.stats()
+
+# Collapsed stacks, ready for flamegraph.pl / speedscope
+@router.get("/profile", response_class=PlainTextResponse)
+def get_profile():
+    require_profiler()
+    return profiler.collapsed()
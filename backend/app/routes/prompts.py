@@ -0,0 +1,45 @@
+# Server-pushed prompts (SSE) and pulse campaigns
+from typing import List
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import PromptCampaign, Question
+from app.schemas import CampaignCreate, CampaignOut, PromptStatsOut
+from app.services.prompt_scheduler import create_campaign, prompt_scheduler, stop_campaign
+
+router = APIRouter()
+
+# One long-lived event stream per popup: "prompt" events carry the question to show, comment
+# lines keep proxies from closing the idle connection. No database work per connection.
+@router.get("/stream")
+async def prompt_stream(user_id: UUID):
+    if not prompt_scheduler.enabled:
+        raise HTTPException(status_code=503, detail="Prompt scheduler is disabled")
+    return StreamingResponse(
+        prompt_scheduler.stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stats", response_model=PromptStatsOut)
+def get_prompt_stats():
+    return prompt_scheduler.stats()
+
+@router.post("/campaigns", response_model=CampaignOut)
+def add_campaign(campaign: CampaignCreate, db: Session = Depends(get_db)):
+    if db.get(Question, campaign.question_id) is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return create_campaign(db, campaign.question_id, campaign.send_rate, campaign.department, campaign.ends_at)
+
+@router.get("/campaigns", response_model=List[CampaignOut])
+def list_campaigns(db: Session = Depends(get_db)):
+    return db.query(PromptCampaign).order_by(PromptCampaign.created_at.desc()).all()
+
+@router.post("/campaigns/{campaign_id}/stop", response_model=CampaignOut)
+def end_campaign(campaign_id: UUID, db: Session = Depends(get_db)):
+    campaign = stop_campaign(db, campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
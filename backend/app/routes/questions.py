@@ -1,11 +1,61 @@
 # Question endpoints
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.crud import get_questions_by_type
+from app.schemas import Page, QuestionCreate, QuestionOut
+from app.crud import get_questions_by_type, create_question, update_question, list_questions
+from app.services.pagination import MAX_PAGE_SIZE, PAGE_SIZE
+from app.services.question_cache import dumps, question_catalog, etag_matches
+from app.services.selection import pick_next_question
 
 router = APIRouter()
 
-@router.get("/{question_type}")
-def get_questions(question_type: str, db: Session = Depends(get_db)):
-    return get_questions_by_type(db, question_type)
\ No newline at end of file
+# Paged listing: pass the returned next_cursor back to get the following page (null on the last one);
+# fields=question_id,question_text limits the columns returned
+@router.get("/", response_model=Page)
+def list_all_questions(
+    category: Optional[str] = None,
+    question_type: Optional[str] = None,
+    min_difficulty: Optional[int] = Query(None, ge=1, le=5),
+    max_difficulty: Optional[int] = Query(None, ge=1, le=5),
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    try:
+        page = list_questions(db, category, question_type, min_difficulty, max_difficulty, fields, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=dumps(page), media_type="application/json")
+
+# Served from the in-process catalog cache; unchanged client copies get 304
+@router.get("/{question_type}", response_model=List[QuestionOut])
+def get_questions(question_type: str, request: Request, db: Session = Depends(get_db)):
+    entry = question_catalog.get(question_type, lambda: get_questions_by_type(db, question_type))
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+# Exactly one eligible question, sampled on the server
+@router.get("/{question_type}/next", response_model=QuestionOut)
+def get_next_question(question_type: str, user_id: Optional[UUID] = None, db: Session = Depends(get_db)):
+    entry = question_catalog.get(question_type, lambda: get_questions_by_type(db, question_type))
+    question = pick_next_question(db, entry.questions, user_id)
+    if question is None:
+        raise HTTPException(status_code=404, detail="No eligible question")
+    return question
+
+@router.post("/", response_model=QuestionOut)
+def add_question(question: QuestionCreate, db: Session = Depends(get_db)):
+    return create_question(db, question)
+
+@router.put("/{question_id}", response_model=QuestionOut)
+def edit_question(question_id: UUID, question: QuestionCreate, db: Session = Depends(get_db)):
+    updated = update_question(db, question_id, question)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return updated
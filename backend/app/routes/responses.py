@@ -1,38 +1,160 @@
 # Feedback endpoints
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.database import get_db
-from app.schemas import ResponseCreate
-from app.crud import submit_response
+from uuid import UUID
+from app.database import engine, get_db
+from app.models import Question, User
+from app.schemas import (
+    Page, ResponseCreate, ResponseBatchItem, ResponseOut, ResponseBatchOut, SearchPage, SentimentStatsOut, StateBatchOut,
+    StateUpdateOut,
+)
+from app.crud import list_responses, submit_response, submit_responses_batch
+from app.services.idempotency import IdempotencyConflict
+from app.services.pagination import MAX_PAGE_SIZE, PAGE_SIZE
+from app.services.search import SEARCH_SORTS, search_responses
+from app.services.question_cache import dumps
+from app.services.sentiment_worker import sentiment_worker
+from app.services.user_state import STATE_ACTIONS, record_state_action, record_state_actions
+from app.services.export import EXPORT_FORMATS, EXPORT_WRITERS, export_statement, iter_batches
 from pydantic import BaseModel
 
 router = APIRouter()
 
-# Existing endpoint: Add response
-@router.post("/")
+# Existing endpoint: Add response. Safe to retry when the body carries an idempotency_key.
+@router.post("/", response_model=ResponseOut)
 def add_response(response: ResponseCreate, db: Session = Depends(get_db)):
-    return submit_response(db, response)
+    try:
+        return submit_response(db, response)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
+# Paged listing, newest first by default; follow next_cursor for the next page. For full extracts
+# use /export instead.
+@router.get("/", response_model=Page)
+def list_all_responses(
+    user_id: Optional[UUID] = None,
+    question_id: Optional[UUID] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sentiment: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    db: Session = Depends(get_db),
+):
+    try:
+        page = list_responses(db, user_id, question_id, start, end, sentiment, fields, cursor, limit, order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=dumps(page), media_type="application/json")
 
-# ✅ Fixed Endpoint: Update defer/skip state
+# Full-text search over comments (web-search syntax: words, "phrases", OR, -word) with highlighted
+# snippets; the first page also carries the hit count and facets by question, department and sentiment
+@router.get("/search", response_model=SearchPage)
+def search_comments(
+    q: str = Query(..., min_length=1, max_length=500),
+    question_id: Optional[UUID] = None,
+    department: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sort: str = "rank",
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    if sort not in SEARCH_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SEARCH_SORTS)}")
+    try:
+        page = search_responses(db, q, question_id, department, sentiment, start, end, sort, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=dumps(page), media_type="application/json")
+
+# Bulk ingestion: all valid items are written in one transaction
+MAX_BATCH_SIZE = 5000
+
+@router.post("/batch", response_model=ResponseBatchOut)
+def add_responses_batch(responses: list[ResponseBatchItem], db: Session = Depends(get_db)):
+    if len(responses) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} responses per batch")
+    results = submit_responses_batch(db, responses)
+    accepted = sum(1 for result in results if result.error is None)
+    replayed = sum(1 for result in results if result.replayed)
+    return ResponseBatchOut(inserted=accepted - replayed, failed=len(results) - accepted, replayed=replayed, results=results)
+
+# Sentiment pipeline throughput
+@router.get("/sentiment/stats", response_model=SentimentStatsOut)
+def sentiment_stats():
+    return sentiment_worker.stats()
+
+
+# Defer/skip state, tracked per (user, question)
 class StateUpdateRequest(BaseModel):
-    question_id: str
+    user_id: UUID
+    question_id: UUID
     action: str
 
-@router.post("/update_state")
+@router.post("/update_state", response_model=StateUpdateOut)
 def update_response_state(request: StateUpdateRequest, db: Session = Depends(get_db)):
-    if request.action == "defer":
-        db.execute(text("""
-            UPDATE responses 
-            SET defer_count = defer_count + 1 
-            WHERE question_id = :qid
-        """), {"qid": request.question_id})
-    elif request.action == "skip":
-        db.execute(text("""
-            UPDATE responses 
-            SET skipped = TRUE 
-            WHERE question_id = :qid
-        """), {"qid": request.question_id})
-    db.commit()
-    return {"status": "success", "action": request.action}
\ No newline at end of file
+    if request.action not in STATE_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"action must be one of {', '.join(STATE_ACTIONS)}")
+    # Checked up front: the upsert (or a buffered flush) would otherwise fail on the foreign key
+    if db.get(User, request.user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if db.get(Question, request.question_id) is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    record_state_action(db, request.user_id, request.question_id, request.action)
+    return {"status": "success", "action": request.action}
+
+# Queued defer/skip clicks from the popup outbox, applied in one upsert
+@router.post("/update_state/batch", response_model=StateBatchOut)
+def update_response_states(requests: list[StateUpdateRequest], db: Session = Depends(get_db)):
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} state updates per batch")
+    unknown = sorted({request.action for request in requests if request.action not in STATE_ACTIONS})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"action must be one of {', '.join(STATE_ACTIONS)}")
+    # Unknown ids are reported instead of failing the batch, so one stale entry can't wedge a client's outbox
+    known_questions = {row.question_id for row in db.query(Question.question_id).filter(
+        Question.question_id.in_({request.question_id for request in requests}))}
+    known_users = {row.user_id for row in db.query(User.user_id).filter(
+        User.user_id.in_({request.user_id for request in requests}))}
+    valid = [
+        (request.user_id, request.question_id, request.action) for request in requests
+        if request.question_id in known_questions and request.user_id in known_users
+    ]
+    record_state_actions(db, valid)
+    return {"status": "success", "updated": len(valid), "ignored": len(requests) - len(valid)}
+
+
+# Constant-memory bulk export; resume by passing the last row's submitted_at and response_id
+@router.get("/export", response_class=StreamingResponse)
+def export_responses(
+    format: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    question_id: Optional[UUID] = None,
+    department: Optional[str] = None,
+    after_submitted_at: Optional[datetime] = None,
+    after_response_id: Optional[UUID] = None,
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if (after_submitted_at is None) != (after_response_id is None):
+        raise HTTPException(status_code=400, detail="after_submitted_at and after_response_id go together")
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+    stmt = export_statement(start, end, question_id, department, after_submitted_at, after_response_id, engine.dialect.name)
+    return StreamingResponse(
+        EXPORT_WRITERS[format](iter_batches(stmt)),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=responses.{format}"},
+    )
@@ -1,12 +1,44 @@
 # User endpoints
-from fastapi import APIRouter, Depends
+import os
+import tempfile
+from typing import List
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.schemas import UserCreate
+from app.schemas import UserCreate, UserOut, UserSyncOut, QuestionOut
 from app.crud import create_user
+from app.services.directory_sync import SYNC_FORMATS, sync_directory
+from app.services.scoring import get_top_questions
+
+# Directory uploads larger than this spill from memory to a temp file
+SYNC_SPOOL_BYTES = int(os.getenv("USER_SYNC_SPOOL_BYTES", str(16 * 1024 * 1024)))
 
 router = APIRouter()
 
-@router.post("/")
+@router.post("/", response_model=UserOut)
 def add_user(user: UserCreate, db: Session = Depends(get_db)):
-    return create_user(db, user)
\ No newline at end of file
+    return create_user(db, user)
+
+# Bulk HR directory sync from a CSV or NDJSON export in the request body. With deactivate_missing
+# (a full export), active users absent from the file are deactivated; dry_run only reports the diff.
+@router.post("/sync", response_model=UserSyncOut)
+async def sync_users(
+    request: Request,
+    format: str = "csv",
+    deactivate_missing: bool = True,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+):
+    if format not in SYNC_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(SYNC_FORMATS)}")
+    with tempfile.SpooledTemporaryFile(max_size=SYNC_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        return await run_in_threadpool(sync_directory, db, spool, format, deactivate_missing, dry_run)
+
+@router.get("/{user_id}/questions", response_model=List[QuestionOut])
+def get_user_questions(user_id: UUID, k: int = Query(5, ge=1, le=50), db: Session = Depends(get_db)):
+    return get_top_questions(db, user_id, k)
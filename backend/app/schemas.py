@@ -1,8 +1,8 @@
 # Pydantic schemas
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from uuid import UUID
-from typing import Optional
-from datetime import datetime
+from typing import Any, Optional, List, Dict, Union
+from datetime import date, datetime
 
 # User Schema
 class UserCreate(BaseModel):
@@ -22,6 +22,25 @@ class UserOut(UserCreate):
     user_id: UUID
     created_at: datetime
 
+    model_config = ConfigDict(from_attributes=True)
+
+# Directory sync report; errors carry the record number (parse errors) or employee_id (write errors)
+class UserSyncError(BaseModel):
+    record: Optional[int] = None
+    employee_id: Optional[str] = None
+    error: str
+
+class UserSyncOut(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    unchanged: int
+    deactivated: int
+    failed: int
+    dry_run: bool
+    seconds: float
+    errors: List[UserSyncError]
+
 # Question Schema
 class QuestionCreate(BaseModel):
     question_text: str
@@ -31,17 +50,150 @@ class QuestionCreate(BaseModel):
 
 class QuestionOut(QuestionCreate):
     question_id: UUID
-    last_used_at: Optional[datetime]
+    last_used_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
 
 # Response Schema
-class ResponseCreate(BaseModel):
+# Batch items: answer checks run per item in submit_responses_batch, so one bad item can't 422 the whole batch
+class ResponseBatchItem(BaseModel):
     question_id: UUID
     user_id: Optional[UUID]
     response_text: Optional[str] = None
     response_emoji: Optional[int] = None
     response_radio: Optional[str] = None
+    # Client-chosen (e.g. a UUID per answer); resending with the same key returns the first result
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=255)
+
+    def answer_error(self):
+        if self.response_text is None and self.response_emoji is None and self.response_radio is None:
+            return "no answer given"
+        if self.response_emoji is not None and not 1 <= self.response_emoji <= 5:
+            return "response_emoji must be between 1 and 5"
+        return None
+
+class ResponseCreate(ResponseBatchItem):
+    response_emoji: Optional[int] = Field(None, ge=1, le=5)
+
+    # Rejected with a 422 on the single submit paths, before anything reaches the database
+    @model_validator(mode="after")
+    def check_answer(self):
+        error = self.answer_error()
+        if error is not None:
+            raise ValueError(error)
+        return self
 
 class ResponseOut(ResponseCreate):
     response_id: UUID
-    sentiment: Optional[str]
-    submitted_at: datetime
\ No newline at end of file
+    sentiment: Optional[str] = None
+    submitted_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Batch ingestion result, one entry per submitted item
+class ResponseBatchItemOut(BaseModel):
+    index: int
+    response_id: Optional[UUID] = None
+    submitted_at: Optional[datetime] = None
+    error: Optional[str] = None
+    replayed: bool = False  # idempotency_key seen before: the stored result, nothing written
+
+class ResponseBatchOut(BaseModel):
+    inserted: int
+    failed: int
+    replayed: int = 0
+    results: List[ResponseBatchItemOut]
+
+# Keyset listings (GET /questions/, /responses/): table rows as dicts, only the fields= columns when
+# given; next_cursor is null on the last page
+class Page(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+# Comment search (GET /responses/search)
+class SearchHitOut(BaseModel):
+    response_id: UUID
+    question_id: UUID
+    user_id: Optional[UUID] = None
+    department: Optional[str] = None
+    sentiment: Optional[str] = None
+    submitted_at: datetime
+    rank: float
+    snippet: Optional[str] = None  # HTML-escaped, matches wrapped in <mark>
+
+class SearchFacetOut(BaseModel):
+    value: Optional[str]  # question_id for the question facet
+    count: int
+    question_text: Optional[str] = None  # question facet only
+
+class SearchPage(BaseModel):
+    total: Optional[int] = None  # first page only, like facets
+    items: List[SearchHitOut]
+    facets: Optional[Dict[str, List[SearchFacetOut]]] = None
+    next_cursor: Optional[str] = None
+
+# Defer/skip state updates
+class StateUpdateOut(BaseModel):
+    status: str
+    action: str
+
+class StateBatchOut(BaseModel):
+    status: str
+    updated: int
+    ignored: int
+
+class SentimentStatsOut(BaseModel):
+    rows_scored: int
+    rows_failed: int
+    rows_per_sec: float
+    cache_hit_rate: float
+    queue_depth: int
+
+# Dashboard insights (GET /insights/, /insights/clusters)
+class SentimentMixOut(BaseModel):
+    Positive: int = 0
+    Neutral: int = 0
+    Negative: int = 0
+
+class InsightEmojiOut(BaseModel):
+    count: int
+    average: Optional[float] = None
+    histogram: Dict[str, int]
+
+class InsightOut(BaseModel):
+    group: Dict[str, Union[date, UUID, str]]  # the group_by columns and their values
+    responses: int
+    emoji: InsightEmojiOut
+    sentiment: SentimentMixOut
+    radio: Dict[str, int]
+
+class CommentClusterOut(BaseModel):
+    cluster_id: UUID
+    size: int
+    representative: str
+    examples: List[str]
+    sentiment: SentimentMixOut
+
+# Pulse campaign; send_rate is prompts per second
+class CampaignCreate(BaseModel):
+    question_id: UUID
+    send_rate: float = Field(gt=0)
+    department: Optional[str] = None
+    ends_at: Optional[datetime] = None
+
+class CampaignOut(CampaignCreate):
+    campaign_id: UUID
+    status: str
+    sent_count: int
+    created_at: datetime
+    ends_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class PromptStatsOut(BaseModel):
+    connections: int
+    users: int
+    sent: Dict[str, int]
+    delivered: int
+    dropped: int
+    campaigns: int
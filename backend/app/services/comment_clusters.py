@@ -0,0 +1,329 @@
+# Incremental clustering of comment responses: MinHash signatures bucketed in an LSH index
+# numpy is imported on first use to keep app startup fast
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import and_, delete, func, insert, or_, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, db_now, dialect_insert
+from app.models import CommentCluster, CommentClusterMember, JobWatermark, Response
+from app.services.periodic import PeriodicJob
+
+CLUSTER_JOB = "comment_clusters"
+# 128 permutations in 32 bands of 4 rows: pairs above ~0.42 estimated Jaccard become candidates
+CLUSTER_NUM_PERM = int(os.getenv("CLUSTER_NUM_PERM", "128"))
+CLUSTER_BANDS = int(os.getenv("CLUSTER_BANDS", "32"))
+# A comment joins the most similar candidate cluster at or above this estimated Jaccard, else starts one
+CLUSTER_THRESHOLD = float(os.getenv("CLUSTER_THRESHOLD", "0.5"))
+CLUSTER_BATCH_SIZE = int(os.getenv("CLUSTER_BATCH_SIZE", "5000"))
+CLUSTER_LAG_SECONDS = int(os.getenv("CLUSTER_LAG_SECONDS", "300"))
+CLUSTER_INTERVAL_SECONDS = int(os.getenv("CLUSTER_INTERVAL_SECONDS", "0"))
+# Fixed so signatures stored in comment_clusters stay comparable across processes and restarts
+CLUSTER_SEED = 1
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i i'm is it it's its of on or our so that the their "
+    "there this to too was we were what when which with would you your".split()
+)
+
+
+# Content words and adjacent word pairs; falls back to every word for answers made only of stopwords
+def shingles(text):
+    tokens = TOKEN_RE.findall(text.lower())
+    words = [token for token in tokens if token not in STOPWORDS] or tokens
+    return set(words) | {f"{first} {second}" for first, second in zip(words, words[1:])}
+
+
+class MinHasher:
+    """Universal hash family ((a * x + b) mod p) applied to CRC32 shingle hashes."""
+
+    def __init__(self, num_perm=CLUSTER_NUM_PERM, seed=CLUSTER_SEED):
+        import numpy as np
+
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    # None for text without any words (emoji-only answers and the like)
+    def signature(self, text):
+        import numpy as np
+
+        grams = shingles(text)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+        values = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE_PRIME
+        return (values.min(axis=1) & _MAX_HASH).astype("<u4")
+
+
+class CommentClusterIndex:
+    """Representative signature of every cluster, bucketed per question and LSH band.
+
+    A new comment is only compared with the clusters it shares a band with, so assignment cost
+    depends on the bucket sizes rather than on how many comments or clusters exist.
+    """
+
+    def __init__(self, num_perm=CLUSTER_NUM_PERM, bands=CLUSTER_BANDS, threshold=CLUSTER_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("CLUSTER_NUM_PERM must be a multiple of CLUSTER_BANDS")
+        self.hasher = None
+        self.num_perm = num_perm
+        self.bands = bands
+        self.band_width = num_perm // bands * 4
+        self.threshold = threshold
+        self.buckets = defaultdict(list)
+        self.signatures = {}
+        self.sizes = {}
+        self.watermark = None
+        self.is_loaded = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def signature(self, text):
+        if self.hasher is None:
+            self.hasher = MinHasher(self.num_perm)
+        return self.hasher.signature(text)
+
+    # Python's hash keeps the keys small; the index is rebuilt per process, so salting is harmless
+    def _bucket_keys(self, question_id, signature):
+        data = signature.tobytes()
+        return [
+            hash((question_id, band, data[band * self.band_width:(band + 1) * self.band_width]))
+            for band in range(self.bands)
+        ]
+
+    def add(self, question_id, cluster_id, signature, size=0):
+        with self._lock:
+            self.signatures[cluster_id] = signature
+            self.sizes[cluster_id] = size
+            for key in self._bucket_keys(question_id, signature):
+                self.buckets[key].append(cluster_id)
+
+    # Best candidate cluster for a signature as (cluster_id, estimated Jaccard), or (None, 0.0)
+    def match(self, question_id, signature):
+        import numpy as np
+
+        with self._lock:
+            candidates = list({
+                cluster_id for key in self._bucket_keys(question_id, signature) for cluster_id in self.buckets.get(key, ())
+            })
+            if not candidates:
+                return None, 0.0
+            scores = (np.stack([self.signatures[cluster_id] for cluster_id in candidates]) == signature).mean(axis=1)
+        best = int(scores.argmax())
+        if scores[best] < self.threshold:
+            return None, 0.0
+        return candidates[best], float(scores[best])
+
+    # Join the best cluster or found a new one with this comment as its representative
+    def assign(self, question_id, signature):
+        with self._lock:
+            cluster_id, similarity = self.match(question_id, signature)
+            created = cluster_id is None
+            if created:
+                cluster_id, similarity = uuid.uuid4(), 1.0
+                self.add(question_id, cluster_id, signature)
+            self.sizes[cluster_id] += 1
+        return cluster_id, similarity, created
+
+    def clear(self):
+        with self._lock:
+            self.buckets = defaultdict(list)
+            self.signatures = {}
+            self.sizes = {}
+            self.watermark = None
+            self.is_loaded = False
+
+    # The clusters table is the persisted index: signatures are re-bucketed on load
+    def load(self, db: Session):
+        import numpy as np
+
+        with self._lock:
+            self.clear()
+            query = db.query(
+                CommentCluster.cluster_id, CommentCluster.question_id, CommentCluster.signature, CommentCluster.size,
+            )
+            for row in query.yield_per(CLUSTER_BATCH_SIZE):
+                signature = np.frombuffer(row.signature, dtype="<u4")
+                if len(signature) != self.num_perm:
+                    raise RuntimeError(
+                        "Stored cluster signatures don't match CLUSTER_NUM_PERM; "
+                        "re-cluster with python -m app.services.comment_clusters --rebuild"
+                    )
+                self.add(row.question_id, row.cluster_id, signature, row.size)
+            self.watermark = db.query(JobWatermark.watermark).filter(JobWatermark.job_name == CLUSTER_JOB).scalar()
+            self.is_loaded = True
+
+
+cluster_index = CommentClusterIndex()
+
+
+def _comment_batches(db: Session, lower, upper, batch_size):
+    last = None
+    while True:
+        query = db.query(Response.response_id, Response.question_id, Response.response_text, Response.submitted_at).filter(
+            Response.response_text.isnot(None), Response.submitted_at <= upper,
+        )
+        if lower is not None:
+            query = query.filter(Response.submitted_at > lower)
+        if last is not None:
+            query = query.filter(or_(
+                Response.submitted_at > last.submitted_at,
+                and_(Response.submitted_at == last.submitted_at, Response.response_id > last.response_id),
+            ))
+        rows = query.order_by(Response.submitted_at, Response.response_id).limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]
+
+
+# Assign every comment submitted since the last watermark, in one transaction
+def refresh_clusters(db: Session, index=cluster_index, lag_seconds=CLUSTER_LAG_SECONDS, batch_size=CLUSTER_BATCH_SIZE):
+    started = time.perf_counter()
+    upper = db_now(db) - timedelta(seconds=lag_seconds)
+    # Row lock keeps two refreshers from clustering the same window twice
+    lower = db.query(JobWatermark.watermark).filter(JobWatermark.job_name == CLUSTER_JOB).with_for_update().scalar()
+    if lower is not None and lower >= upper:
+        return {"comments": 0, "new_clusters": 0, "clusters": len(index), "seconds": 0.0}
+
+    comments = new_clusters = 0
+    with index._lock:
+        try:
+            # Another process may have moved the watermark (and the clusters) since this index was loaded
+            if not index.is_loaded or index.watermark != lower:
+                index.load(db)
+            for rows in _comment_batches(db, lower, upper, batch_size):
+                created, touched, members = {}, set(), []
+                for row in rows:
+                    signature = index.signature(row.response_text)
+                    if signature is None:
+                        continue
+                    cluster_id, similarity, is_new = index.assign(row.question_id, signature)
+                    if is_new:
+                        created[cluster_id] = {
+                            "cluster_id": cluster_id, "question_id": row.question_id,
+                            "representative_id": row.response_id, "representative_text": row.response_text,
+                            "signature": signature.tobytes(),
+                        }
+                    else:
+                        touched.add(cluster_id)
+                    members.append({"response_id": row.response_id, "cluster_id": cluster_id, "similarity": similarity})
+                if created:
+                    db.execute(insert(CommentCluster), [dict(row, size=index.sizes[key]) for key, row in created.items()])
+                touched -= created.keys()
+                if touched:
+                    db.execute(update(CommentCluster), [
+                        {"cluster_id": cluster_id, "size": index.sizes[cluster_id]} for cluster_id in touched
+                    ])
+                if members:
+                    db.execute(insert(CommentClusterMember), members)
+                comments += len(members)
+                new_clusters += len(created)
+
+            stmt = dialect_insert(db, JobWatermark).values(job_name=CLUSTER_JOB, watermark=upper)
+            db.execute(stmt.on_conflict_do_update(index_elements=[JobWatermark.job_name], set_={"watermark": upper}))
+            db.commit()
+            index.watermark = upper
+        except Exception:
+            # The in-memory assignments are ahead of the rolled-back tables; reload next time
+            index.clear()
+            raise
+    return {
+        "comments": comments, "new_clusters": new_clusters, "clusters": len(index),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# Forget every cluster so the next refresh re-clusters all comments (after changing the MinHash settings)
+def reset_clusters(db: Session, index=cluster_index):
+    db.execute(delete(CommentClusterMember))
+    db.execute(delete(CommentCluster))
+    db.execute(delete(JobWatermark).where(JobWatermark.job_name == CLUSTER_JOB))
+    db.commit()
+    index.clear()
+
+
+# Largest clusters for a question with their closest comments and sentiment mix
+def top_clusters(db: Session, question_id, limit=10, examples=3, min_size=2):
+    clusters = db.query(
+        CommentCluster.cluster_id, CommentCluster.size, CommentCluster.representative_text,
+    ).filter(
+        CommentCluster.question_id == question_id, CommentCluster.size >= min_size,
+    ).order_by(CommentCluster.size.desc(), CommentCluster.cluster_id).limit(limit).all()
+    cluster_ids = [row.cluster_id for row in clusters]
+    if not cluster_ids:
+        return []
+
+    sentiment = defaultdict(lambda: {"Positive": 0, "Neutral": 0, "Negative": 0})
+    for row in db.query(CommentClusterMember.cluster_id, Response.sentiment, func.count().label("count")).join(
+        Response, Response.response_id == CommentClusterMember.response_id,
+    ).filter(
+        CommentClusterMember.cluster_id.in_(cluster_ids), Response.sentiment.isnot(None),
+    ).group_by(CommentClusterMember.cluster_id, Response.sentiment):
+        sentiment[row.cluster_id][row.sentiment] = int(row.count)
+
+    samples = defaultdict(list)
+    if examples > 0:
+        rank = func.row_number().over(
+            partition_by=CommentClusterMember.cluster_id,
+            order_by=(CommentClusterMember.similarity.desc(), CommentClusterMember.response_id),
+        ).label("rank")
+        ranked = db.query(CommentClusterMember.cluster_id, Response.response_text, rank).join(
+            Response, Response.response_id == CommentClusterMember.response_id,
+        ).join(
+            CommentCluster, CommentCluster.cluster_id == CommentClusterMember.cluster_id,
+        ).filter(
+            CommentClusterMember.cluster_id.in_(cluster_ids),
+            CommentClusterMember.response_id != CommentCluster.representative_id,
+        ).subquery()
+        for row in db.query(ranked).filter(ranked.c.rank <= examples).order_by(ranked.c.cluster_id, ranked.c.rank):
+            samples[row.cluster_id].append(row.response_text)
+
+    return [{
+        "cluster_id": row.cluster_id,
+        "size": row.size,
+        "representative": row.representative_text,
+        "examples": samples.get(row.cluster_id, []),
+        "sentiment": sentiment[row.cluster_id],
+    } for row in clusters]
+
+
+class ClusterJob(PeriodicJob):
+    """Runs refresh_clusters every CLUSTER_INTERVAL_SECONDS in a daemon thread."""
+
+    name = "cluster-job"
+    failure = "Comment clustering"
+
+    def __init__(self, interval=CLUSTER_INTERVAL_SECONDS, session_factory=SessionLocal):
+        super().__init__(interval, session_factory)
+
+    def run_once(self, db):
+        return refresh_clusters(db)
+
+
+cluster_job = ClusterJob()
+
+
+if __name__ == "__main__":
+    # python -m app.services.comment_clusters [--rebuild]
+    import sys
+
+    db = SessionLocal()
+    try:
+        if "--rebuild" in sys.argv[1:]:
+            reset_clusters(db)
+        print(refresh_clusters(db))
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+# HR directory sync: diff an exported user list against the users table and apply it in bulk
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models import User
+from app.services.org_hierarchy import update_org_closure
+
+SYNC_CHUNK_SIZE = int(os.getenv("USER_SYNC_CHUNK_SIZE", "1000"))
+SYNC_FORMATS = ("csv", "ndjson")
+# Directory columns; is_active is optional in the export and defaults to true
+SYNC_FIELDS = (
+    "employee_id", "full_name", "ads_id", "manager_id", "manager_name", "manager_email_hash",
+    "department", "band", "job_title", "email_hash",
+)
+MAX_REPORTED_ERRORS = 100
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+FALSE_VALUES = {"0", "false", "f", "no", "n"}
+
+
+# Stable hash of everything the directory owns; unchanged rows are skipped without touching the DB
+def user_fingerprint(row):
+    values = [str(row[field]) for field in SYNC_FIELDS] + ["1" if row["is_active"] else "0"]
+    return hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=16).hexdigest()
+
+
+# A missing value or a blank cell means active; deactivation has to be explicit
+def parse_active(value):
+    if isinstance(value, bool):
+        return value
+    text = "" if value is None else str(value).strip().lower()
+    if text in TRUE_VALUES or not text:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"is_active must be true or false, got {value!r}")
+
+
+# Validated directory rows from a binary file object, with the 1-based record number of each
+def read_directory(file, format):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    records = csv.DictReader(text) if format == "csv" else (line for line in text if line.strip())
+    for number, record in enumerate(records, start=1):
+        try:
+            if format == "ndjson":
+                record = json.loads(record)
+            missing = [field for field in SYNC_FIELDS if not str(record.get(field) or "").strip()]
+            if missing:
+                raise ValueError(f"missing {', '.join(missing)}")
+            row = {field: str(record[field]).strip() for field in SYNC_FIELDS}
+            row["is_active"] = parse_active(record.get("is_active"))
+            yield number, row, None
+        except (ValueError, AttributeError) as e:
+            yield number, None, str(e)
+
+
+def upsert_statement(db):
+    stmt = dialect_insert(db, User)
+    return stmt.on_conflict_do_update(
+        index_elements=[User.employee_id],
+        set_={field: stmt.excluded[field] for field in SYNC_FIELDS + ("is_active", "fingerprint")},
+    )
+
+
+# One statement per chunk; a chunk that hits another unique key (ads_id / email_hash moved between
+# employees) is replayed row by row under savepoints so only the offending rows fail
+def apply_upserts(db: Session, rows, chunk_size, errors):
+    stmt = upsert_statement(db)
+    failed = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            with db.begin_nested():
+                db.execute(stmt, chunk)
+        except IntegrityError:
+            for row in chunk:
+                try:
+                    with db.begin_nested():
+                        db.execute(stmt, [row])
+                except IntegrityError as e:
+                    failed += 1
+                    errors.append({"employee_id": row["employee_id"], "error": str(e.orig).splitlines()[0]})
+    return failed
+
+
+def sync_directory(db: Session, file, format="csv", deactivate_missing=True, dry_run=False, chunk_size=SYNC_CHUNK_SIZE):
+    started = time.perf_counter()
+    current = {
+        row.employee_id: (row.fingerprint, row.is_active)
+        for row in db.query(User.employee_id, User.fingerprint, User.is_active)
+    }
+
+    errors, seen, inserts, updates = [], set(), [], []
+    received = unchanged = 0
+    for number, row, error in read_directory(file, format):
+        received += 1
+        if row is not None and row["employee_id"] in seen:
+            error = f"duplicate employee_id {row['employee_id']}"
+        if error is not None:
+            errors.append({"record": number, "error": error})
+            continue
+        seen.add(row["employee_id"])
+        row["fingerprint"] = user_fingerprint(row)
+        existing = current.get(row["employee_id"])
+        if existing is None:
+            inserts.append(dict(row, user_id=uuid.uuid4()))
+        elif existing[0] != row["fingerprint"]:
+            updates.append(row)
+        else:
+            unchanged += 1
+
+    # Active users the export no longer lists; their fingerprint is cleared so a return re-applies the row
+    missing = [
+        employee_id for employee_id, (_, is_active) in current.items()
+        if deactivate_missing and is_active is not False and employee_id not in seen
+    ]
+
+    failed_inserts = failed_updates = 0
+    if not dry_run:
+        # Updates first, so keys an employee gave up can be taken by a new hire in the same sync
+        failed_updates = apply_upserts(db, updates, chunk_size, errors)
+        failed_inserts = apply_upserts(db, inserts, chunk_size, errors)
+        for start in range(0, len(missing), chunk_size):
+            db.execute(
+                update(User).where(User.employee_id.in_(missing[start:start + chunk_size]))
+                .values(is_active=False, fingerprint=None)
+            )
+        db.commit()
+        # Deactivated users stay in the hierarchy, so their past responses still roll up to their line
+        update_org_closure(db, [row["employee_id"] for row in updates + inserts])
+
+    return {
+        "received": received,
+        "inserted": len(inserts) - failed_inserts,
+        "updated": len(updates) - failed_updates,
+        "unchanged": unchanged,
+        "deactivated": len(missing),
+        "failed": len(errors),
+        "dry_run": dry_run,
+        "seconds": round(time.perf_counter() - started, 3),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+    }
@@ -0,0 +1,129 @@
+# Streaming bulk export of responses
+import csv
+import io
+import json
+import os
+from sqlalchemy import and_, func, or_, select
+from app.database import SessionLocal
+from app.models import Question, Response, User
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_COLUMNS = (
+    Response.response_id,
+    Response.question_id,
+    Response.user_id,
+    Question.category,
+    User.department,
+    User.band,
+    User.manager_id,
+    Response.response_text,
+    Response.response_emoji,
+    Response.response_radio,
+    Response.sentiment,
+    Response.submitted_at,
+)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+
+
+# Keyset-ordered export query; (after_submitted_at, after_response_id) resumes after the last row received.
+# SQLite keeps timestamps as text in whatever format wrote them (CURRENT_TIMESTAMP has no fraction,
+# bound datetimes do), so there rows are ordered and compared on one normalised format.
+def export_statement(start=None, end=None, question_id=None, department=None,
+                     after_submitted_at=None, after_response_id=None, dialect=None):
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .join(Question, Question.question_id == Response.question_id)
+        .outerjoin(User, User.user_id == Response.user_id)
+    )
+    if start is not None:
+        stmt = stmt.where(Response.submitted_at >= start)
+    if end is not None:
+        stmt = stmt.where(Response.submitted_at < end)
+    if question_id is not None:
+        stmt = stmt.where(Response.question_id == question_id)
+    if department is not None:
+        stmt = stmt.where(User.department == department)
+    submitted_at = Response.submitted_at
+    if dialect == "sqlite":
+        submitted_at = func.strftime("%Y-%m-%d %H:%M:%f", Response.submitted_at)
+    if after_submitted_at is not None:
+        after = func.strftime("%Y-%m-%d %H:%M:%f", after_submitted_at) if dialect == "sqlite" else after_submitted_at
+        stmt = stmt.where(or_(
+            submitted_at > after,
+            and_(submitted_at == after, Response.response_id > after_response_id),
+        ))
+    return stmt.order_by(submitted_at, Response.response_id)
+
+
+# Row batches from a server-side cursor; never holds more than one batch in memory
+def iter_batches(stmt, batch_size=EXPORT_BATCH_SIZE, session_factory=SessionLocal):
+    db = session_factory()
+    try:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+        for rows in result.partitions():
+            yield rows
+    finally:
+        db.close()
+
+
+def _plain(value):
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def write_ndjson(batches):
+    for rows in batches:
+        yield "".join(
+            json.dumps({field: _plain(value) for field, value in zip(EXPORT_FIELDS, row)}) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+def write_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in batches:
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_parquet(batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (field, pa.int32() if field == "response_emoji"
+         else pa.timestamp("us") if field == "submitted_at"
+         else pa.string())
+        for field in EXPORT_FIELDS
+    ])
+    # The writer tracks file offsets itself, so the sink can be drained after every row group
+    sink = io.BytesIO()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    for rows in batches:
+        columns = list(zip(*rows))
+        arrays = [
+            values if field in ("response_emoji", "submitted_at") else [None if v is None else str(v) for v in values]
+            for field, values in zip(EXPORT_FIELDS, columns)
+        ]
+        writer.write_batch(pa.RecordBatch.from_arrays([pa.array(a, type=t) for a, t in zip(arrays, schema.types)], schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate(0)
+    writer.close()
+    yield sink.getvalue()
+
+
+EXPORT_WRITERS = {"ndjson": write_ndjson, "csv": write_csv, "parquet": write_parquet}
@@ -0,0 +1,189 @@
+# Duplicate suppression for submitted responses: a client-chosen idempotency_key maps to the
+# ResponseOut first returned for it, so a retry (double click, timeout, outbox re-send) gets that
+# result back instead of writing another row. Keys are scoped per user, so one user's key never
+# replays (or conflicts with) another's answer. A bounded LRU answers repeats seen by this worker;
+# the response_idempotency table (primary key on the scoped key) covers other workers and restarts.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app.database import db_now, dialect_insert
+from app.models import ResponseIdempotency
+from app.services.metrics import registry
+
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "50000"))
+IDEMPOTENCY_CACHE_TTL = float(os.getenv("IDEMPOTENCY_CACHE_TTL", "600"))
+# How long keys are kept in the table; a retry arriving later than this is stored as a new response
+IDEMPOTENCY_RETENTION_HOURS = float(os.getenv("IDEMPOTENCY_RETENTION_HOURS", "24"))
+# Expired keys are deleted by the submission path at most this often per worker
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "3600"))
+CLAIM_CHUNK = 1000
+
+
+class IdempotencyConflict(ValueError):
+    """The idempotency key was already used for a different answer."""
+
+
+# The stored key: "<user_id>:<key>", or "anonymous:<key>" for answers without a user
+def scoped_key(response):
+    if response.idempotency_key is None:
+        return None
+    return f"{response.user_id or 'anonymous'}:{response.idempotency_key}"
+
+
+# The answer without its key; a replay has to repeat the same answer to get the stored result
+def fingerprint(response):
+    payload = json.dumps(response.dict(exclude={"idempotency_key"}), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class IdempotencyCache:
+    """Recently used keys -> (fingerprint, ResponseOut JSON), least recently used evicted first."""
+
+    def __init__(self, size=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.replays = 0
+        self.conflicts = 0
+        self.stored = 0
+        self._purged_at = time.monotonic()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] >= self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put_many(self, entries):
+        now = time.monotonic()
+        with self._lock:
+            for key, (digest, body) in entries.items():
+                self.entries[key] = (digest, body, now)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    # True for the one caller per interval that should run the purge
+    def purge_due(self):
+        with self._lock:
+            if time.monotonic() - self._purged_at < IDEMPOTENCY_PURGE_SECONDS:
+                return False
+            self._purged_at = time.monotonic()
+            return True
+
+    def stats(self):
+        return {
+            "cached_keys": len(self.entries),
+            "replays": self.replays,
+            "conflicts": self.conflicts,
+            "stored": self.stored,
+        }
+
+
+idempotency_cache = IdempotencyCache()
+
+
+# key -> (fingerprint, ResponseOut JSON) for the keys already used: this worker's cache first,
+# then one primary-key lookup for the rest
+def lookup(db: Session, keys):
+    found, missing = {}, []
+    for key in keys:
+        entry = idempotency_cache.get(key)
+        if entry is not None:
+            found[key] = entry
+        else:
+            missing.append(key)
+    if missing:
+        rows = db.execute(
+            select(ResponseIdempotency.idempotency_key, ResponseIdempotency.fingerprint, ResponseIdempotency.response)
+            .where(ResponseIdempotency.idempotency_key.in_(missing))
+        ).all()
+        stored = {key: (digest, body) for key, digest, body in rows}
+        idempotency_cache.put_many(stored)
+        found.update(stored)
+    return found
+
+
+# The stored result for `response` if its key was used before (None if not); raises
+# IdempotencyConflict when the key came with a different answer
+def replay(db: Session, response):
+    key = scoped_key(response)
+    entry = lookup(db, [key]).get(key)
+    if entry is None:
+        return None
+    check(response, entry)
+    replayed()
+    return json.loads(entry[1])
+
+
+def replayed(count=1):
+    idempotency_cache.replays += count
+
+
+def check(response, entry):
+    if entry[0] != fingerprint(response):
+        idempotency_cache.conflicts += 1
+        raise IdempotencyConflict("idempotency_key was used for a different response")
+
+
+# Records key -> (fingerprint, ResponseOut JSON) in the caller's transaction, next to the responses
+# it inserted. Returns the keys a concurrent request claimed first: the caller must drop its rows
+# for those (on Postgres this waits for that request's transaction, so its result is then readable).
+def claim(db: Session, entries):
+    lost = set()
+    items = list(entries.items())
+    for start in range(0, len(items), CLAIM_CHUNK):
+        chunk = items[start:start + CLAIM_CHUNK]
+        stmt = dialect_insert(db, ResponseIdempotency).values([
+            {"idempotency_key": key, "fingerprint": digest, "response": body} for key, (digest, body) in chunk
+        ])
+        stmt = stmt.on_conflict_do_nothing(index_elements=["idempotency_key"]).returning(ResponseIdempotency.idempotency_key)
+        claimed = set(db.execute(stmt).scalars())
+        lost.update(key for key, _ in chunk if key not in claimed)
+    return lost
+
+
+# After the claiming transaction committed
+def remember(entries):
+    idempotency_cache.put_many(entries)
+    idempotency_cache.stored += len(entries)
+
+
+def purge_expired(db: Session):
+    cutoff = db_now(db) - timedelta(hours=IDEMPOTENCY_RETENTION_HOURS)
+    deleted = db.execute(delete(ResponseIdempotency).where(ResponseIdempotency.created_at < cutoff)).rowcount
+    db.commit()
+    return deleted
+
+
+def maybe_purge(db: Session):
+    if idempotency_cache.purge_due():
+        purge_expired(db)
+
+
+def _collect():
+    stats = idempotency_cache.stats()
+    return [
+        ("idempotent_replays_total", "counter", "Resubmitted responses answered with the stored result", [({}, stats["replays"])]),
+        ("idempotency_conflicts_total", "counter", "Idempotency keys reused for a different answer", [({}, stats["conflicts"])]),
+        ("idempotency_cached_keys", "gauge", "Idempotency keys held in this worker's cache", [({}, stats["cached_keys"])]),
+    ]
+
+
+registry.add_collector(_collect)
@@ -0,0 +1,298 @@
+# In-process Prometheus metrics: request latency, SQL timing, pool waits, ML timers, sampling profiler
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# The profiler endpoints exist only when this is set; sampling itself starts on demand
+METRICS_PROFILER = os.getenv("METRICS_PROFILER", "0") == "1"
+PROFILER_INTERVAL_SECONDS = float(os.getenv("PROFILER_INTERVAL_SECONDS", "0.005"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Fixed-bucket histogram keyed by label values; observe() is a bisect and one locked update."""
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts, the +Inf bucket, then the running sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, le=bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.histograms = []
+        self.collectors = []
+
+    def histogram(self, *args, **kwargs):
+        histogram = Histogram(*args, **kwargs)
+        self.histograms.append(histogram)
+        return histogram
+
+    # collector() -> iterable of (name, type, help, [(labels dict, value), ...]) evaluated at scrape time
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for collector in self.collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(labels.keys(), labels.values())} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+request_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", ("method", "route"), COUNT_BUCKETS
+)
+request_db_seconds = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request", ("method", "route")
+)
+query_duration = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time by statement kind", ("operation",), QUERY_BUCKETS
+)
+pool_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",), QUERY_BUCKETS
+)
+ml_duration = registry.histogram("ml_duration_seconds", "Time spent in ML functions", ("function",))
+
+# [query count, SQL seconds] for the request being served; None outside requests (workers, jobs)
+_request_queries = ContextVar("request_queries", default=None)
+
+
+# --- HTTP ---
+# Route template for labels, e.g. /questions/{question_type}; some FastAPI versions report included
+# routes relative to their router prefix, so the (parameter-free) prefix is taken from the request path
+def route_template(scope):
+    template = getattr(scope.get("route"), "path_format", None)
+    if template is None:
+        return "unmatched"
+    path_parts = [part for part in scope["path"].split("/") if part]
+    template_parts = [part for part in template.split("/") if part]
+    prefix = path_parts[: len(path_parts) - len(template_parts)]
+    return "/" + "/".join(prefix) + template if prefix else template
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request until its last body chunk, labelled by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = [0, 0.0]
+        token = _request_queries.set(stats)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = route_template(scope)
+            request_duration.observe(elapsed, scope["method"], route, str(status[0]))
+            request_queries.observe(stats[0], scope["method"], route)
+            request_db_seconds.observe(stats[1], scope["method"], route)
+            _request_queries.reset(token)
+
+
+# --- SQL ---
+OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+def record_query(statement, elapsed):
+    keyword = statement.lstrip()[:7].split(None, 1)
+    operation = keyword[0].upper() if keyword else ""
+    query_duration.observe(elapsed, operation if operation in OPERATIONS else "OTHER")
+    stats = _request_queries.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+# Times the dialect's DBAPI execute calls. Registering before/after_cursor_execute listeners instead
+# turns off SQLAlchemy's execution fast path and costs more per statement than everything else here.
+def instrument_dialect(dialect):
+    for method in ("do_execute", "do_execute_no_params", "do_executemany"):
+        execute = getattr(dialect, method)
+
+        def timed_execute(cursor, statement, *args, _execute=execute, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _execute(cursor, statement, *args, **kwargs)
+            finally:
+                record_query(statement, time.perf_counter() - start)
+
+        setattr(dialect, method, timed_execute)
+
+
+# Time spent inside the pool's checkout (waiting for a free slot, or opening a new connection);
+# wraps this pool instance, so call again if the engine's pool is ever recreated
+def instrument_pool(pool, name):
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start, name)
+
+    pool._do_get = timed_do_get
+
+
+def pool_collector(pool, name):
+    def collect():
+        checked_out = getattr(pool, "checkedout", None)
+        if checked_out is None:
+            return []
+        return [
+            ("db_pool_checked_out", "gauge", "Connections currently checked out", [({"engine": name}, checked_out())]),
+            ("db_pool_size", "gauge", "Configured pool size", [({"engine": name}, pool.size())]),
+        ]
+    return collect
+
+
+def instrument_engine(engine, name="sync"):
+    instrument_dialect(engine.dialect)
+    instrument_pool(engine.pool, name)
+    registry.add_collector(pool_collector(engine.pool, name))
+
+
+# --- ML ---
+def timed(function_name):
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                ml_duration.observe(time.perf_counter() - start, function_name)
+        return wrapper
+    return decorate
+
+
+# --- Profiler ---
+class SamplingProfiler:
+    """Samples every thread's Python stack on an interval and aggregates them as collapsed stacks
+    (one "frame;frame;frame count" line per distinct stack, the input format of flamegraph tools)."""
+
+    def __init__(self, interval=PROFILER_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = Counter()
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=None):
+        if self.running:
+            return
+        self.interval = interval or self.interval
+        with self._lock:
+            self.samples.clear()
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(stack)))
+            with self._lock:
+                self.samples.update(stacks)
+
+    def collapsed(self):
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.samples.values())
+        return {"running": self.running, "interval": self.interval, "started_at": self.started_at, "samples": total}
+
+
+profiler = SamplingProfiler()
@@ -1,17 +1,46 @@
 # ML sentiment analysis
-import random
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+import os
+import threading
 from sqlalchemy.orm import Session
 from app.models import Response, Question
-from sklearn.feature_extraction.text import TfidfVectorizer
+from app.services.question_index import get_question_index
+from app.services.ml_executor import ml_executor
+from app.services.metrics import timed
 
-nltk.download("vader_lexicon")
-sia = SentimentIntensityAnalyzer()
+# Local nltk_data directory holding a vendored or pre-fetched VADER lexicon, so startup never needs the network
+NLTK_DATA_DIR = os.getenv("NLTK_DATA_DIR")
+NLTK_ALLOW_DOWNLOAD = os.getenv("NLTK_ALLOW_DOWNLOAD", "0") == "1"
+
+_sia = None
+_sia_lock = threading.Lock()
+
+# nltk is imported and the lexicon loaded on first use, not at import time
+def get_sentiment_analyzer():
+    global _sia
+    if _sia is None:
+        with _sia_lock:
+            if _sia is None:
+                _sia = _load_sentiment_analyzer()
+    return _sia
+
+def _load_sentiment_analyzer():
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    if NLTK_DATA_DIR:
+        nltk.data.path.insert(0, os.path.abspath(NLTK_DATA_DIR))
+    try:
+        return SentimentIntensityAnalyzer()
+    except LookupError:
+        if not NLTK_ALLOW_DOWNLOAD:
+            raise
+        nltk.download("vader_lexicon", download_dir=NLTK_DATA_DIR, quiet=True)
+        return SentimentIntensityAnalyzer()
 
 # Function to analyze sentiment of a user's feedback
+@timed("analyze_sentiment")
 def analyze_sentiment(text):
-    score = sia.polarity_scores(text)
+    score = get_sentiment_analyzer().polarity_scores(text)
     if score["compound"] >= 0.05:
         return "Positive"
     elif score["compound"] <= -0.05:
@@ -19,32 +48,39 @@ def analyze_sentiment(text):
     else:
         return "Neutral"
 
+# Warm-up hook: load the lexicon and question index before the first request needs them
+def warm_up(db: Session):
+    get_sentiment_analyzer()
+    get_question_index(db)
+
 # Function to get relevant questions based on user feedback
-def get_ml_selected_questions(db: Session, user_id):
-    # Fetch user responses
-    responses = db.query(Response).filter(Response.user_id == user_id).all()
-    if not responses:
-        return db.query(Question).order_by(Question.difficulty).limit(5).all()
-
-    # Extract feedback text
-    feedback_texts = [resp.response for resp in responses]
-    
-    # Perform sentiment analysis
-    sentiments = [analyze_sentiment(text) for text in feedback_texts]
-    
-    # Fetch all questions
-    all_questions = db.query(Question).all()
-    question_texts = [q.question_text for q in all_questions]
-
-    # Apply TF-IDF to measure question similarity
-    vectorizer = TfidfVectorizer()
-    vectors = vectorizer.fit_transform(feedback_texts + question_texts)
-    feedback_vectors = vectors[: len(feedback_texts)]
-    question_vectors = vectors[len(feedback_texts) :]
-
-    # Compute relevance scores (dummy approach for now)
-    scores = question_vectors.sum(axis=0).A1
-    ranked_questions = sorted(zip(all_questions, scores), key=lambda x: x[1], reverse=True)
-
-    # Select top 5 relevant questions
-    return [q[0] for q in ranked_questions[:5]]
\ No newline at end of file
+@timed("get_ml_selected_questions")
+def get_ml_selected_questions(db: Session, user_id, limit=5):
+    # Fetch only the user's free-text feedback
+    feedback_texts = [
+        row.response_text
+        for row in db.query(Response.response_text)
+        .filter(Response.user_id == user_id, Response.response_text.isnot(None))
+        .all()
+    ]
+    if not feedback_texts:
+        return db.query(Question).order_by(Question.difficulty_level).limit(limit).all()
+
+    # Rank questions by cosine similarity against the warm question index (in the ML pool when enabled;
+    # None there means it was saturated or too slow, which gets the same default order as no match)
+    ranked = ml_executor.rank(get_question_index(db), feedback_texts, limit)
+    if not ranked:
+        return db.query(Question).order_by(Question.difficulty_level).limit(limit).all()
+
+    # Load only the selected questions, keeping rank order
+    ranked_ids = [question_id for question_id, _ in ranked]
+    questions = {q.question_id: q for q in db.query(Question).filter(Question.question_id.in_(ranked_ids)).all()}
+    return [questions[question_id] for question_id in ranked_ids if question_id in questions]
+
+
+
+if __name__ == "__main__":
+    # Fetch the lexicon once at build time into NLTK_DATA_DIR: python -m app.services.ml
+    import nltk
+
+    nltk.download("vader_lexicon", download_dir=NLTK_DATA_DIR)
@@ -0,0 +1,233 @@
+# Process pool for the CPU-bound ML work (VADER sentiment, TF-IDF ranking), so it never competes
+# with request handling for the API process's GIL. ML_WORKERS=0 keeps everything inline.
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from app.services.metrics import registry
+
+ML_WORKERS = int(os.getenv("ML_WORKERS", "0"))
+# Tasks in flight across the pool; past this, interactive calls fall back instead of queueing
+ML_MAX_PENDING = int(os.getenv("ML_MAX_PENDING", str(max(1, ML_WORKERS) * 8)))
+# How long a request waits for its ranking before serving difficulty-ordered questions
+ML_RANK_TIMEOUT_SECONDS = float(os.getenv("ML_RANK_TIMEOUT_SECONDS", "0.5"))
+# Texts per sentiment task: enough to amortise the IPC, few enough to spread a batch over every worker
+ML_SENTIMENT_CHUNK = int(os.getenv("ML_SENTIMENT_CHUNK", "64"))
+
+
+class MLBusy(Exception):
+    """The pool already has ML_MAX_PENDING tasks in flight."""
+
+
+# --- Worker processes ---
+_worker_index = None
+_worker_index_version = None
+
+
+def _load_worker_index(version, digest):
+    global _worker_index, _worker_index_version
+    from app.database import SessionLocal
+    from app.services.question_index import ML_INDEX_PATH, QuestionIndex
+
+    index = QuestionIndex()
+    # The API process saves the index shortly after every edit when ML_INDEX_PATH is set; a file that
+    # doesn't match its catalog digest (None: not built there yet) isn't written yet, so read the catalog
+    if not index.load(ML_INDEX_PATH) or digest not in (None, index.digest):
+        db = SessionLocal()
+        try:
+            index.build_from_db(db)
+        finally:
+            db.close()
+    _worker_index, _worker_index_version = index, version
+
+
+def _init_worker(index_version, index_digest):
+    from app.services.ml import get_sentiment_analyzer
+
+    try:
+        get_sentiment_analyzer()
+    except LookupError:
+        # No lexicon: ranking still works, sentiment tasks will raise the same error
+        pass
+    _load_worker_index(index_version, index_digest)
+
+
+def _worker_rank(index_version, index_digest, feedback_texts, limit):
+    if index_version != _worker_index_version:
+        _load_worker_index(index_version, index_digest)
+    return _worker_index.rank(feedback_texts, limit)
+
+
+def _worker_sentiment(texts):
+    from app.services.ml import analyze_sentiment
+
+    return [analyze_sentiment(text) for text in texts]
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+# --- API process ---
+class MLExecutor:
+    """Warm worker processes behind a bounded number of in-flight tasks; identical in-flight inputs
+    share one task."""
+
+    def __init__(self, workers=ML_WORKERS, max_pending=ML_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def start(self):
+        if self.enabled:
+            self._get_pool()
+
+    def stop(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # Spawned, not forked: the API process has threads running. Every worker is started and warmed
+    # right away rather than on the first requests.
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                from app.services.question_index import question_index
+
+                digest = question_index.digest if question_index.is_built else None
+                self._pool = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker, initargs=(question_index.version, digest),
+                )
+                for _ in range(self.workers):
+                    self._pool.submit(_worker_ready)
+            return self._pool
+
+    # A dead worker breaks the whole pool; the next submission gets a fresh one
+    def _discard_pool(self, pool):
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, key, fn, *args, block=False):
+        with self._lock:
+            future = self._inflight.get(key) if key is not None else None
+            if future is not None:
+                self.coalesced += 1
+                return future
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self.rejected += 1
+            raise MLBusy()
+        pool = self._get_pool()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            self._slots.release()
+            raise
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            if key is not None:
+                self._inflight[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done, pool))
+        return future
+
+    def _finished(self, key, future, pool):
+        self._slots.release()
+        with self._lock:
+            self.in_flight -= 1
+            if key is not None and self._inflight.get(key) is future:
+                del self._inflight[key]
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard_pool(pool)
+
+    # Ranked (question_id, score) pairs, or None when the pool is saturated, too slow or failing
+    def rank(self, index, feedback_texts, limit, timeout=ML_RANK_TIMEOUT_SECONDS):
+        if not self.enabled:
+            return index.rank(feedback_texts, limit)
+        feedback_texts = tuple(feedback_texts)
+        try:
+            future = self.submit(("rank", index.version, limit, feedback_texts), _worker_rank,
+                                 index.version, index.digest, feedback_texts, limit)
+            return future.result(timeout)
+        except MLBusy:
+            return None
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            return None
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"ML ranking failed, serving the default order: {e}")
+            return None
+
+    # Sentiment labels in input order; background callers wait for free slots rather than fail
+    def sentiment_many(self, texts):
+        from app.services.ml import analyze_sentiment
+
+        if not self.enabled or not texts:
+            return [analyze_sentiment(text) for text in texts]
+        try:
+            futures = [
+                self.submit(None, _worker_sentiment, texts[start:start + ML_SENTIMENT_CHUNK], block=True)
+                for start in range(0, len(texts), ML_SENTIMENT_CHUNK)
+            ]
+            return [label for future in futures for label in future.result()]
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"ML sentiment failed, scoring inline: {e}")
+            return [analyze_sentiment(text) for text in texts]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+            }
+
+
+ml_executor = MLExecutor()
+
+
+def _collect():
+    if not ml_executor.enabled:
+        return []
+    stats = ml_executor.stats()
+    return [
+        ("ml_executor_in_flight", "gauge", "ML tasks submitted to the process pool and not finished", [({}, stats["in_flight"])]),
+        ("ml_executor_tasks_total", "counter", "ML pool submissions by outcome", [
+            ({"outcome": outcome}, stats[outcome]) for outcome in ("submitted", "coalesced", "rejected", "timeouts", "failures")
+        ]),
+    ]
+
+
+registry.add_collector(_collect)
@@ -0,0 +1,138 @@
+# Manager hierarchy as a closure table over employee ids, derived from users.manager_id
+import os
+import time
+from sqlalchemy import delete, insert, select, true
+from sqlalchemy.orm import Session, aliased
+from app.database import SessionLocal, dialect_insert
+from app.models import OrgClosure, User
+
+ORG_CLOSURE_CHUNK_SIZE = int(os.getenv("ORG_CLOSURE_CHUNK_SIZE", "5000"))
+# Beyond this many moved employees a full rebuild is cheaper than moving subtrees one by one
+ORG_CLOSURE_MAX_MOVES = int(os.getenv("ORG_CLOSURE_MAX_MOVES", "500"))
+
+
+# Every (ancestor, descendant, depth) path, including each employee as its own ancestor at depth 0.
+# Managers that aren't users themselves (the top of the org) still become nodes, so they can be filtered on.
+def closure_rows(managers):
+    chains = {}
+
+    def chain(employee_id):
+        path, seen, node = [], set(), employee_id
+        while node is not None and node not in chains and node not in seen:
+            seen.add(node)
+            path.append(node)
+            node = managers.get(node)
+        # A cycle in the directory data stops the walk where it closes
+        tail = chains.get(node, []) if node not in seen else []
+        for i in range(len(path) - 1, -1, -1):
+            tail = [path[i]] + tail
+            chains[path[i]] = tail
+        return chains[employee_id]
+
+    nodes = set(managers) | {manager for manager in managers.values() if manager is not None}
+    for node in nodes:
+        for depth, ancestor in enumerate(chain(node)):
+            yield {"ancestor_id": ancestor, "descendant_id": node, "depth": depth}
+
+
+def rebuild_org_closure(db: Session, chunk_size=ORG_CLOSURE_CHUNK_SIZE):
+    started = time.perf_counter()
+    managers = {row.employee_id: row.manager_id for row in db.query(User.employee_id, User.manager_id)}
+    db.execute(delete(OrgClosure))
+    rows, written = [], 0
+    for row in closure_rows(managers):
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            db.execute(insert(OrgClosure), rows)
+            written, rows = written + len(rows), []
+    if rows:
+        db.execute(insert(OrgClosure), rows)
+        written += len(rows)
+    db.commit()
+    return {"mode": "rebuild", "paths": written, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def _ensure_node(db: Session, employee_id):
+    stmt = dialect_insert(db, OrgClosure).values(ancestor_id=employee_id, descendant_id=employee_id, depth=0)
+    db.execute(stmt.on_conflict_do_nothing(index_elements=[OrgClosure.ancestor_id, OrgClosure.descendant_id]))
+
+
+# Re-hang an employee's whole subtree under a new manager: drop the paths from its old ancestors,
+# then link every new ancestor to every node of the subtree
+def move_subtree(db: Session, employee_id, manager_id):
+    # Aliased so the subquery isn't correlated against the DELETE target below
+    node = aliased(OrgClosure)
+    subtree = select(node.descendant_id).where(node.ancestor_id == employee_id)
+    if manager_id is not None and db.query(subtree.where(node.descendant_id == manager_id).exists()).scalar():
+        return False
+    db.execute(delete(OrgClosure).where(
+        OrgClosure.descendant_id.in_(subtree), OrgClosure.ancestor_id.not_in(subtree),
+    ))
+    if manager_id is not None:
+        _ensure_node(db, manager_id)
+        above, below = aliased(OrgClosure), aliased(OrgClosure)
+        db.execute(insert(OrgClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            # Every new ancestor times every subtree node: a deliberate cross join
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .join_from(above, below, true())
+            .where(above.descendant_id == manager_id, below.ancestor_id == employee_id),
+        ))
+    return True
+
+
+# Incremental refresh after users were added or changed: only employees whose manager differs from
+# their current parent in the closure are touched (falls back to a rebuild for large reorganisations)
+def update_org_closure(db: Session, employee_ids):
+    started = time.perf_counter()
+    employee_ids = list(employee_ids)
+    moves = []
+    for start in range(0, len(employee_ids), ORG_CLOSURE_CHUNK_SIZE):
+        chunk = employee_ids[start:start + ORG_CLOSURE_CHUNK_SIZE]
+        parents = {
+            row.descendant_id: row.ancestor_id
+            for row in db.query(OrgClosure.descendant_id, OrgClosure.ancestor_id)
+            .filter(OrgClosure.descendant_id.in_(chunk), OrgClosure.depth == 1)
+        }
+        known = {
+            row.descendant_id
+            for row in db.query(OrgClosure.descendant_id).filter(OrgClosure.descendant_id.in_(chunk), OrgClosure.depth == 0)
+        }
+        for row in db.query(User.employee_id, User.manager_id).filter(User.employee_id.in_(chunk)):
+            if row.employee_id not in known or parents.get(row.employee_id) != row.manager_id:
+                moves.append((row.employee_id, row.manager_id))
+
+    if len(moves) > ORG_CLOSURE_MAX_MOVES:
+        return rebuild_org_closure(db)
+    for employee_id, _ in moves:
+        _ensure_node(db, employee_id)
+    # A move can look like a cycle until another move in the same batch has happened; retry until
+    # nothing more succeeds, whatever is left really is a cycle in the directory data
+    pending = moves
+    while pending:
+        skipped = [(employee_id, manager_id) for employee_id, manager_id in pending if not move_subtree(db, employee_id, manager_id)]
+        if len(skipped) == len(pending):
+            break
+        pending = skipped
+    skipped = [employee_id for employee_id, _ in pending]
+    db.commit()
+    if skipped:
+        print(f"Org closure: manager cycle, kept the previous manager for {', '.join(skipped[:10])}")
+    return {
+        "mode": "incremental", "moved": len(moves) - len(skipped), "cycles": len(skipped),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# Everyone below (and including) a manager, as a subquery for IN / semi-joins
+def subtree_ids(manager_id):
+    return select(OrgClosure.descendant_id).where(OrgClosure.ancestor_id == manager_id)
+
+
+if __name__ == "__main__":
+    # Full rebuild: python -m app.services.org_hierarchy
+    db = SessionLocal()
+    try:
+        print(rebuild_org_closure(db))
+    finally:
+        db.close()
@@ -0,0 +1,96 @@
+# Keyset (seek) pagination for the list endpoints: each page continues strictly after the previous
+# page's last sort key, so page N costs one index range scan no matter how deep the client is
+import base64
+import hashlib
+import json
+import os
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import String, bindparam, select, tuple_, type_coerce
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed, or was issued for different filters or ordering."""
+
+
+# The query a cursor belongs to (filters + order), so a cursor can't be replayed against another
+def cursor_scope(**params):
+    canonical = json.dumps({key: str(value) for key, value in params.items() if value is not None}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def encode_cursor(values, scope):
+    payload = json.dumps([scope, [value.isoformat() if isinstance(value, datetime) else str(value) for value in values]])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, scope, keys):
+    try:
+        issued_for, values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if issued_for != scope or len(values) != len(keys):
+            raise InvalidCursor("cursor does not belong to this query")
+        return [_parse(key, value) for key, value in zip(keys, values)]
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"malformed cursor: {e}")
+
+
+def _parse(column, value):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    return python_type(value)
+
+
+# Requested field names -> columns, in the model's column order; None means every field
+def project(columns, fields):
+    by_name = {column.key: column for column in columns}
+    if not fields:
+        return list(columns)
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(names - set(by_name))
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)} (available: {', '.join(by_name)})")
+    return [column for column in columns if column.key in names]
+
+
+# SQLite keeps timestamps as text in whatever format wrote them (CURRENT_TIMESTAMP has no fraction,
+# bound datetimes do), so there they are compared as the stored text, which sorts the same way
+def _comparable(db, key):
+    if db.get_bind().dialect.name == "sqlite" and key.type.python_type is datetime:
+        return type_coerce(key, String).label(f"_cursor_{key.key}")
+    return key
+
+
+# One page of `columns` from a filtered statement ordered by `keys` (unique together, last one the
+# table's id). Keys that aren't projected are fetched after the columns, only for the next cursor.
+# select_from gives the joins when the columns come from several tables.
+def keyset_page(db, columns, keys, where, scope, cursor=None, limit=PAGE_SIZE, descending=False, select_from=None):
+    columns = list(columns)
+    keys = [_comparable(db, key) for key in keys]
+    extra = [key for key in keys if not any(key is column for column in columns)]
+    stmt = select(*columns, *extra).where(*where)
+    if select_from is not None:
+        stmt = stmt.select_from(select_from)
+    if cursor is not None:
+        values = decode_cursor(cursor, scope, keys)
+        position = tuple_(*keys)
+        last = tuple_(*[bindparam(None, value, type_=key.type) for key, value in zip(keys, values)])
+        stmt = stmt.where(position < last if descending else position > last)
+    stmt = stmt.order_by(*[key.desc() if descending else key for key in keys]).limit(limit + 1)
+    rows = db.execute(stmt).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        selected = columns + extra
+        positions = [next(i for i, column in enumerate(selected) if column is key) for key in keys]
+        next_cursor = encode_cursor([rows[-1][i] for i in positions], scope)
+    names = [column.key for column in columns]
+    width = len(names)
+    return {"items": [dict(zip(names, row[:width])) for row in rows], "next_cursor": next_cursor}
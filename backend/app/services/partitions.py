@@ -0,0 +1,180 @@
+# Monthly responses partitions (database/partitioning.sql): create them ahead of time, archive
+# expired ones to Parquet and detach them. A no-op while responses isn't partitioned.
+# pyarrow is imported on first use (only archival needs it)
+import os
+import re
+import time
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, db_now
+from app.services.periodic import PeriodicJob
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# Months of responses kept in the database; 0 keeps everything
+RESPONSE_RETENTION_MONTHS = int(os.getenv("RESPONSE_RETENTION_MONTHS", "0"))
+RESPONSE_ARCHIVE_DIR = os.getenv("RESPONSE_ARCHIVE_DIR", "archive/responses")
+# Detached partitions are kept as responses_pYYYY_MM_archived (and can be re-attached) unless this is set
+RESPONSE_ARCHIVE_DROP = os.getenv("RESPONSE_ARCHIVE_DROP", "0") == "1"
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "50000"))
+PARTITION_INTERVAL_SECONDS = int(os.getenv("PARTITION_INTERVAL_SECONDS", "0"))
+
+BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def is_partitioned(db: Session):
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('responses'))"
+    )).scalar()
+
+
+# Attached partitions as (name, lower, upper), oldest first; the DEFAULT partition has no bounds
+def list_partitions(db: Session):
+    rows = db.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass('responses')"
+    )).all()
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_RE.search(bound)
+        if match:
+            partitions.append((name, datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+# Partitions from the current month through months_ahead, so inserts never land in the default partition.
+# Rows of those months already in responses_default are moved into their partition as it's created.
+def ensure_partitions(db: Session, months_ahead=PARTITION_MONTHS_AHEAD):
+    this_month = db_now(db).date().replace(day=1)
+    created = db.execute(
+        text("SELECT create_response_partitions(:start, :end)"),
+        {"start": this_month, "end": add_months(this_month, months_ahead + 1)},
+    ).scalar()
+    db.commit()
+    # Whatever is left there is outside every month (e.g. clock skew years off): worth a look
+    if db.execute(text("SELECT to_regclass('responses_default') IS NOT NULL")).scalar():
+        stray = db.execute(text("SELECT count(*) FROM responses_default")).scalar()
+        if stray:
+            print(f"responses_default holds {stray} rows outside the monthly partitions")
+    return created
+
+
+# Reflected column type -> Arrow type; UUIDs and anything unusual are archived as text
+def _arrow_type(column_type):
+    import pyarrow as pa
+
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return pa.string()
+    return {
+        int: pa.int64(), float: pa.float64(), bool: pa.bool_(), datetime: pa.timestamp("us"), date: pa.date32(),
+    }.get(python_type, pa.string())
+
+
+# Stream one partition into a zstd Parquet file (written to a temp name, renamed when complete)
+def write_partition_parquet(db: Session, name, path, batch_size=ARCHIVE_BATCH_SIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from sqlalchemy import MetaData, Table, select
+
+    table = Table(name, MetaData(), autoload_with=db.connection())
+    # Generated columns (the search vector) are derived data and not archived
+    columns = [column for column in table.columns if column.computed is None]
+    schema = pa.schema([(column.name, _arrow_type(column.type)) for column in columns])
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    written = 0
+    try:
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            result = db.execute(select(*columns).execution_options(stream_results=True, yield_per=batch_size))
+            for rows in result.partitions():
+                columns = list(zip(*rows))
+                arrays = [
+                    pa.array([None if v is None else str(v) for v in values] if field.type == pa.string() else values,
+                             type=field.type)
+                    for field, values in zip(schema, columns)
+                ]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                written += len(rows)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+
+# Archive then detach every partition that ends before the retention cutoff, one transaction each.
+# Rollups and comment clusters were built from these rows already and are kept.
+def archive_partitions(db: Session, retention_months=RESPONSE_RETENTION_MONTHS,
+                       archive_dir=RESPONSE_ARCHIVE_DIR, drop=RESPONSE_ARCHIVE_DROP):
+    if retention_months <= 0:
+        return []
+    cutoff = datetime.combine(add_months(db_now(db).date().replace(day=1), -retention_months), datetime.min.time())
+    archived = []
+    for name, lower, upper in list_partitions(db):
+        if upper > cutoff:
+            break
+        started = time.perf_counter()
+        path = os.path.join(archive_dir, f"{name}.parquet")
+        try:
+            # Blocks writes to the partition until it's detached, so the file has every row
+            db.execute(text(f'LOCK TABLE "{name}" IN SHARE MODE'))
+            rows = write_partition_parquet(db, name, path)
+            expected = db.execute(text(f'SELECT count(*) FROM "{name}"')).scalar()
+            if rows != expected:
+                raise RuntimeError(f"{name}: wrote {rows} rows to {path}, partition has {expected}")
+            db.execute(text(f'ALTER TABLE responses DETACH PARTITION "{name}"'))
+            # A kept table is renamed so the month's partition name is free again
+            db.execute(text(f'DROP TABLE "{name}"' if drop else f'ALTER TABLE "{name}" RENAME TO "{name}_archived"'))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        archived.append({
+            "partition": name, "from": lower.date().isoformat(), "to": upper.date().isoformat(), "rows": rows,
+            "file": path, "bytes": os.path.getsize(path), "dropped": drop,
+            "seconds": round(time.perf_counter() - started, 3),
+        })
+    return archived
+
+
+def maintain_partitions(db: Session):
+    if not is_partitioned(db):
+        return {"partitioned": False}
+    return {"partitioned": True, "created": ensure_partitions(db), "archived": archive_partitions(db)}
+
+
+class PartitionJob(PeriodicJob):
+    """Runs maintain_partitions every PARTITION_INTERVAL_SECONDS in a daemon thread."""
+
+    name = "partition-job"
+    failure = "Partition maintenance"
+
+    def __init__(self, interval=PARTITION_INTERVAL_SECONDS, session_factory=SessionLocal):
+        super().__init__(interval, session_factory)
+
+    def run_once(self, db):
+        return maintain_partitions(db)
+
+
+partition_job = PartitionJob()
+
+
+if __name__ == "__main__":
+    # Run from cron (e.g. daily): python -m app.services.partitions
+    db = SessionLocal()
+    try:
+        print(maintain_partitions(db))
+    finally:
+        db.close()
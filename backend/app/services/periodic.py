@@ -0,0 +1,51 @@
+# Shared loop for the background jobs (rollups, comment clusters, partitions, prompt scheduling)
+import threading
+from abc import ABC, abstractmethod
+from app.database import SessionLocal
+
+
+class PeriodicJob(ABC):
+    """Calls run_once(db) every `interval` seconds in a daemon thread, with a fresh session each time.
+    An interval of 0 disables the job; a failed run is rolled back, logged and retried next time."""
+
+    name = "periodic-job"  # thread name
+    failure = "Periodic job"  # logged as "<failure> failed, will retry: ..."
+
+    def __init__(self, interval, session_factory=SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def start(self):
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # One pass of the job; _run closes the session afterwards and rolls it back if this raises
+    @abstractmethod
+    def run_once(self, db):
+        ...
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = self.session_factory()
+            try:
+                self.run_once(db)
+            except Exception as e:
+                db.rollback()
+                print(f"{self.failure} failed, will retry: {e}")
+            finally:
+                db.close()
@@ -0,0 +1,480 @@
+# Server-driven prompt delivery: popups hold one SSE connection (GET /prompts/stream) and a single
+# scheduler thread decides who gets which question when, instead of every client polling on a timer.
+# Connection and fatigue state is per API process; a user's stream lives in exactly one of them.
+import asyncio
+import heapq
+import json
+import os
+import random
+import threading
+import time
+from datetime import timedelta
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+from app.crud import get_questions_by_type
+from app.database import SessionLocal, db_now, dialect_insert
+from app.models import PromptCampaign, PromptCampaignDelivery, Question, Response, User, UserQuestionState
+from app.services.metrics import registry
+from app.services.periodic import PeriodicJob
+from app.services.question_cache import question_catalog
+from app.services.selection import MAX_DEFERS, WeightedCatalog
+
+# Scheduler tick; 0 disables the scheduler and /prompts/stream answers 503 (popups fall back to their timer)
+PROMPT_TICK_SECONDS = float(os.getenv("PROMPT_TICK_SECONDS", "0"))
+# Minimum gap between two prompts to the same user
+PROMPT_INTERVAL_SECONDS = float(os.getenv("PROMPT_INTERVAL_SECONDS", "900"))
+# Every prompt in a row the user didn't answer doubles the gap, up to 2 ** PROMPT_MAX_BACKOFF times
+PROMPT_MAX_BACKOFF = int(os.getenv("PROMPT_MAX_BACKOFF", "3"))
+PROMPT_DAILY_LIMIT = int(os.getenv("PROMPT_DAILY_LIMIT", "8"))
+# A question pushed this recently (Question.last_used_at) is offered less, so the catalog rotates
+PROMPT_ROTATION_SECONDS = float(os.getenv("PROMPT_ROTATION_SECONDS", "3600"))
+PROMPT_HEARTBEAT_SECONDS = float(os.getenv("PROMPT_HEARTBEAT_SECONDS", "25"))
+# Users decided per database round trip
+PROMPT_BATCH_SIZE = int(os.getenv("PROMPT_BATCH_SIZE", "500"))
+# Events buffered per connection; a client that falls further behind loses prompts, not memory
+PROMPT_QUEUE_SIZE = int(os.getenv("PROMPT_QUEUE_SIZE", "8"))
+PROMPT_CAMPAIGN_HOURS = float(os.getenv("PROMPT_CAMPAIGN_HOURS", "24"))
+
+QUESTION_TYPES = ("comment", "emoji", "radio")
+HEARTBEAT = b": ping\n\n"
+# Sent once per connection: how long EventSource clients wait before reconnecting
+STREAM_PREAMBLE = b"retry: 5000\n\n"
+
+
+def encode_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(jsonable_encoder(data), separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class PromptBroker:
+    """Open SSE streams per user. Each idle stream is one coroutine parked on its own queue; the
+    scheduler thread hands a whole batch of events to the event loop in a single call."""
+
+    def __init__(self, queue_size=PROMPT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self.delivered = 0
+        self.dropped = 0
+
+    def connect(self, user_id):
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        with self._lock:
+            self._streams.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def disconnect(self, user_id, queue):
+        with self._lock:
+            queues = self._streams.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._streams[user_id]
+
+    def is_connected(self, user_id):
+        return user_id in self._streams
+
+    def connected_users(self):
+        with self._lock:
+            return list(self._streams)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(queues) for queues in self._streams.values())
+
+    # Thread-safe: [(user_id, event bytes)]
+    def send_many(self, events):
+        if events and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, events)
+
+    def broadcast(self, event):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._broadcast, event)
+
+    # Ends every open stream (on shutdown, so the server doesn't wait on idle connections)
+    def close(self):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._broadcast_close)
+
+    def _broadcast_close(self):
+        for queues in list(self._streams.values()):
+            for queue in queues:
+                while queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def _deliver(self, events):
+        for user_id, event in events:
+            for queue in self._streams.get(user_id, ()):
+                self._put(queue, event)
+
+    def _broadcast(self, event):
+        for queues in list(self._streams.values()):
+            for queue in queues:
+                self._put(queue, event)
+
+    def _put(self, queue, event):
+        try:
+            queue.put_nowait(event)
+            self.delivered += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class UserPacing:
+    def __init__(self, next_due):
+        self.next_due = next_due
+        self.last_prompt_at = None  # DB clock, compared with responses.submitted_at
+        self.ignored = 0
+        self.day = None
+        self.sent_today = 0
+
+
+class CampaignState:
+    def __init__(self, campaign):
+        self.campaign_id = campaign.campaign_id
+        self.question_id = campaign.question_id
+        self.department = campaign.department
+        self.send_rate = campaign.send_rate
+        self.tokens = 0.0
+        self.filled_at = time.monotonic()
+        self.seen = set()  # users already sent to or ruled out by this process
+
+    # Token bucket: send_rate per second, at most one second's worth banked. Below one per second the
+    # cap is a single prompt, otherwise the bucket would never reach a whole token
+    def refill(self, now):
+        self.tokens = min(max(1.0, self.send_rate), self.tokens + (now - self.filled_at) * self.send_rate)
+        self.filled_at = now
+
+
+class PromptScheduler(PeriodicJob):
+    """Picks due users off a heap ordered by their next allowed prompt, chooses a question with the
+    same fatigue-aware weights as /questions/{type}/next, pushes it and records Question.last_used_at.
+    Active campaigns are sent on the same tick at their own rate."""
+
+    name = "prompt-scheduler"
+    failure = "Prompt scheduling"
+
+    def __init__(self, broker, tick=PROMPT_TICK_SECONDS, session_factory=SessionLocal, rng=None):
+        super().__init__(tick, session_factory)
+        self.broker = broker
+        self.rng = rng or random.Random()
+        self._pacing = {}
+        self._due = []
+        self._campaigns = {}
+        self._lock = threading.Lock()
+        self._last_heartbeat = time.monotonic()
+        self._used = {}  # question_id -> last push from this process, ahead of the cached catalog
+        self.sent = {"scheduled": 0, "campaign": 0}
+
+    def stop(self, timeout=10):
+        super().stop(timeout)
+        self.broker.close()
+
+    # First prompt lands at a random point of the first interval, so a mass reconnect
+    # (e.g. after a deploy) doesn't turn into a burst
+    def register(self, user_id):
+        with self._lock:
+            pacing = self._pacing.get(user_id)
+            if pacing is None:
+                pacing = self._pacing[user_id] = UserPacing(time.monotonic() + self.rng.uniform(0, PROMPT_INTERVAL_SECONDS))
+                heapq.heappush(self._due, (pacing.next_due, user_id))
+
+    # Body of the streaming response; ends when the client disconnects
+    async def stream(self, user_id):
+        queue = self.broker.connect(user_id)
+        self.register(user_id)
+        try:
+            yield STREAM_PREAMBLE
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.broker.disconnect(user_id, queue)
+
+    def run_once(self, db: Session):
+        now = time.monotonic()
+        if now - self._last_heartbeat >= PROMPT_HEARTBEAT_SECONDS:
+            self.broker.broadcast(HEARTBEAT)
+            self._last_heartbeat = now
+        db_time = db_now(db)
+        sent = self.send_campaigns(db, now, db_time)
+        due = self._pop_due(now)
+        for start in range(0, len(due), PROMPT_BATCH_SIZE):
+            sent += self.send_scheduled(db, due[start:start + PROMPT_BATCH_SIZE], now, db_time)
+        return sent
+
+    # Due users still connected; users who left are forgotten (pacing restarts on reconnect)
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._due and self._due[0][0] <= now:
+                next_due, user_id = heapq.heappop(self._due)
+                pacing = self._pacing.get(user_id)
+                if pacing is None or pacing.next_due != next_due:
+                    continue
+                if not self.broker.is_connected(user_id):
+                    del self._pacing[user_id]
+                    continue
+                due.append(user_id)
+        return due
+
+    def _reschedule(self, user_id, next_due):
+        with self._lock:
+            pacing = self._pacing.get(user_id)
+            if pacing is not None:
+                pacing.next_due = next_due
+                heapq.heappush(self._due, (next_due, user_id))
+
+    def _catalog(self, db):
+        questions = []
+        for question_type in QUESTION_TYPES:
+            questions.extend(question_catalog.get(question_type, lambda: get_questions_by_type(db, question_type)).questions)
+        return questions
+
+    # Per-question weight from Question.last_used_at: recently pushed questions get as little as 10%
+    def _rotation_weights(self, questions, db_time):
+        weights = {}
+        for question in questions:
+            used = max(filter(None, (question["last_used_at"], self._used.get(question["question_id"]))), default=None)
+            if used is not None:
+                age = (db_time - used).total_seconds()
+                weights[question["question_id"]] = min(1.0, max(0.1, age / PROMPT_ROTATION_SECONDS))
+        return weights
+
+    # Fatigue: answered since the last prompt resets the backoff, otherwise it grows; daily cap on top.
+    # Deactivated (or unknown) users get nothing and are checked again an interval later.
+    def send_scheduled(self, db: Session, user_ids, now, db_time):
+        pacing = {user_id: self._pacing[user_id] for user_id in user_ids if user_id in self._pacing}
+        active = set(db.scalars(select(User.user_id).where(User.user_id.in_(list(pacing)), User.is_active.is_(True))))
+        for user_id in [user_id for user_id in pacing if user_id not in active]:
+            del pacing[user_id]
+            self._reschedule(user_id, now + PROMPT_INTERVAL_SECONDS)
+        since = min((p.last_prompt_at for p in pacing.values() if p.last_prompt_at is not None), default=None)
+        last_answer = {}
+        if since is not None:
+            last_answer = dict(db.execute(
+                select(Response.user_id, func.max(Response.submitted_at))
+                .where(Response.user_id.in_(list(pacing)), Response.submitted_at >= since)
+                .group_by(Response.user_id)
+            ).all())
+        questions = self._catalog(db)
+        catalog = WeightedCatalog(questions, self._rotation_weights(questions, db_time))
+        blocked, answered = self._user_history(db, list(pacing))
+        events, encoded = [], {}
+        for user_id, state in pacing.items():
+            if state.last_prompt_at is not None:
+                answered_at = last_answer.get(user_id)
+                state.ignored = 0 if answered_at is not None and answered_at >= state.last_prompt_at else state.ignored + 1
+            if state.day != db_time.date():
+                state.day, state.sent_today = db_time.date(), 0
+            question = None
+            if state.sent_today < PROMPT_DAILY_LIMIT:
+                question = catalog.choose(blocked.get(user_id, ()), answered.get(user_id, {}), self.rng)
+            if question is not None:
+                question_id = question["question_id"]
+                if question_id not in encoded:
+                    encoded[question_id] = encode_event("prompt", {"question": question}, str(question_id))
+                events.append((user_id, encoded[question_id]))
+                state.last_prompt_at = db_time
+                state.sent_today += 1
+            self._reschedule(user_id, now + PROMPT_INTERVAL_SECONDS * 2 ** min(state.ignored, PROMPT_MAX_BACKOFF))
+        self._mark_used(db, set(encoded), db_time)
+        self.broker.send_many(events)
+        self.sent["scheduled"] += len(events)
+        return len(events)
+
+    # Skipped/over-deferred questions and answer counts for a batch of users, one query each
+    def _user_history(self, db, user_ids):
+        blocked, answered = {}, {}
+        for user_id, question_id in db.execute(
+            select(UserQuestionState.user_id, UserQuestionState.question_id).where(
+                UserQuestionState.user_id.in_(user_ids),
+                or_(UserQuestionState.skipped.is_(True), UserQuestionState.defer_count >= MAX_DEFERS),
+            )
+        ):
+            blocked.setdefault(user_id, set()).add(question_id)
+        for user_id, question_id, count in db.execute(
+            select(Response.user_id, Response.question_id, func.count())
+            .where(Response.user_id.in_(user_ids))
+            .group_by(Response.user_id, Response.question_id)
+        ):
+            answered.setdefault(user_id, {})[question_id] = count
+        return blocked, answered
+
+    def _mark_used(self, db, question_ids, db_time):
+        if not question_ids:
+            return
+        db.execute(update(Question).where(Question.question_id.in_(question_ids)).values(last_used_at=db_time))
+        db.commit()
+        for question_id in question_ids:
+            self._used[question_id] = db_time
+
+    def _load_campaigns(self, db, db_time):
+        active = db.query(PromptCampaign).filter(
+            PromptCampaign.status == "active", PromptCampaign.ends_at > db_time,
+        ).all()
+        campaigns = {}
+        for campaign in active:
+            state = self._campaigns.get(campaign.campaign_id)
+            if state is None:
+                state = CampaignState(campaign)
+            state.send_rate = campaign.send_rate
+            campaigns[campaign.campaign_id] = state
+        self._campaigns = campaigns
+        return active
+
+    # Connected users who haven't had the campaign, up to the bucket's tokens. Deliveries are claimed
+    # with ON CONFLICT DO NOTHING, so a user is prompted once even with several API processes.
+    def send_campaigns(self, db: Session, now, db_time):
+        if not self._load_campaigns(db, db_time):
+            return 0
+        connected = self.broker.connected_users()
+        total = 0
+        for state in self._campaigns.values():
+            state.refill(now)
+            # Before claiming anything: a claimed delivery for a deleted question would never be sent
+            question = self._campaign_question(db, state.question_id)
+            if question is None:
+                continue
+            budget = int(state.tokens)
+            candidates = [user_id for user_id in connected if user_id not in state.seen]
+            claimed = []
+            for start in range(0, len(candidates), PROMPT_BATCH_SIZE):
+                if len(claimed) >= budget:
+                    break
+                batch = candidates[start:start + PROMPT_BATCH_SIZE]
+                eligible = self._campaign_audience(db, state, batch)
+                state.seen.update(user_id for user_id in batch if user_id not in eligible)
+                for user_id in batch:
+                    if len(claimed) >= budget:
+                        break
+                    if user_id in eligible and self._has_budget(user_id, db_time):
+                        claimed.append(user_id)
+            if not claimed:
+                continue
+            sent = self._claim_deliveries(db, state, claimed, db_time)
+            state.seen.update(claimed)
+            state.tokens -= len(sent)
+            event = encode_event("prompt", {"question": question, "campaign_id": state.campaign_id}, str(state.question_id))
+            for user_id in sent:
+                self._record_campaign_prompt(user_id, now, db_time)
+            db.execute(
+                update(PromptCampaign).where(PromptCampaign.campaign_id == state.campaign_id)
+                .values(sent_count=PromptCampaign.sent_count + len(sent))
+            )
+            self._mark_used(db, {state.question_id}, db_time)
+            self.broker.send_many([(user_id, event) for user_id in sent])
+            self.sent["campaign"] += len(sent)
+            total += len(sent)
+        return total
+
+    # In the campaign's department, and hasn't answered, skipped or given up on the question
+    def _campaign_audience(self, db, state, user_ids):
+        query = select(User.user_id).where(User.user_id.in_(user_ids), User.is_active.is_(True))
+        if state.department:
+            query = query.where(User.department == state.department)
+        eligible = set(db.scalars(query))
+        if eligible:
+            eligible -= set(db.scalars(
+                select(Response.user_id).where(Response.user_id.in_(eligible), Response.question_id == state.question_id)
+            ))
+            eligible -= set(db.scalars(
+                select(UserQuestionState.user_id).where(
+                    UserQuestionState.user_id.in_(eligible), UserQuestionState.question_id == state.question_id,
+                    or_(UserQuestionState.skipped.is_(True), UserQuestionState.defer_count >= MAX_DEFERS),
+                )
+            ))
+        return eligible
+
+    # Campaign prompts skip the interval but still count against the daily limit
+    def _has_budget(self, user_id, db_time):
+        pacing = self._pacing.get(user_id)
+        if pacing is None:
+            return False
+        return pacing.day != db_time.date() or pacing.sent_today < PROMPT_DAILY_LIMIT
+
+    def _claim_deliveries(self, db, state, user_ids, db_time):
+        statement = dialect_insert(db, PromptCampaignDelivery).values([
+            {"campaign_id": state.campaign_id, "user_id": user_id, "delivered_at": db_time} for user_id in user_ids
+        ]).on_conflict_do_nothing().returning(PromptCampaignDelivery.user_id)
+        sent = list(db.scalars(statement))
+        db.commit()
+        return sent
+
+    def _campaign_question(self, db, question_id):
+        row = db.query(*Question.__table__.columns).filter(Question.question_id == question_id).first()
+        return dict(row._mapping) if row is not None else None
+
+    # The regular schedule restarts from the campaign prompt
+    def _record_campaign_prompt(self, user_id, now, db_time):
+        with self._lock:
+            pacing = self._pacing.get(user_id)
+            if pacing is None:
+                return
+            if pacing.day != db_time.date():
+                pacing.day, pacing.sent_today = db_time.date(), 0
+            pacing.last_prompt_at = db_time
+            pacing.sent_today += 1
+            pacing.next_due = now + PROMPT_INTERVAL_SECONDS
+            heapq.heappush(self._due, (pacing.next_due, user_id))
+
+    def stats(self):
+        with self._lock:
+            waiting = len(self._pacing)
+        return {
+            "connections": self.broker.connection_count(),
+            "users": waiting,
+            "sent": dict(self.sent),
+            "delivered": self.broker.delivered,
+            "dropped": self.broker.dropped,
+            "campaigns": len(self._campaigns),
+        }
+
+
+def create_campaign(db: Session, question_id, send_rate, department=None, ends_at=None):
+    if ends_at is None:
+        ends_at = db_now(db) + timedelta(hours=PROMPT_CAMPAIGN_HOURS)
+    campaign = PromptCampaign(question_id=question_id, send_rate=send_rate, department=department, ends_at=ends_at)
+    db.add(campaign)
+    db.commit()
+    db.refresh(campaign)
+    return campaign
+
+
+def stop_campaign(db: Session, campaign_id):
+    campaign = db.get(PromptCampaign, campaign_id)
+    if campaign is None:
+        return None
+    campaign.status = "stopped"
+    db.commit()
+    db.refresh(campaign)
+    return campaign
+
+
+prompt_broker = PromptBroker()
+prompt_scheduler = PromptScheduler(prompt_broker)
+
+
+def _collect():
+    if not prompt_scheduler.enabled:
+        return []
+    stats = prompt_scheduler.stats()
+    return [
+        ("prompt_stream_connections", "gauge", "Open /prompts/stream connections", [({}, stats["connections"])]),
+        ("prompts_sent_total", "counter", "Prompts pushed by the scheduler", [
+            ({"kind": kind}, count) for kind, count in stats["sent"].items()
+        ]),
+        ("prompt_events_dropped_total", "counter", "Events dropped because a stream's queue was full", [({}, stats["dropped"])]),
+    ]
+
+
+registry.add_collector(_collect)
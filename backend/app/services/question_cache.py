@@ -0,0 +1,84 @@
+# In-process, versioned cache of the question catalog grouped by question_type
+import hashlib
+import os
+import threading
+import time
+import orjson
+from app.models import Question
+
+# Upper bound on staleness when another worker process wrote the questions
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+
+
+class CatalogEntry:
+    def __init__(self, questions, body, version):
+        self.questions = questions
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+
+class QuestionCatalogCache:
+    """Serialized question lists per type, dropped whenever questions are written."""
+
+    def __init__(self, ttl=CATALOG_CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self.entries.clear()
+
+    def _cached(self, question_type):
+        entry = self.entries.get(question_type)
+        if entry is not None and entry.version == self.version and time.monotonic() - entry.loaded_at < self.ttl:
+            return entry
+        return None
+
+    def _store(self, question_type, rows, version):
+        questions = [
+            {column.key: getattr(row, column.key) for column in Question.__table__.columns}
+            for row in rows
+        ]
+        body = dumps(questions)
+        entry = CatalogEntry(questions, body, version)
+        with self._lock:
+            # A write that raced with this load bumped the version; keep the entry stale
+            if version == self.version:
+                self.entries[question_type] = entry
+        return entry
+
+    # Returns the cached entry, calling load() (a DB query) only on a miss
+    def get(self, question_type, load):
+        entry = self._cached(question_type)
+        if entry is not None:
+            return entry
+        version = self.version
+        return self._store(question_type, load(), version)
+
+    # Same as get(), for an async loader
+    async def aget(self, question_type, load):
+        entry = self._cached(question_type)
+        if entry is not None:
+            return entry
+        version = self.version
+        return self._store(question_type, await load(), version)
+
+
+# Compact JSON bytes; UUIDs and datetimes are rendered natively by orjson
+def dumps(data):
+    return orjson.dumps(data)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+question_catalog = QuestionCatalogCache()
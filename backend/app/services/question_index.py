@@ -0,0 +1,253 @@
+# Persistent TF-IDF index over the question catalog
+# numpy/scipy/sklearn/joblib are imported on first use to keep app startup fast
+import hashlib
+import os
+import threading
+import time
+from sqlalchemy.orm import Session
+from app.models import Question
+
+ML_INDEX_PATH = os.getenv("ML_INDEX_PATH")
+# Refit vocabulary/IDF once this fraction of the catalog was added or edited since the last fit
+ML_INDEX_REFIT_RATIO = float(os.getenv("ML_INDEX_REFIT_RATIO", "0.2"))
+# Edits are written to ML_INDEX_PATH in the background, once this long after the last one
+ML_INDEX_SAVE_DELAY_SECONDS = float(os.getenv("ML_INDEX_SAVE_DELAY_SECONDS", "5"))
+# How often each process compares its index with the catalog, to pick up other workers' edits
+ML_INDEX_CHECK_SECONDS = float(os.getenv("ML_INDEX_CHECK_SECONDS", "60"))
+
+
+# Order-independent hash of the indexed ids and texts: equal digests mean the same catalog
+def catalog_digest(question_ids, question_texts):
+    digest = hashlib.sha256()
+    for question_id, text in sorted(zip(map(str, question_ids), question_texts)):
+        digest.update(question_id.encode() + b"\0" + text.encode() + b"\0")
+    return digest.hexdigest()[:32]
+
+
+class QuestionIndex:
+    """Question vectors (one L2-normalised TF-IDF row per question) kept warm between requests."""
+
+    def __init__(self):
+        self.vectorizer = None
+        self.matrix = None
+        self.question_ids = []
+        self.question_texts = []
+        self.positions = {}
+        self.changes_since_fit = 0
+        # Bumped by every edit, so ML pool workers holding their own copy know when to reload
+        self.version = 0
+        self.digest = catalog_digest([], [])
+        self._lock = threading.RLock()
+
+    @property
+    def is_built(self):
+        return self.vectorizer is not None or self.matrix is not None
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    # Fit vocabulary and IDF over the whole catalog
+    def build(self, question_ids, question_texts):
+        from scipy import sparse
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        question_ids, question_texts = list(question_ids), list(question_texts)
+        vectorizer, matrix = None, sparse.csr_matrix((len(question_ids), 0))
+        if question_ids:
+            vectorizer = TfidfVectorizer()
+            matrix = vectorizer.fit_transform(question_texts).tocsr()
+        with self._lock:
+            self.vectorizer = vectorizer
+            self.matrix = matrix
+            self.question_ids = question_ids
+            self.question_texts = question_texts
+            self.positions = {qid: pos for pos, qid in enumerate(question_ids)}
+            self.changes_since_fit = 0
+            self.digest = catalog_digest(question_ids, question_texts)
+
+    def build_from_db(self, db: Session):
+        rows = db.query(Question.question_id, Question.question_text).all()
+        self.build([row.question_id for row in rows], [row.question_text for row in rows])
+
+    # Add or replace a single question without refitting the vocabulary
+    def upsert(self, question_id, question_text):
+        from scipy import sparse
+
+        with self._lock:
+            if self.vectorizer is None:
+                self.build(self.question_ids + [question_id], self.question_texts + [question_text])
+                self.version += 1
+                return
+            row = self.vectorizer.transform([question_text]).tocsr()
+            pos = self.positions.get(question_id)
+            if pos is None:
+                self.matrix = sparse.vstack([self.matrix, row], format="csr")
+                self.positions[question_id] = len(self.question_ids)
+                self.question_ids.append(question_id)
+                self.question_texts.append(question_text)
+            else:
+                self.matrix = sparse.vstack([self.matrix[:pos], row, self.matrix[pos + 1:]], format="csr")
+                self.question_texts[pos] = question_text
+            self.changes_since_fit += 1
+            self.version += 1
+            self.digest = catalog_digest(self.question_ids, self.question_texts)
+            if self.changes_since_fit > ML_INDEX_REFIT_RATIO * len(self.question_ids):
+                self.build(self.question_ids, self.question_texts)
+
+    # Cosine similarity between the combined feedback vector and every question
+    def rank(self, feedback_texts, limit=5):
+        return self.rank_many([feedback_texts], limit)[0]
+
+    # Vectorised ranking for many feedback histories at once (one sparse product per call)
+    def rank_many(self, feedback_groups, limit=5):
+        import numpy as np
+        from scipy import sparse
+        from sklearn.preprocessing import normalize
+
+        with self._lock:
+            vectorizer, matrix, question_ids = self.vectorizer, self.matrix, self.question_ids
+        results = [[] for _ in feedback_groups]
+        limit = min(limit, len(question_ids))
+        if vectorizer is None or limit <= 0:
+            return results
+        texts = [text for group in feedback_groups for text in group]
+        if not texts:
+            return results
+        # Sum each group's feedback rows into one profile row via an indicator matrix
+        owners = np.repeat(np.arange(len(feedback_groups)), [len(group) for group in feedback_groups])
+        indicator = sparse.csr_matrix(
+            (np.ones(len(texts)), (owners, np.arange(len(texts)))), shape=(len(feedback_groups), len(texts))
+        )
+        profiles = normalize(indicator @ vectorizer.transform(texts))
+        scores = (profiles @ matrix.T).toarray()
+        for row, group_scores in enumerate(scores):
+            if profiles.indptr[row] == profiles.indptr[row + 1]:
+                continue
+            top = np.argpartition(-group_scores, limit - 1)[:limit]
+            top = top[np.argsort(-group_scores[top])]
+            results[row] = [(question_ids[pos], float(group_scores[pos])) for pos in top]
+        return results
+
+    def save(self, path):
+        with self._lock:
+            state = {
+                "vectorizer": self.vectorizer,
+                "matrix": self.matrix,
+                "question_ids": self.question_ids,
+                "question_texts": self.question_texts,
+                "changes_since_fit": self.changes_since_fit,
+                "digest": self.digest,
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        import joblib
+
+        tmp_path = f"{path}.tmp"
+        joblib.dump(state, tmp_path)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        if not path or not os.path.exists(path):
+            return False
+        import joblib
+
+        state = joblib.load(path)
+        with self._lock:
+            self.vectorizer = state["vectorizer"]
+            self.matrix = state["matrix"]
+            self.question_ids = state["question_ids"]
+            self.question_texts = state["question_texts"]
+            self.positions = {qid: pos for pos, qid in enumerate(self.question_ids)}
+            self.changes_since_fit = state["changes_since_fit"]
+            self.digest = state.get("digest") or catalog_digest(self.question_ids, self.question_texts)
+        return True
+
+
+class IndexSaver:
+    """Writes the index to ML_INDEX_PATH off the request path: one save per burst of edits."""
+
+    def __init__(self, index, path=ML_INDEX_PATH, delay=ML_INDEX_SAVE_DELAY_SECONDS):
+        self.index = index
+        self.path = path
+        self.delay = delay
+        self._timer = None
+        self._lock = threading.Lock()
+        self.saves = 0
+        self.failures = 0
+
+    def schedule(self):
+        if not self.path:
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.save)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def save(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.index.save(self.path)
+            self.saves += 1
+        except Exception as e:
+            self.failures += 1
+            print(f"Question index save failed, will retry: {e}")
+            self.schedule()
+
+    # Writes a pending save right away (on shutdown)
+    def flush(self):
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+
+question_index = QuestionIndex()
+index_saver = IndexSaver(question_index)
+_build_lock = threading.Lock()
+_checked_at = float("-inf")  # no catalog check yet, however the index was built
+
+# Shared index, loaded from disk or built from the DB on first use. Afterwards, every
+# ML_INDEX_CHECK_SECONDS, the catalog is compared by digest and the index rebuilt when another
+# worker process edited questions.
+def get_question_index(db: Session):
+    global _checked_at
+    if question_index.is_built and time.monotonic() - _checked_at < ML_INDEX_CHECK_SECONDS:
+        return question_index
+    with _build_lock:
+        if question_index.is_built and time.monotonic() - _checked_at < ML_INDEX_CHECK_SECONDS:
+            return question_index
+        if not question_index.is_built:
+            question_index.load(ML_INDEX_PATH)
+        rows = db.query(Question.question_id, Question.question_text).all()
+        if not question_index.is_built or question_index.digest != catalog_digest(
+            [row.question_id for row in rows], [row.question_text for row in rows]
+        ):
+            question_index.build([row.question_id for row in rows], [row.question_text for row in rows])
+            question_index.version += 1
+            index_saver.schedule()
+        _checked_at = time.monotonic()
+    return question_index
+
+# Keep the index in step with question writes; the file is written later, in the background
+def on_question_saved(question: Question):
+    if not question_index.is_built:
+        return
+    question_index.upsert(question.question_id, question.question_text)
+    index_saver.schedule()
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        question_index.build_from_db(db)
+    finally:
+        db.close()
+    if ML_INDEX_PATH:
+        question_index.save(ML_INDEX_PATH)
+    print(f"Indexed {len(question_index)} questions")
@@ -0,0 +1,184 @@
+# Incremental response rollups and the queries behind /insights
+import os
+import time
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import Date, case, func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, db_now, dialect_insert
+from app.models import Question, Response, User, ResponseRollup, ResponseRadioRollup, JobWatermark
+from app.services.org_hierarchy import subtree_ids
+from app.services.periodic import PeriodicJob
+
+ROLLUP_JOB = "response_rollups"
+# Only roll up rows older than this, so late commits have landed
+ROLLUP_LAG_SECONDS = int(os.getenv("ROLLUP_LAG_SECONDS", "300"))
+ROLLUP_INTERVAL_SECONDS = int(os.getenv("ROLLUP_INTERVAL_SECONDS", "0"))
+
+ROLLUP_KEYS = ("day", "question_id", "category", "department", "band", "manager_id")
+ROLLUP_MEASURES = (
+    "response_count", "emoji_count", "emoji_sum", "emoji_1", "emoji_2", "emoji_3", "emoji_4", "emoji_5",
+    "sentiment_positive", "sentiment_neutral", "sentiment_negative",
+)
+SENTIMENT_MEASURES = ROLLUP_MEASURES[-3:]
+
+
+def _count_if(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+# Grouping columns shared by both rollup tables; anonymous responses land under ''
+def _key_columns():
+    return [
+        func.date(Response.submitted_at, type_=Date).label("day"),
+        Response.question_id.label("question_id"),
+        Question.category.label("category"),
+        func.coalesce(User.department, "").label("department"),
+        func.coalesce(User.band, "").label("band"),
+        func.coalesce(User.manager_id, "").label("manager_id"),
+    ]
+
+# Rows whose `column` (submitted_at, or sentiment_scored_at) falls in (lower, upper]
+def _window(query, lower, upper, column=Response.submitted_at):
+    query = query.join(Question, Question.question_id == Response.question_id).outerjoin(
+        User, User.user_id == Response.user_id
+    ).filter(column <= upper)
+    if lower is not None:
+        query = query.filter(column > lower)
+    return query
+
+def _sentiment_counts(unscored_only):
+    # Labels written by the sentiment worker are folded in by sentiment_scored_at instead (below),
+    # whenever they arrive; only labels present from the start count with the response itself
+    counted = Response.sentiment_scored_at.is_(None) if unscored_only else True
+    return [
+        _count_if((Response.sentiment == label) & counted).label(f"sentiment_{label.lower()}")
+        for label in ("Positive", "Neutral", "Negative")
+    ]
+
+# Add deltas onto existing rollup rows
+def _upsert_deltas(db: Session, model, key_names, measure_names, rows):
+    if not rows:
+        return
+    stmt = dialect_insert(db, model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[getattr(model, name) for name in key_names],
+        set_={name: getattr(model, name) + getattr(stmt.excluded, name) for name in measure_names},
+    )
+    db.execute(stmt, rows)
+
+# Fold every response submitted since the last watermark into the rollups, in one transaction
+def refresh_rollups(db: Session, lag_seconds=ROLLUP_LAG_SECONDS):
+    started = time.perf_counter()
+    upper = db_now(db) - timedelta(seconds=lag_seconds)
+    # Row lock keeps two refreshers from folding the same window twice
+    lower = db.query(JobWatermark.watermark).filter(JobWatermark.job_name == ROLLUP_JOB).with_for_update().scalar()
+    if lower is not None and lower >= upper:
+        return {"rows": 0, "scored": 0, "groups": 0, "seconds": 0.0}
+
+    keys = _key_columns()
+    measures = _window(db.query(
+        *keys,
+        func.count().label("response_count"),
+        func.count(Response.response_emoji).label("emoji_count"),
+        func.coalesce(func.sum(Response.response_emoji), 0).label("emoji_sum"),
+        *[_count_if(Response.response_emoji == value).label(f"emoji_{value}") for value in range(1, 6)],
+        *_sentiment_counts(unscored_only=True),
+    ), lower, upper).group_by(*keys).all()
+    # Rows scored in the window, submitted in it or earlier (scoring never precedes submission)
+    scored = _window(db.query(*keys, *_sentiment_counts(unscored_only=False)), lower, upper, Response.sentiment_scored_at)
+    scored = scored.filter(Response.sentiment.isnot(None)).group_by(*keys).all()
+    radio = _window(db.query(
+        *keys, Response.response_radio.label("option"), func.count().label("response_count"),
+    ), lower, upper).filter(Response.response_radio.isnot(None)).group_by(*keys, Response.response_radio).all()
+
+    _upsert_deltas(db, ResponseRollup, ROLLUP_KEYS, ROLLUP_MEASURES, [row._asdict() for row in measures])
+    _upsert_deltas(db, ResponseRollup, ROLLUP_KEYS, SENTIMENT_MEASURES, [row._asdict() for row in scored])
+    _upsert_deltas(db, ResponseRadioRollup, ROLLUP_KEYS + ("option",), ("response_count",), [row._asdict() for row in radio])
+
+    stmt = dialect_insert(db, JobWatermark).values(job_name=ROLLUP_JOB, watermark=upper)
+    db.execute(stmt.on_conflict_do_update(index_elements=[JobWatermark.job_name], set_={"watermark": upper}))
+    db.commit()
+    return {
+        "rows": sum(row.response_count for row in measures),
+        "scored": sum(sum(getattr(row, name) for name in SENTIMENT_MEASURES) for row in scored),
+        "groups": len(measures),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+INSIGHT_GROUPS = ROLLUP_KEYS
+INSIGHT_FILTERS = ("question_id", "category", "department", "band", "manager_id")
+
+def _filtered(query, model, filters, start, end):
+    for name in INSIGHT_FILTERS:
+        if filters.get(name) is not None:
+            query = query.filter(getattr(model, name) == filters[name])
+    # Everyone under a manager, at any depth: rollups are keyed by direct manager, so this is a
+    # semi-join of manager_id against the closure's descendants of that manager
+    if filters.get("manager_subtree") is not None:
+        query = query.filter(model.manager_id.in_(subtree_ids(filters["manager_subtree"])))
+    if start is not None:
+        query = query.filter(model.day >= start)
+    if end is not None:
+        query = query.filter(model.day <= end)
+    return query
+
+# Aggregate rollup rows for a dashboard; never touches the responses table
+def query_insights(db: Session, group_by=(), start=None, end=None, **filters):
+    group_columns = [getattr(ResponseRollup, name) for name in group_by]
+    rows = _filtered(db.query(
+        *group_columns, *[func.sum(getattr(ResponseRollup, name)).label(name) for name in ROLLUP_MEASURES],
+    ), ResponseRollup, filters, start, end).group_by(*group_columns).all()
+
+    radio_columns = [getattr(ResponseRadioRollup, name) for name in group_by]
+    radio = defaultdict(dict)
+    for row in _filtered(db.query(
+        *radio_columns, ResponseRadioRollup.option, func.sum(ResponseRadioRollup.response_count).label("count"),
+    ), ResponseRadioRollup, filters, start, end).group_by(*radio_columns, ResponseRadioRollup.option):
+        radio[tuple(row[:len(group_by)])][row.option] = int(row.count)
+
+    groups = []
+    for row in rows:
+        if not row.response_count:
+            continue
+        key = tuple(row[:len(group_by)])
+        groups.append({
+            "group": dict(zip(group_by, key)),
+            "responses": int(row.response_count),
+            "emoji": {
+                "count": int(row.emoji_count),
+                "average": round(row.emoji_sum / row.emoji_count, 3) if row.emoji_count else None,
+                "histogram": {str(value): int(getattr(row, f"emoji_{value}")) for value in range(1, 6)},
+            },
+            "sentiment": {
+                "Positive": int(row.sentiment_positive),
+                "Neutral": int(row.sentiment_neutral),
+                "Negative": int(row.sentiment_negative),
+            },
+            "radio": radio.get(key, {}),
+        })
+    return groups
+
+
+class RollupJob(PeriodicJob):
+    """Runs refresh_rollups every ROLLUP_INTERVAL_SECONDS in a daemon thread."""
+
+    name = "rollup-job"
+    failure = "Rollup refresh"
+
+    def __init__(self, interval=ROLLUP_INTERVAL_SECONDS, session_factory=SessionLocal):
+        super().__init__(interval, session_factory)
+
+    def run_once(self, db):
+        return refresh_rollups(db)
+
+
+rollup_job = RollupJob()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(refresh_rollups(db))
+    finally:
+        db.close()
@@ -0,0 +1,120 @@
+# Offline batch ranking into ml_question_scores
+import os
+import time
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import exists, func
+from sqlalchemy.orm import Session
+from app.database import db_now, dialect_insert
+from app.models import User, Question, Response, MLQuestionScore, MLUserWatermark
+from app.services.question_index import get_question_index
+from app.services.ml import get_ml_selected_questions
+
+SCORING_CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", "200"))
+# How many ranked questions are stored per user
+SCORES_PER_USER = int(os.getenv("SCORES_PER_USER", "50"))
+# Only score on rows older than this, so responses still being committed aren't passed over
+SCORING_LAG_SECONDS = int(os.getenv("SCORING_LAG_SECONDS", "300"))
+
+# Active users with a text response in (their watermark, upper]. Only rows newer than the oldest
+# watermark are read; users who were never scored are found from the users side instead.
+def users_needing_scores(db: Session, upper):
+    has_text = Response.response_text.isnot(None), Response.submitted_at <= upper
+    user_ids = set()
+    lower = db.query(func.min(MLUserWatermark.scored_at)).scalar()
+    if lower is not None:
+        user_ids.update(row.user_id for row in (
+            db.query(Response.user_id).distinct()
+            .join(MLUserWatermark, MLUserWatermark.user_id == Response.user_id)
+            .join(User, User.user_id == Response.user_id)
+            .filter(
+                User.is_active.is_(True), *has_text,
+                Response.submitted_at > lower, Response.submitted_at > MLUserWatermark.scored_at,
+            )
+        ))
+    user_ids.update(row.user_id for row in (
+        db.query(User.user_id)
+        .outerjoin(MLUserWatermark, MLUserWatermark.user_id == User.user_id)
+        .filter(
+            User.is_active.is_(True), MLUserWatermark.user_id.is_(None),
+            exists().where(Response.user_id == User.user_id, *has_text),
+        )
+    ))
+    return sorted(user_ids, key=str)
+
+# Replace the stored ranking for one chunk of users
+def score_user_chunk(db: Session, index, user_ids, scored_at):
+    histories = defaultdict(list)
+    for row in (
+        db.query(Response.user_id, Response.response_text)
+        .filter(Response.user_id.in_(user_ids), Response.response_text.isnot(None))
+        .all()
+    ):
+        histories[row.user_id].append(row.response_text)
+
+    rankings = index.rank_many([histories[user_id] for user_id in user_ids], SCORES_PER_USER)
+    rows = [
+        {"user_id": user_id, "question_id": question_id, "relevance_score": score, "updated_at": scored_at}
+        for user_id, ranking in zip(user_ids, rankings)
+        for question_id, score in ranking
+    ]
+
+    db.query(MLQuestionScore).filter(MLQuestionScore.user_id.in_(user_ids)).delete(synchronize_session=False)
+    if rows:
+        db.execute(MLQuestionScore.__table__.insert(), rows)
+    # Every user in the chunk counts as scored, also the ones left without rows (no overlap)
+    stmt = dialect_insert(db, MLUserWatermark)
+    db.execute(
+        stmt.on_conflict_do_update(index_elements=[MLUserWatermark.user_id], set_={"scored_at": stmt.excluded.scored_at}),
+        [{"user_id": user_id, "scored_at": scored_at} for user_id in user_ids],
+    )
+    db.commit()
+    return len(rows)
+
+# Score every user with new feedback since their last run
+def run_batch_scoring(db: Session, chunk_size=SCORING_CHUNK_SIZE, lag_seconds=SCORING_LAG_SECONDS):
+    started = time.perf_counter()
+    # The DB clock minus the lag, so the watermark compares cleanly with submitted_at
+    scored_at = db_now(db) - timedelta(seconds=lag_seconds)
+    user_ids = users_needing_scores(db, scored_at)
+    index = get_question_index(db)
+
+    scores_written = 0
+    for offset in range(0, len(user_ids), chunk_size):
+        scores_written += score_user_chunk(db, index, user_ids[offset:offset + chunk_size], scored_at)
+
+    return {
+        "users_scored": len(user_ids),
+        "scores_written": scores_written,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+# Serving path: the user's precomputed top-k in one indexed lookup
+def get_top_questions(db: Session, user_id, k=5):
+    questions = (
+        db.query(*Question.__table__.columns)
+        .join(MLQuestionScore, MLQuestionScore.question_id == Question.question_id)
+        .filter(MLQuestionScore.user_id == user_id)
+        .order_by(MLQuestionScore.relevance_score.desc())
+        .limit(k)
+        .all()
+    )
+    if questions:
+        return questions
+
+    # Scored, but nothing matched: the default order, as inline ranking would give
+    if db.query(MLUserWatermark.user_id).filter(MLUserWatermark.user_id == user_id).first() is not None:
+        return db.query(Question).order_by(Question.difficulty_level).limit(k).all()
+
+    # Not scored yet: rank inline until the next batch run
+    return get_ml_selected_questions(db, user_id, k)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(run_batch_scoring(db))
+    finally:
+        db.close()
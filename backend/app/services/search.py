@@ -0,0 +1,219 @@
+# Ranked full-text search over comment responses. Postgres: the generated responses.search_vector
+# column (database/schema.sql) behind a GIN index. SQLite: an FTS5 table kept in sync by triggers,
+# created on first use, as a local stand-in. Both stem English words and rank by relevance.
+import html
+import os
+import re
+import threading
+from sqlalchemy import Float, column, func, literal_column, select, table, text, tuple_
+from sqlalchemy.orm import Session
+from app.models import Question, Response, User
+from app.services.pagination import PAGE_SIZE, cursor_scope, keyset_page
+
+SEARCH_CONFIG = "english"  # must match the search_vector definition in schema.sql
+SEARCH_FACET_SIZE = int(os.getenv("SEARCH_FACET_SIZE", "10"))
+SEARCH_SNIPPET_WORDS = int(os.getenv("SEARCH_SNIPPET_WORDS", "24"))
+SEARCH_SORTS = ("rank", "recent")
+FACETS = ("question", "department", "sentiment")
+
+# Highlight markers: the text is HTML-escaped afterwards, then these become <mark> tags
+_OPEN, _CLOSE = "\x02", "\x03"
+QUERY_TERM_RE = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+responses_fts = table("responses_fts", column("rowid"), column("response_text"))
+
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS responses_fts USING fts5("
+    "response_text, content='responses', content_rowid='rowid', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS responses_fts_insert AFTER INSERT ON responses BEGIN "
+    "INSERT INTO responses_fts(rowid, response_text) VALUES (new.rowid, new.response_text); END",
+    "CREATE TRIGGER IF NOT EXISTS responses_fts_delete AFTER DELETE ON responses BEGIN "
+    "INSERT INTO responses_fts(responses_fts, rowid, response_text) VALUES ('delete', old.rowid, old.response_text); END",
+    "CREATE TRIGGER IF NOT EXISTS responses_fts_update AFTER UPDATE OF response_text ON responses BEGIN "
+    "INSERT INTO responses_fts(responses_fts, rowid, response_text) VALUES ('delete', old.rowid, old.response_text); "
+    "INSERT INTO responses_fts(rowid, response_text) VALUES (new.rowid, new.response_text); END",
+)
+
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def highlight(snippet):
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+# FTS5 form of the web-search syntax Postgres parses natively: words are ANDed, "quoted phrases", OR, -excluded
+def fts5_query(q):
+    include, exclude = [], []
+    for negated, phrase, word in QUERY_TERM_RE.findall(q):
+        term = phrase if phrase else word
+        if not phrase and term.upper() == "OR":
+            if include and include[-1] != "OR":
+                include.append("OR")
+            continue
+        if not phrase and term.startswith("-") and len(term) > 1:
+            negated, term = "-", term[1:]
+        term = term.strip()
+        if not term:
+            continue
+        quoted = '"' + term.replace('"', '""') + '"'
+        (exclude if negated else include).append(quoted)
+    while include and include[-1] == "OR":
+        include.pop()
+    if not include:
+        return None
+    return " ".join(include) + "".join(f" NOT {term}" for term in exclude)
+
+
+# --- SQLite stand-in ---
+def ensure_sqlite_fts(db: Session):
+    bind = db.get_bind()
+    if bind.url in _ready:
+        return
+    with _ready_lock:
+        exists = db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'responses_fts'")).first()
+        for statement in SQLITE_FTS_DDL:
+            db.execute(text(statement))
+        if not exists:
+            db.execute(text("INSERT INTO responses_fts(responses_fts) VALUES ('rebuild')"))
+        db.commit()
+        _ready.add(bind.url)
+
+
+# --- Postgres ---
+_vector_column = {}
+
+
+# Falls back to computing the vector per row (no index) on databases created without schema.sql
+def pg_vector(db: Session):
+    bind = db.get_bind()
+    if bind.url not in _vector_column:
+        _vector_column[bind.url] = bool(db.execute(text(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = 'responses' AND column_name = 'search_vector'"
+        )).first())
+    if _vector_column[bind.url]:
+        return literal_column("responses.search_vector")
+    return func.to_tsvector(literal_column(f"'{SEARCH_CONFIG}'"), func.coalesce(Response.response_text, ""))
+
+
+def _filters(question_id, department, sentiment, start, end):
+    where = []
+    if question_id is not None:
+        where.append(Response.question_id == question_id)
+    if department is not None:
+        where.append(User.department == department)
+    if sentiment is not None:
+        where.append(Response.sentiment == sentiment)
+    if start is not None:
+        where.append(Response.submitted_at >= start)
+    if end is not None:
+        where.append(Response.submitted_at < end)
+    return where
+
+
+# Matching condition, relevance expression (higher is better) and FROM clause per dialect; None
+# when the query has nothing to look for (only exclusions would match, unranked, almost every row)
+def _match(db: Session, q):
+    match = fts5_query(q)
+    if match is None:
+        return None
+    if db.get_bind().dialect.name == "sqlite":
+        ensure_sqlite_fts(db)
+        source = Response.__table__.join(responses_fts, responses_fts.c.rowid == literal_column("responses.rowid"))
+        source = source.outerjoin(User, User.user_id == Response.user_id)
+        condition = literal_column("responses_fts").op("MATCH")(match)
+        return condition, -func.bm25(literal_column("responses_fts")), source
+    tsquery = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), q)
+    vector = pg_vector(db)
+    source = Response.__table__.outerjoin(User, User.user_id == Response.user_id)
+    return vector.op("@@")(tsquery), func.ts_rank_cd(vector, tsquery), source
+
+
+# Highlighted fragments for one page of hits only (never for the whole match set)
+def _snippets(db: Session, q, response_ids):
+    if not response_ids:
+        return {}
+    if db.get_bind().dialect.name == "sqlite":
+        snippet = func.snippet(literal_column("responses_fts"), 0, _OPEN, _CLOSE, "…", SEARCH_SNIPPET_WORDS)
+        rows = db.execute(
+            select(Response.response_id, snippet)
+            .select_from(Response.__table__.join(responses_fts, responses_fts.c.rowid == literal_column("responses.rowid")))
+            .where(literal_column("responses_fts").op("MATCH")(fts5_query(q)), Response.response_id.in_(response_ids))
+        )
+    else:
+        options = (
+            f"StartSel={_OPEN}, StopSel={_CLOSE}, MaxWords={SEARCH_SNIPPET_WORDS}, "
+            f"MinWords={max(1, SEARCH_SNIPPET_WORDS // 2)}, MaxFragments=2, FragmentDelimiter=\" … \""
+        )
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), q)
+        rows = db.execute(
+            select(Response.response_id, func.ts_headline(literal_column(f"'{SEARCH_CONFIG}'"), Response.response_text, tsquery, options))
+            .where(Response.response_id.in_(response_ids))
+        )
+    return {response_id: highlight(snippet) for response_id, snippet in rows}
+
+
+# Total hits and the top values per facet, in one pass over the matches
+def _facets(db: Session, condition, source, where):
+    keys = {"question": Response.question_id, "department": User.department, "sentiment": Response.sentiment}
+    counts = {name: {} for name in FACETS}
+    total = 0
+    if db.get_bind().dialect.name == "sqlite":
+        for name, key in keys.items():
+            for value, count in db.execute(select(key, func.count()).select_from(source).where(condition, *where).group_by(key)):
+                counts[name][value] = count
+        total = sum(counts["sentiment"].values())
+    else:
+        groupings = [func.grouping(key).label(f"g_{name}") for name, key in keys.items()]
+        stmt = (
+            select(*groupings, *keys.values(), func.count())
+            .select_from(source).where(condition, *where)
+            .group_by(func.grouping_sets(*[tuple_(key) for key in keys.values()], tuple_()))
+        )
+        for row in db.execute(stmt):
+            flags, values, count = row[:3], row[3:6], row[6]
+            if all(flags):
+                total = count
+                continue
+            name = FACETS[list(flags).index(0)]
+            counts[name][values[FACETS.index(name)]] = count
+    facets = {}
+    for name, values in counts.items():
+        top = sorted(values.items(), key=lambda item: (-item[1], str(item[0])))[:SEARCH_FACET_SIZE]
+        facets[name] = [{"value": value, "count": count} for value, count in top]
+    if facets["question"]:
+        texts = dict(db.execute(
+            select(Question.question_id, Question.question_text)
+            .where(Question.question_id.in_([entry["value"] for entry in facets["question"]]))
+        ).all())
+        for entry in facets["question"]:
+            entry["question_text"] = texts.get(entry["value"])
+    return total, facets
+
+
+# One page of hits, best first (or newest first with sort="recent"); total and facets on the first page
+def search_responses(db: Session, q, question_id=None, department=None, sentiment=None, start=None, end=None,
+                     sort="rank", cursor=None, limit=PAGE_SIZE):
+    matched = _match(db, q)
+    if matched is None:
+        return {"total": 0, "items": [], "facets": {name: [] for name in FACETS}, "next_cursor": None}
+    condition, relevance, source = matched
+    where = _filters(question_id, department, sentiment, start, end)
+    rank = relevance.cast(Float).label("rank")
+    columns = [
+        Response.response_id, Response.question_id, Response.user_id, User.department, Response.sentiment,
+        Response.submitted_at, rank,
+    ]
+    keys = (rank, Response.response_id) if sort == "rank" else (Response.submitted_at, Response.response_id)
+    scope = cursor_scope(q=q, question_id=question_id, department=department, sentiment=sentiment,
+                         start=start, end=end, sort=sort)
+    page = keyset_page(db, columns, keys, [condition, *where], scope, cursor, limit, descending=True, select_from=source)
+    snippets = _snippets(db, q, [item["response_id"] for item in page["items"]])
+    for item in page["items"]:
+        item["snippet"] = snippets.get(item["response_id"])
+    result = {"total": None, "items": page["items"], "facets": None, "next_cursor": page["next_cursor"]}
+    if cursor is None:
+        result["total"], result["facets"] = _facets(db, condition, source, where)
+    return result
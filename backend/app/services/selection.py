@@ -0,0 +1,73 @@
+# Server-side "next question" selection
+import random
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+from app.models import Response, UserQuestionState
+
+MAX_DEFERS = 3
+
+# How often the user answered each question, read through idx_responses_user
+def answered_counts_query(user_id):
+    return (
+        select(Response.question_id, func.count().label("answered"))
+        .where(Response.user_id == user_id)
+        .group_by(Response.question_id)
+    )
+
+# Questions the user skipped or deferred too often (index-only scan on the state table)
+def blocked_question_ids_query(user_id):
+    return select(UserQuestionState.question_id).where(
+        UserQuestionState.user_id == user_id,
+        or_(UserQuestionState.skipped.is_(True), UserQuestionState.defer_count >= MAX_DEFERS),
+    )
+
+def answered_counts(db: Session, user_id):
+    return {row.question_id: row.answered for row in db.execute(answered_counts_query(user_id))}
+
+def blocked_question_ids(db: Session, user_id):
+    return {row.question_id for row in db.execute(blocked_question_ids_query(user_id))}
+
+# Fatigue-aware weighted sampling over the cached catalog
+def pick_next_question(db: Session, questions, user_id=None, rng=random):
+    if not questions:
+        return None
+    if user_id is None:
+        return rng.choice(questions)
+    return choose_question(questions, blocked_question_ids(db, user_id), answered_counts(db, user_id), rng)
+
+def choose_question(questions, blocked, answered, rng=random):
+    eligible, weights = [], []
+    for question in questions:
+        if question["question_id"] in blocked:
+            continue
+        eligible.append(question)
+        weights.append(1.0 / (1 + answered.get(question["question_id"], 0)) ** 2)
+    if not eligible:
+        return None
+    return rng.choices(eligible, weights=weights, k=1)[0]
+
+
+class WeightedCatalog:
+    """choose_question for many users over one catalog: the per-question weights (times an optional
+    scale) are built once, and each pick only adjusts the few questions the user answered or blocked."""
+
+    def __init__(self, questions, scale=None):
+        self.questions = questions
+        self.positions = {question["question_id"]: i for i, question in enumerate(questions)}
+        self.weights = [scale.get(question["question_id"], 1.0) if scale else 1.0 for question in questions]
+
+    def choose(self, blocked, answered, rng=random):
+        if not self.questions:
+            return None
+        weights = self.weights[:]
+        for question_id, count in answered.items():
+            i = self.positions.get(question_id)
+            if i is not None:
+                weights[i] /= (1 + count) ** 2
+        for question_id in blocked:
+            i = self.positions.get(question_id)
+            if i is not None:
+                weights[i] = 0.0
+        if not any(weights):
+            return None
+        return rng.choices(self.questions, weights=weights, k=1)[0]
@@ -0,0 +1,191 @@
+# Background sentiment scoring for submitted responses
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from sqlalchemy import func, update
+from app.database import SessionLocal
+from app.models import Response
+from app.services.ml_executor import ml_executor
+
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "256"))
+SENTIMENT_FLUSH_SECONDS = float(os.getenv("SENTIMENT_FLUSH_SECONDS", "1.0"))
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "10000"))
+SENTIMENT_QUEUE_SIZE = int(os.getenv("SENTIMENT_QUEUE_SIZE", "50000"))
+
+
+def text_key(text):
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class SentimentWorker:
+    """Scores queued responses in batches and writes labels back with bulk UPDATEs."""
+
+    def __init__(self, session_factory=SessionLocal, batch_size=SENTIMENT_BATCH_SIZE,
+                 flush_seconds=SENTIMENT_FLUSH_SECONDS, cache_size=SENTIMENT_CACHE_SIZE):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.cache_size = cache_size
+        self.queue = queue.Queue(maxsize=SENTIMENT_QUEUE_SIZE)
+        self.cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.rows_scored = 0
+        self.rows_failed = 0
+        self.cache_hits = 0
+        self.seconds_busy = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Called on the request path: never blocks, rows dropped on overflow are left for backfill
+    def submit(self, response_id, text):
+        if not text:
+            return
+        try:
+            self.queue.put_nowait((response_id, text))
+        except queue.Full:
+            pass
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sentiment-worker", daemon=True)
+        self._thread.start()
+
+    # Drains whatever is already queued before returning
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # A failed batch (scoring or the write) is dropped and counted; its rows keep sentiment NULL
+    # for the backfill, and the thread carries on with the next batch
+    def _run(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.process(batch)
+            except Exception as e:
+                self.rows_failed += len(batch)
+                print(f"Sentiment batch of {len(batch)} failed, left for backfill: {e}")
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.flush_seconds)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    # Memoised by normalised-text hash: repeated answers ("ok", "good") are scored once
+    def score(self, text):
+        return self.score_many([text])[0]
+
+    # Cache hits are answered here, the distinct misses are scored in one go (across the ML pool when enabled)
+    def score_many(self, texts):
+        keys = [text_key(text) for text in texts]
+        labels, misses = {}, {}
+        with self._cache_lock:
+            for key, text in zip(keys, texts):
+                label = self.cache.get(key)
+                if label is not None:
+                    self.cache.move_to_end(key)
+                    self.cache_hits += 1
+                    labels[key] = label
+                elif key in misses:
+                    self.cache_hits += 1
+                else:
+                    misses[key] = text
+        if misses:
+            scored = dict(zip(misses, ml_executor.sentiment_many(list(misses.values()))))
+            labels.update(scored)
+            with self._cache_lock:
+                for key, label in scored.items():
+                    self.cache[key] = label
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return [labels[key] for key in keys]
+
+    # One UPDATE per sentiment label for the whole batch
+    def process(self, batch):
+        started = time.perf_counter()
+        ids_by_label = defaultdict(list)
+        for (response_id, _), label in zip(batch, self.score_many([text for _, text in batch])):
+            ids_by_label[label].append(response_id)
+
+        db = self.session_factory()
+        try:
+            for label, response_ids in ids_by_label.items():
+                db.execute(
+                    update(Response)
+                    .where(Response.response_id.in_(response_ids))
+                    .values(sentiment=label, sentiment_scored_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+        self.rows_scored += len(batch)
+        self.seconds_busy += time.perf_counter() - started
+
+    # Stream existing unscored rows through the same scoring and write path
+    def backfill(self, chunk_size=None):
+        chunk_size = chunk_size or self.batch_size
+        started = time.perf_counter()
+        processed, last_id = 0, None
+        db = self.session_factory()
+        try:
+            while True:
+                query = db.query(Response.response_id, Response.response_text).filter(
+                    Response.sentiment.is_(None), Response.response_text.isnot(None)
+                )
+                if last_id is not None:
+                    query = query.filter(Response.response_id > last_id)
+                rows = query.order_by(Response.response_id).limit(chunk_size).all()
+                db.rollback()
+                if not rows:
+                    break
+                self.process([(row.response_id, row.response_text) for row in rows])
+                processed += len(rows)
+                last_id = rows[-1].response_id
+        finally:
+            db.close()
+        seconds = time.perf_counter() - started
+        return {
+            "rows": processed,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(processed / seconds, 1) if seconds else 0.0,
+        }
+
+    def stats(self):
+        return {
+            "rows_scored": self.rows_scored,
+            "rows_failed": self.rows_failed,
+            "rows_per_sec": round(self.rows_scored / self.seconds_busy, 1) if self.seconds_busy else 0.0,
+            "cache_hit_rate": round(self.cache_hits / self.rows_scored, 3) if self.rows_scored else 0.0,
+            "queue_depth": self.queue.qsize(),
+        }
+
+
+sentiment_worker = SentimentWorker()
+
+
+if __name__ == "__main__":
+    # Backfill mode: python -m app.services.sentiment_worker
+    print(sentiment_worker.backfill())
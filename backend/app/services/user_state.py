@@ -0,0 +1,159 @@
+# Per-user defer/skip state with optional write-behind buffering
+import os
+import threading
+from sqlalchemy import func, or_
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, dialect_insert
+from app.models import UserQuestionState
+
+STATE_WRITE_BEHIND = os.getenv("STATE_WRITE_BEHIND", "0") == "1"
+STATE_FLUSH_SECONDS = float(os.getenv("STATE_FLUSH_SECONDS", "2.0"))
+STATE_ACTIONS = ("defer", "skip")
+
+
+# Upsert of state deltas: defer counts add up, skipped is sticky
+def upsert_statement(db):
+    stmt = dialect_insert(db, UserQuestionState)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserQuestionState.user_id, UserQuestionState.question_id],
+        set_={
+            "defer_count": UserQuestionState.defer_count + stmt.excluded.defer_count,
+            "skipped": or_(UserQuestionState.skipped, stmt.excluded.skipped),
+            "updated_at": func.now(),
+        },
+    )
+
+def upsert_states(db: Session, changes):
+    if changes:
+        db.execute(upsert_statement(db), changes)
+
+
+def state_change(user_id, question_id, action):
+    return {
+        "user_id": user_id,
+        "question_id": question_id,
+        "defer_count": 1 if action == "defer" else 0,
+        "skipped": action == "skip",
+    }
+
+
+class StateWriteBuffer:
+    """Merges bursts of defer/skip clicks per (user, question) and flushes them periodically."""
+
+    def __init__(self, session_factory=SessionLocal, flush_seconds=STATE_FLUSH_SECONDS):
+        self.session_factory = session_factory
+        self.flush_seconds = flush_seconds
+        self.pending = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, question_id, action):
+        self.merge(state_change(user_id, question_id, action))
+
+    def merge(self, change):
+        key = (change["user_id"], change["question_id"])
+        with self._lock:
+            merged = self.pending.get(key)
+            if merged is None:
+                self.pending[key] = dict(change)
+            else:
+                merged["defer_count"] += change["defer_count"]
+                merged["skipped"] = merged["skipped"] or change["skipped"]
+
+    def flush(self):
+        with self._lock:
+            changes, self.pending = list(self.pending.values()), {}
+        if not changes:
+            return 0
+        db = self.session_factory()
+        try:
+            upsert_states(db, changes)
+            db.commit()
+            return len(changes)
+        except (IntegrityError, DataError):
+            db.rollback()
+            # Some row can never be written (e.g. a deleted user or question); find it row by row
+            return self._flush_rows(db, changes)
+        except Exception:
+            db.rollback()
+            # Put the deltas back so the next flush retries them
+            for change in changes:
+                self.merge(change)
+            raise
+        finally:
+            db.close()
+
+    # Writes changes one at a time, dropping the ones the database rejects; on any other error the
+    # rest are put back for the next flush
+    def _flush_rows(self, db, changes):
+        written = 0
+        for position, change in enumerate(changes):
+            try:
+                upsert_states(db, [change])
+                db.commit()
+                written += 1
+            except (IntegrityError, DataError) as e:
+                db.rollback()
+                self.dropped += 1
+                print(f"Dropping state change for user {change['user_id']}, question {change['question_id']}: {str(e.orig).splitlines()[0]}")
+            except Exception:
+                db.rollback()
+                for pending in changes[position:]:
+                    self.merge(pending)
+                raise
+        return written
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="state-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"State flush failed, will retry: {e}")
+
+
+state_buffer = StateWriteBuffer()
+
+# Touches exactly one state row, now or on the next buffer flush
+def record_state_action(db: Session, user_id, question_id, action):
+    if STATE_WRITE_BEHIND:
+        state_buffer.record(user_id, question_id, action)
+        return
+    upsert_states(db, [state_change(user_id, question_id, action)])
+    db.commit()
+
+# Many (user_id, question_id, action) triples in one upsert; repeats of the same pair are merged
+# first, since a single INSERT ... ON CONFLICT cannot touch the same row twice
+def record_state_actions(db: Session, actions):
+    merged = {}
+    for user_id, question_id, action in actions:
+        change = state_change(user_id, question_id, action)
+        if STATE_WRITE_BEHIND:
+            state_buffer.merge(change)
+            continue
+        previous = merged.get((user_id, question_id))
+        if previous is None:
+            merged[(user_id, question_id)] = change
+        else:
+            previous["defer_count"] += change["defer_count"]
+            previous["skipped"] = previous["skipped"] or change["skipped"]
+    if merged:
+        upsert_states(db, list(merged.values()))
+        db.commit()
+    return len(merged)
@@ -0,0 +1,43 @@
+# Cold start: fresh interpreter -> app imported -> startup hooks run -> first health check answered
+# Run from backend/: python -m benchmarks.bench_cold_start [--runs 5]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    assert client.get("/").status_code == 200
+    ready = time.perf_counter()
+print(f"{imported - start:.4f} {ready - start:.4f}")
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_cold_start.db')}")
+    imports, readies = [], []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True).stdout
+        imported, ready = map(float, output.split()[-2:])
+        imports.append(imported * 1000)
+        readies.append(ready * 1000)
+
+    print(f"runs={args.runs}")
+    print(f"import app.main     median {statistics.median(imports):7.1f} ms  max {max(imports):7.1f} ms")
+    print(f"ready (first 200)   median {statistics.median(readies):7.1f} ms  max {max(readies):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
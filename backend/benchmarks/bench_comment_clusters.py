@@ -0,0 +1,89 @@
+# Comment clustering throughput: LSH candidate lookup vs. comparing every comment with every cluster
+# Run from backend/: python -m benchmarks.bench_comment_clusters [--comments 200000] [--topics 2000]
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from benchmarks.datagen import WORDS
+from app.services.comment_clusters import CommentClusterIndex
+
+QUESTION_ID = "bench-question"
+
+
+# Each comment is a topic sentence with a couple of words dropped or swapped, plus some one-offs
+def synthetic_comments(rng, count, topics):
+    seeds = [rng.choices(WORDS, k=rng.randint(6, 16)) for _ in range(topics)]
+    comments = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            comments.append(" ".join(rng.choices(WORDS, k=rng.randint(3, 20))))
+            continue
+        words = list(rng.choice(seeds))
+        for _ in range(rng.randint(0, 2)):
+            position = rng.randrange(len(words))
+            if rng.random() < 0.5 and len(words) > 3:
+                del words[position]
+            else:
+                words[position] = rng.choice(WORDS)
+        comments.append(" ".join(words))
+    return comments
+
+
+def brute_force(signatures, threshold):
+    import numpy as np
+
+    reps = np.empty((0, signatures[0].shape[0]), dtype=signatures[0].dtype)
+    for signature in signatures:
+        if len(reps):
+            scores = (reps == signature).mean(axis=1)
+            if scores.max() >= threshold:
+                continue
+        reps = np.vstack([reps, signature])
+    return len(reps)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--comments", type=int, default=200_000)
+    parser.add_argument("--topics", type=int, default=2_000)
+    parser.add_argument("--brute-force", type=int, default=20_000, help="comments for the all-clusters comparison")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    comments = synthetic_comments(rng, args.comments, args.topics)
+    index = CommentClusterIndex()
+
+    start = time.perf_counter()
+    signatures = [index.signature(text) for text in comments]
+    signature_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for signature in signatures:
+        index.assign(QUESTION_ID, signature)
+    assign_seconds = time.perf_counter() - start
+
+    sample = signatures[:args.brute_force]
+    start = time.perf_counter()
+    brute_clusters = brute_force(sample, index.threshold)
+    brute_seconds = time.perf_counter() - start
+    lsh_sample = CommentClusterIndex()
+    start = time.perf_counter()
+    for signature in sample:
+        lsh_sample.assign(QUESTION_ID, signature)
+    lsh_sample_seconds = time.perf_counter() - start
+
+    sizes = sorted(index.sizes.values(), reverse=True)
+    print(f"comments={args.comments} topics={args.topics} perms={index.num_perm} bands={index.bands}")
+    print(f"signatures:                 {args.comments / signature_seconds:12,.0f} comments/s")
+    print(f"LSH assignment:             {args.comments / assign_seconds:12,.0f} comments/s")
+    print(f"clusters: {len(index):,}  (largest {sizes[:5]}, singletons {sum(1 for size in sizes if size == 1):,})")
+    print(f"on the first {len(sample):,} comments:")
+    print(f"  LSH        {lsh_sample_seconds * 1000:10.1f} ms  {len(lsh_sample):,} clusters")
+    print(f"  all-pairs  {brute_seconds * 1000:10.1f} ms  {brute_clusters:,} clusters")
+
+
+if __name__ == "__main__":
+    main()
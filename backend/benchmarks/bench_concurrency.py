@@ -0,0 +1,104 @@
+# Concurrent popup clients against the sync vs. async DB stack (in-process ASGI, no network)
+# Run from backend/: python -m benchmarks.bench_concurrency [--clients 200] [--seconds 10]
+# Uses BENCH_DATABASE_URL (a throwaway Postgres database!) or a temporary SQLite file;
+# the async mode needs asyncpg or aiosqlite respectively.
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def client_loop(client, user_id, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/questions/comment/next", params={"user_id": user_id})
+        if response.status_code == 200:
+            question = response.json()
+            response = await client.post("/responses/", json={
+                "question_id": question["question_id"], "user_id": user_id, "response_text": "fine",
+            })
+        if response.status_code != 200:
+            errors.append(response.status_code)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_child(clients, seconds):
+    import httpx
+    from app.main import app
+    from app.database import Base, SessionLocal, engine
+    from app.models import Question, User
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    users = [
+        User(
+            employee_id=f"BENCH-{uuid.uuid4()}", full_name="Bench User", ads_id=f"ads-{uuid.uuid4()}",
+            manager_id="MGR-BENCH", manager_name="Bench Manager", manager_email_hash="bench",
+            department="Engineering", band="Band 3", job_title="Engineer", is_active=True,
+            email_hash=f"bench-{uuid.uuid4()}",
+        )
+        for _ in range(clients)
+    ]
+    db.add_all(users)
+    db.add_all(
+        Question(question_text=f"Question {i}", category="Culture", question_type="comment", difficulty_level=1)
+        for i in range(50)
+    )
+    db.commit()
+    user_ids = [str(user.user_id) for user in users]
+    db.close()
+
+    latencies, errors = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(client_loop(client, user_id, deadline, latencies, errors) for user_id in user_ids))
+
+    return {
+        "requests": len(latencies) * 2,
+        "iterations_per_sec": round(len(latencies) / seconds, 1),
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else 0.0,
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--child", choices=["sync", "async"])
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_child(args.clients, args.seconds))))
+        return
+
+    for mode in ("sync", "async"):
+        env = dict(os.environ, DB_ASYNC="1" if mode == "async" else "0")
+        env["DATABASE_URL"] = os.getenv(
+            "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_concurrency.db')}"
+        )
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_concurrency", "--child", mode,
+             "--clients", str(args.clients), "--seconds", str(args.seconds)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:5s} clients={args.clients} " + " ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Retry-safe submission: POST /responses/ without a key, the first submission with a key, and
+# replays of it answered from this worker's cache or from the response_idempotency table; then a
+# retry storm of outbox batches re-sent several times, counting the rows actually written
+# Run from backend/: python -m benchmarks.bench_idempotency [--submissions 2000] [--retries 3]
+# Uses BENCH_DATABASE_URL (a throwaway database!) or a temporary SQLite file.
+import argparse
+import json
+import os
+import uuid
+from benchmarks.common import bench_database_url, summarize, timed
+
+os.environ["DATABASE_URL"] = bench_database_url("bench_idempotency")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=2_000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    from sqlalchemy import func, select
+    from app.crud import submit_response, submit_responses_batch
+    from app.database import Base, SessionLocal, engine
+    from app.models import Question, Response
+    from app.schemas import ResponseCreate
+    from app.services.idempotency import idempotency_cache
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    results = {}
+    try:
+        question = Question(question_text="How was your week?", category="Culture", question_type="comment", difficulty_level=1)
+        db.add(question)
+        db.commit()
+
+        def answer(key=None):
+            return ResponseCreate(question_id=question.question_id, user_id=None, response_text="fine", idempotency_key=key)
+
+        keys = [str(uuid.uuid4()) for _ in range(args.submissions)]
+        pending = iter(keys)
+        results["unkeyed"] = summarize(timed(lambda: submit_response(db, answer()), args.submissions))
+        results["first_submit"] = summarize(timed(lambda: submit_response(db, answer(next(pending))), args.submissions))
+        pending = iter(keys)
+        results["replay_cached"] = summarize(timed(lambda: submit_response(db, answer(next(pending))), args.submissions))
+        idempotency_cache.clear()
+        pending = iter(keys)
+        results["replay_table"] = summarize(timed(lambda: submit_response(db, answer(next(pending))), args.submissions))
+
+        # Every outbox batch delivered, then re-sent `retries` times (timeouts after the commit)
+        before = db.execute(select(func.count()).select_from(Response)).scalar()
+        storm = [answer(str(uuid.uuid4())) for _ in range(args.submissions)]
+        batches = [storm[i:i + args.batch] for i in range(0, len(storm), args.batch)]
+        samples = {"first": [], "retry": []}
+        for attempt in range(args.retries + 1):
+            if attempt == 1:
+                idempotency_cache.clear()  # retries landing on another worker
+            for batch in batches:
+                samples["first" if attempt == 0 else "retry"] += timed(lambda: submit_responses_batch(db, batch), 1)
+        written = db.execute(select(func.count()).select_from(Response)).scalar() - before
+        db.rollback()
+        results["batch_storm"] = {
+            "sent": len(storm) * (args.retries + 1), "rows_written": written,
+            "first_batch": summarize(samples["first"]), "retried_batch": summarize(samples["retry"]),
+        }
+        results["cache"] = idempotency_cache.stats()
+    finally:
+        db.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
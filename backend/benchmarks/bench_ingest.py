@@ -0,0 +1,64 @@
+# Response ingestion throughput: per-row submit_response vs. submit_responses_batch
+# Run from backend/: python -m benchmarks.bench_ingest [--rows 5000]
+# Uses BENCH_DATABASE_URL (a throwaway database!) or a temporary SQLite file.
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_ingest.db')}"
+)
+
+from app.database import Base, SessionLocal, engine
+from app.models import Question, User
+from app.schemas import ResponseCreate
+from app.crud import submit_response, submit_responses_batch
+
+
+def seed(db):
+    question = Question(question_text="How was your week?", category="Culture", question_type="comment", difficulty_level=1)
+    user = User(
+        employee_id=f"BENCH-{uuid.uuid4()}", full_name="Bench User", ads_id=f"ads-{uuid.uuid4()}",
+        manager_id="MGR-BENCH", manager_name="Bench Manager", manager_email_hash="bench", department="Engineering",
+        band="Band 3", job_title="Engineer", is_active=True, email_hash=f"bench-{uuid.uuid4()}",
+    )
+    db.add_all([question, user])
+    db.commit()
+    return question.question_id, user.user_id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        question_id, user_id = seed(db)
+        payloads = [
+            ResponseCreate(question_id=question_id, user_id=user_id, response_text=f"answer {i}")
+            for i in range(args.rows)
+        ]
+
+        start = time.perf_counter()
+        for payload in payloads:
+            submit_response(db, payload)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = submit_responses_batch(db, payloads)
+        batch = time.perf_counter() - start
+        assert all(result.error is None for result in results)
+    finally:
+        db.close()
+
+    print(f"rows={args.rows} url={engine.url.render_as_string(hide_password=True)}")
+    print(f"single-row path: {single:8.3f} s  {args.rows / single:10.0f} rows/s")
+    print(f"batch path:      {batch:8.3f} s  {args.rows / batch:10.0f} rows/s  ({single / batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Cost of the /metrics instrumentation: per-call overhead and end-to-end HTTP load with it on vs. off
+# Run from backend/: python -m benchmarks.bench_metrics [--clients 16] [--seconds 10] [--rounds 2]
+# Uses BENCH_DATABASE_URL (a throwaway database!) or a temporary SQLite file.
+import argparse
+import json
+import os
+import time
+from benchmarks.common import bench_database_url
+
+os.environ["DATABASE_URL"] = bench_database_url("bench_metrics")
+
+
+def per_call_overhead(iterations=200_000):
+    from sqlalchemy import create_engine, text
+    from app.services.metrics import Histogram, instrument_engine
+
+    histogram = Histogram("bench_seconds", "benchmark", ("route",))
+    start = time.perf_counter()
+    for i in range(iterations):
+        histogram.observe(i * 1e-6, "/questions/{question_type}")
+    observe_ns = (time.perf_counter() - start) / iterations * 1e9
+
+    def select_ns(engine, n=20_000):
+        with engine.connect() as conn:
+            statement = text("SELECT 1")
+            for _ in range(n // 10):
+                conn.execute(statement)
+            start = time.perf_counter()
+            for _ in range(n):
+                conn.execute(statement)
+            return (time.perf_counter() - start) / n * 1e9
+
+    plain_engine, instrumented_engine = create_engine("sqlite://"), create_engine("sqlite://")
+    instrument_engine(instrumented_engine, "bench")
+    # Best of interleaved runs; single runs on a busy machine swing more than the difference
+    runs = [(select_ns(plain_engine), select_ns(instrumented_engine)) for _ in range(5)]
+    plain = min(run[0] for run in runs)
+    instrumented = min(run[1] for run in runs)
+    return {
+        "histogram_observe_ns": round(observe_ns),
+        "select_1_plain_ns": round(plain),
+        "select_1_instrumented_ns": round(instrumented),
+        "sql_hook_overhead_ns": round(instrumented - plain),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    from app import models  # noqa: F401  (registers the tables on Base)
+    from app.database import Base, SessionLocal, engine
+    from benchmarks.datagen import generate
+    from benchmarks.load import load_ids, run_load, spawn_server
+
+    results = {"per_call": per_call_overhead()}
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        generate(db, users=1_000, questions=300, responses=20_000, progress=False)
+        question_ids, user_ids = load_ids(db)
+    finally:
+        db.close()
+    engine.dispose()
+
+    # Alternate on/off rounds so drift (caches, disk, neighbours) hits both modes alike
+    samples = {"off": [], "on": []}
+    for _ in range(args.rounds):
+        for mode in ("off", "on"):
+            process, base_url = spawn_server({
+                "DATABASE_URL": os.environ["DATABASE_URL"], "METRICS_ENABLED": "1" if mode == "on" else "0",
+            })
+            try:
+                total = run_load(base_url, question_ids, user_ids, args.clients, args.seconds)["total"]
+                samples[mode].append(total)
+            finally:
+                process.terminate()
+                process.wait()
+
+    for mode, rounds in samples.items():
+        results[f"load_metrics_{mode}"] = {
+            key: round(sum(r[key] for r in rounds) / len(rounds), 3) for key in ("p50_ms", "p95_ms", "p99_ms", "ops_per_sec")
+        }
+    off, on = results["load_metrics_off"], results["load_metrics_on"]
+    results["overhead_pct"] = {
+        "p50_ms": round((on["p50_ms"] - off["p50_ms"]) / off["p50_ms"] * 100, 1),
+        "ops_per_sec": round((on["ops_per_sec"] - off["ops_per_sec"]) / off["ops_per_sec"] * 100, 1),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# ML off the request path: latency of light request work while ranking/sentiment load runs,
+# inline in threads (GIL-bound) vs. in the ML process pool, plus pool throughput per worker count
+# Run from backend/: python -m benchmarks.bench_ml_executor [--workers 4] [--seconds 10]
+# Sentiment needs the VADER lexicon (NLTK_DATA / NLTK_DATA_DIR); ranking uses a synthetic catalog.
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Pool workers load the synthetic index from here instead of reading a database
+os.environ.setdefault("ML_INDEX_PATH", os.path.join(tempfile.mkdtemp(), "question_index.joblib"))
+
+from benchmarks.bench_question_index import synthetic_texts
+from benchmarks.common import summarize
+
+
+# Stand-in for the request work that shares the GIL with ML: parse and serialise a small payload
+def request_work(payload):
+    return json.dumps(json.loads(payload))
+
+
+def run_scenario(executor, index, rng, clients, seconds, sentiment):
+    stop = threading.Event()
+    done = [0]
+
+    def load():
+        local = random.Random(rng.random())
+        while not stop.is_set():
+            texts = synthetic_texts(local, 50, 4, 30)
+            if sentiment:
+                executor.sentiment_many(texts)
+            else:
+                executor.rank(index, texts, 5, timeout=30)
+            done[0] += 1
+
+    threads = [threading.Thread(target=load, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    payload = json.dumps([{"question_id": str(uuid.uuid4()), "question_text": "x" * 80} for _ in range(50)])
+    # Timed from when the probe is due (end of its 2 ms pause), so waiting for the GIL counts
+    samples, started = [], time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        due = time.perf_counter() + 0.002
+        time.sleep(0.002)
+        request_work(payload)
+        samples.append((time.perf_counter() - due) * 1000)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {"request_work": summarize(samples, elapsed), "ml_calls_per_sec": round(done[0] / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=8, help="threads generating ML load")
+    parser.add_argument("--questions", type=int, default=5_000)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    from app.services.ml import get_sentiment_analyzer
+    from app.services.ml_executor import MLExecutor
+    from app.services.question_index import ML_INDEX_PATH, QuestionIndex
+
+    rng = random.Random(42)
+    index = QuestionIndex()
+    index.build([uuid.uuid4() for _ in range(args.questions)], synthetic_texts(rng, args.questions, 6, 14))
+    index.save(ML_INDEX_PATH)
+    try:
+        get_sentiment_analyzer()
+        kinds = ["rank", "sentiment"]
+    except LookupError:
+        kinds = ["rank"]
+
+    results = {}
+    for kind in kinds:
+        for workers in sorted({0, 1, args.workers}):
+            executor = MLExecutor(workers=workers, max_pending=max(1, workers) * 8)
+            executor.start()
+            if workers:
+                # Let every worker finish spawning and loading before measuring
+                executor.rank(index, ["warm up"], 1, timeout=120)
+                executor.sentiment_many(["warm up"] * workers) if kind == "sentiment" else None
+            name = f"{kind}.{'inline' if workers == 0 else f'pool_{workers}'}"
+            results[name] = run_scenario(executor, index, rng, args.clients, args.seconds, kind == "sentiment")
+            executor.stop()
+            print(name, json.dumps(results[name]))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Deep paging through responses: keyset cursors (GET /responses/) against LIMIT/OFFSET on the same
+# ordering, timing one page at increasing depths
+# Run from backend/: python -m benchmarks.bench_pagination [--responses 500000] [--page 100]
+# Uses BENCH_DATABASE_URL (a throwaway database!) or a temporary SQLite file.
+import argparse
+import json
+import os
+from benchmarks.common import bench_database_url, summarize, timed
+
+os.environ["DATABASE_URL"] = bench_database_url("bench_pagination")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--responses", type=int, default=500_000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    from sqlalchemy import select
+    from app.crud import list_responses
+    from app.database import Base, SessionLocal, engine
+    from app.models import Response
+    from benchmarks.datagen import generate
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    results = {}
+    try:
+        generate(db, args.users, args.questions, args.responses, progress=False)
+        depths = [0] + [depth for depth in (1_000, 10_000, 100_000, 1_000_000) if depth < args.responses]
+        for depth in depths:
+            # The cursor a client would hold after paging down to this depth
+            cursor = None
+            if depth:
+                page = list_responses(db, limit=depth)
+                cursor = page["next_cursor"]
+            offset_stmt = (
+                select(*Response.__table__.columns)
+                .order_by(Response.submitted_at.desc(), Response.response_id.desc())
+                .offset(depth).limit(args.page)
+            )
+            results[f"depth_{depth}"] = {
+                "keyset": summarize(timed(lambda: list_responses(db, cursor=cursor, limit=args.page), args.iterations)),
+                "offset": summarize(timed(lambda: [dict(row._mapping) for row in db.execute(offset_stmt)], args.iterations)),
+            }
+            print(depth, json.dumps(results[f"depth_{depth}"]))
+    finally:
+        db.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Server-pushed prompts at fleet scale: memory per idle /prompts/stream connection, heartbeat fan-out
+# to every connection, and one scheduler tick deciding and pushing prompts for every connected user
+# Run from backend/: python -m benchmarks.bench_prompt_stream [--connections 20000]
+# Uses BENCH_DATABASE_URL (a throwaway database!) or a temporary SQLite file.
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from benchmarks.common import bench_database_url
+
+os.environ["DATABASE_URL"] = bench_database_url("bench_prompt_stream")
+# What every popup did before: one /questions/{type}/next poll per FEEDBACK_INTERVAL
+POPUP_POLL_SECONDS = 10
+
+
+class Fleet:
+    """Idle SSE consumers on an event loop in a background thread, counting the events they get."""
+
+    def __init__(self, scheduler, user_ids):
+        self.scheduler = scheduler
+        self.user_ids = user_ids
+        self.received = 0
+        self.closed = 0
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    async def _consume(self, user_id):
+        async for _ in self.scheduler.stream(user_id):
+            self.received += 1
+        self.closed += 1
+
+    def connect(self):
+        self._thread.start()
+        done = threading.Event()
+
+        def spawn():
+            for user_id in self.user_ids:
+                self.loop.create_task(self._consume(user_id))
+            self.loop.call_soon(done.set)
+
+        self.loop.call_soon_threadsafe(spawn)
+        done.wait()
+        self.wait_for(len(self.user_ids))  # every stream's preamble
+
+    def wait_for(self, count, timeout=120, counter="received"):
+        deadline = time.perf_counter() + timeout
+        while getattr(self, counter) < count and time.perf_counter() < deadline:
+            time.sleep(0.0005)
+        return getattr(self, counter) >= count
+
+    def close(self):
+        self.scheduler.broker.close()
+        self.wait_for(len(self.user_ids), counter="closed")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+def seed(db, users, questions, rng):
+    from app.models import Question, User
+
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    db.bulk_insert_mappings(User, [
+        {"user_id": user_id, "employee_id": f"EMP{i:07d}", "full_name": f"User {i}", "ads_id": f"ADS{i:07d}",
+         "manager_id": "EMP-BOARD", "manager_name": "Board", "manager_email_hash": "mgr", "department": "Eng",
+         "band": "Band 2", "job_title": "Employee", "is_active": True, "email_hash": f"hash{i:07d}"}
+        for i, user_id in enumerate(user_ids)
+    ])
+    db.bulk_insert_mappings(Question, [
+        {"question_id": uuid.uuid4(), "question_text": f"Question {i}", "category": "Culture",
+         "question_type": rng.choice(["comment", "emoji", "radio"]), "difficulty_level": rng.randint(1, 5)}
+        for i in range(questions)
+    ])
+    db.commit()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=20_000)
+    parser.add_argument("--questions", type=int, default=200)
+    args = parser.parse_args()
+
+    from app import models  # noqa: F401  (registers the tables on Base)
+    from app.database import Base, SessionLocal, engine
+    from app.services.prompt_scheduler import HEARTBEAT, PromptBroker, PromptScheduler
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    db = SessionLocal()
+    results = {"connections": args.connections}
+    try:
+        user_ids = seed(db, args.connections, args.questions, rng)
+        scheduler = PromptScheduler(PromptBroker(), tick=1, rng=rng)
+        fleet = Fleet(scheduler, user_ids)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        fleet.connect()
+        results["bytes_per_idle_connection"] = round((tracemalloc.get_traced_memory()[0] - before) / args.connections)
+        tracemalloc.stop()
+
+        samples = []
+        for _ in range(5):
+            expected = fleet.received + args.connections
+            start = time.perf_counter()
+            scheduler.broker.broadcast(HEARTBEAT)
+            fleet.wait_for(expected)
+            samples.append((time.perf_counter() - start) * 1000)
+        results["heartbeat_fanout_ms"] = round(min(samples), 1)
+
+        # Everyone due at once: the worst tick (e.g. the first interval after a deploy)
+        with scheduler._lock:
+            for user_id, pacing in scheduler._pacing.items():
+                pacing.next_due = 0
+            scheduler._due = [(0, user_id) for user_id in user_ids]
+            heapq.heapify(scheduler._due)
+        expected = fleet.received + args.connections
+        start = time.perf_counter()
+        sent = scheduler.run_once(db)
+        decided = time.perf_counter() - start
+        fleet.wait_for(expected)
+        pushed = time.perf_counter() - start
+        results["full_tick"] = {
+            "prompts": sent, "decide_seconds": round(decided, 3), "delivered_seconds": round(pushed, 3),
+            "users_per_sec": round(sent / pushed, 1) if pushed else 0.0,
+        }
+        results["requests_per_sec_polling_fleet"] = round(args.connections / POPUP_POLL_SECONDS, 1)
+        results["stats"] = scheduler.stats()
+        fleet.close()
+    finally:
+        db.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
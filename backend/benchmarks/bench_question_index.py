@@ -0,0 +1,74 @@
+# Per-request ranking latency: warm question index vs. refitting TF-IDF on every call
+# Run from backend/: python -m benchmarks.bench_question_index [--questions 10000] [--responses 1000]
+import argparse
+import os
+import random
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.services.question_index import QuestionIndex
+
+WORDS = (
+    "team manager deploy release tooling devops oncall pipeline review sprint meeting roadmap "
+    "culture growth career feedback workload balance remote office laptop build test coverage "
+    "incident pager hiring onboarding training mentor goals clarity recognition salary benefits "
+    "collaboration communication leadership strategy customer quality latency outage process"
+).split()
+
+
+def synthetic_texts(rng, count, min_words, max_words):
+    return [" ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words))) for _ in range(count)]
+
+
+# The original implementation: fit over everything, every request
+def legacy_rank(feedback_texts, question_texts, limit=5):
+    vectors = TfidfVectorizer().fit_transform(feedback_texts + question_texts)
+    scores = vectors[len(feedback_texts):].sum(axis=0).A1
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:limit]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=10_000)
+    parser.add_argument("--responses", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    question_ids = [uuid.uuid4() for _ in range(args.questions)]
+    question_texts = synthetic_texts(rng, args.questions, 6, 14)
+    feedback_texts = synthetic_texts(rng, args.responses, 4, 30)
+
+    index = QuestionIndex()
+    start = time.perf_counter()
+    index.build(question_ids, question_texts)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    warm_p50, warm_max = timed(lambda: index.rank(feedback_texts, 5), args.repeat)
+    legacy_p50, legacy_max = timed(lambda: legacy_rank(feedback_texts, question_texts), max(3, args.repeat // 4))
+    upsert_p50, upsert_max = timed(
+        lambda: index.upsert(rng.choice(question_ids), synthetic_texts(rng, 1, 6, 14)[0]), args.repeat
+    )
+
+    print(f"questions={args.questions} responses/user={args.responses}")
+    print(f"index build (one-off):        {build_ms:9.1f} ms")
+    print(f"warm index rank   p50/max:    {warm_p50:9.1f} / {warm_max:.1f} ms")
+    print(f"legacy refit rank p50/max:    {legacy_p50:9.1f} / {legacy_max:.1f} ms")
+    print(f"in-place question edit p50:   {upsert_p50:9.1f} / {upsert_max:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
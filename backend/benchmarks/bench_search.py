@@ -0,0 +1,63 @@
+# Comment search: GET /responses/search (ranked full-text, first page with total and facets, then a
+# cursor page) against the ILIKE substring scan it replaces, for rare and common terms
+# Run from backend/: python -m benchmarks.bench_search [--responses 500000]
+# Uses BENCH_DATABASE_URL (a throwaway database!) or a temporary SQLite file.
+import argparse
+import json
+import os
+from benchmarks.common import bench_database_url, summarize, timed
+
+os.environ["DATABASE_URL"] = bench_database_url("bench_search")
+QUERIES = ("outage", "devops pipeline", '"release tooling"', "latency -customer", "great OR love")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--responses", type=int, default=500_000)
+    parser.add_argument("--page", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    from sqlalchemy import func, select
+    from app.database import Base, SessionLocal, engine
+    from app.models import Response
+    from app.services.search import search_responses
+    from benchmarks.datagen import generate
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    results = {}
+    try:
+        generate(db, args.users, args.questions, args.responses, progress=False)
+        search_responses(db, "warmup")  # SQLite: builds the FTS index once
+        for q in QUERIES:
+            first = search_responses(db, q, limit=args.page)
+            cursor = first["next_cursor"]
+            # The old way: a substring match on the first word, newest first, counted separately
+            pattern = f"%{q.split()[0].strip(chr(34))}%"
+            like = Response.response_text.ilike(pattern)
+            ilike_page = (
+                select(*Response.__table__.columns).where(like)
+                .order_by(Response.submitted_at.desc()).limit(args.page)
+            )
+            ilike_count = select(func.count()).select_from(Response).where(like)
+            results[q] = {
+                "hits": first["total"],
+                "first_page": summarize(timed(lambda: search_responses(db, q, limit=args.page), args.iterations)),
+                "next_page": summarize(timed(
+                    lambda: search_responses(db, q, cursor=cursor, limit=args.page), args.iterations
+                )) if cursor else None,
+                "ilike": summarize(timed(
+                    lambda: (db.execute(ilike_page).all(), db.execute(ilike_count).scalar()), args.iterations
+                )),
+            }
+            print(q, json.dumps(results[q]))
+    finally:
+        db.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# List endpoints before/after typed serialization: ORM objects + jsonable_encoder vs.
+# column-projected rows + response_model / orjson (in-process ASGI, no network)
+# Run from backend/: python -m benchmarks.bench_serialization [--questions 3000] [--k 50] [--iterations 200]
+import argparse
+import json
+import os
+import random
+import uuid
+from benchmarks.common import bench_database_url, summarize, timed
+
+os.environ["DATABASE_URL"] = bench_database_url("bench_serialization")
+
+
+# The original handlers: ORM entities returned as-is, encoded by FastAPI's generic jsonable_encoder
+def legacy_app():
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session
+    from app.database import get_db
+    from app.models import MLQuestionScore, Question
+
+    app = FastAPI()
+
+    @app.get("/questions/{question_type}")
+    def get_questions(question_type: str, db: Session = Depends(get_db)):
+        return db.query(Question).filter(Question.question_type == question_type).all()
+
+    @app.get("/users/{user_id}/questions")
+    def get_user_questions(user_id: uuid.UUID, k: int = 5, db: Session = Depends(get_db)):
+        return (
+            db.query(Question)
+            .join(MLQuestionScore, MLQuestionScore.question_id == Question.question_id)
+            .filter(MLQuestionScore.user_id == user_id)
+            .order_by(MLQuestionScore.relevance_score.desc())
+            .limit(k)
+            .all()
+        )
+
+    return app
+
+
+def seed(db, questions, k):
+    from app.models import MLQuestionScore, Question, User
+
+    rng = random.Random(42)
+    rows = [Question(
+        question_text=f"Question {i} about tooling, culture and growth?", category="Technology",
+        question_type=("comment", "emoji", "radio")[i % 3], difficulty_level=rng.randint(1, 5),
+    ) for i in range(questions)]
+    user = User(
+        employee_id="BENCH", full_name="Bench User", ads_id="bench", manager_id="M", manager_name="M",
+        manager_email_hash="m", department="Engineering", band="Band 3", job_title="Engineer",
+        is_active=True, email_hash="bench",
+    )
+    db.add_all(rows + [user])
+    db.flush()
+    db.add_all([
+        MLQuestionScore(user_id=user.user_id, question_id=question.question_id, relevance_score=rng.random())
+        for question in rows[:k]
+    ])
+    db.commit()
+    return user.user_id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=3_000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    from app.database import Base, SessionLocal, engine
+    from app.main import app
+    from app.services.question_cache import question_catalog
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user_id = seed(db, args.questions, args.k)
+    finally:
+        db.close()
+
+    before, after = TestClient(legacy_app()), TestClient(app)
+    list_path = "/questions/comment"
+    top_path = f"/users/{user_id}/questions?k={args.k}"
+    assert len(before.get(list_path).json()) == len(after.get(list_path).json())
+    assert [q["question_id"] for q in before.get(top_path).json()] == [q["question_id"] for q in after.get(top_path).json()]
+
+    def uncached_list():
+        question_catalog.invalidate()
+        after.get(list_path)
+
+    results = {
+        f"GET {list_path} before": summarize(timed(lambda: before.get(list_path), args.iterations)),
+        f"GET {list_path} after (catalog miss)": summarize(timed(uncached_list, args.iterations)),
+        f"GET {list_path} after (catalog hit)": summarize(timed(lambda: after.get(list_path), args.iterations)),
+        f"GET /users/{{user_id}}/questions?k={args.k} before": summarize(timed(lambda: before.get(top_path), args.iterations)),
+        f"GET /users/{{user_id}}/questions?k={args.k} after": summarize(timed(lambda: after.get(top_path), args.iterations)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
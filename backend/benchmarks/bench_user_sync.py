@@ -0,0 +1,84 @@
+# Directory sync at org scale: first load, no-op re-sync and a typical daily delta,
+# against the one-user-per-call crud.create_user path
+# Run from backend/: python -m benchmarks.bench_user_sync [--users 50000]
+# Uses BENCH_DATABASE_URL (a throwaway database!) or a temporary SQLite file.
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import time
+from benchmarks.common import bench_database_url
+
+os.environ["DATABASE_URL"] = bench_database_url("bench_user_sync")
+
+
+def directory_row(i, rng):
+    manager = f"EMP{rng.randrange(max(1, i // 50 + 1)):07d}" if i else "EMP-BOARD"
+    return {
+        "employee_id": f"EMP{i:07d}", "full_name": f"User {i}", "ads_id": f"ADS{i:07d}", "manager_id": manager,
+        "manager_name": f"Manager {manager}", "manager_email_hash": f"mgrhash{manager}",
+        "department": rng.choice(["Engineering", "Product", "Sales", "Support"]),
+        "band": rng.choice(["Band 1", "Band 2", "Band 3"]), "job_title": "Employee",
+        "email_hash": f"hash{i:07d}", "is_active": "true",
+    }
+
+
+def to_csv(rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return io.BytesIO(out.getvalue().encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--baseline", type=int, default=1_000, help="users created one by one for comparison")
+    args = parser.parse_args()
+
+    from app import models  # noqa: F401  (registers the tables on Base)
+    from app.crud import create_user
+    from app.database import Base, SessionLocal, engine
+    from app.schemas import UserCreate
+    from app.services.directory_sync import sync_directory
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    rows = [directory_row(i, rng) for i in range(args.users)]
+    results = {}
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for i in range(args.users, args.users + args.baseline):
+            create_user(db, UserCreate(**dict(directory_row(i, rng), is_active=True)))
+        per_user = (time.perf_counter() - start) / args.baseline
+        results["create_user_one_by_one"] = {
+            "users": args.baseline, "ms_per_user": round(per_user * 1000, 3),
+            f"projected_seconds_for_{args.users}": round(per_user * args.users, 1),
+        }
+
+        results["initial_sync"] = sync_directory(db, to_csv(rows))
+        results["unchanged_resync"] = sync_directory(db, to_csv(rows))
+
+        # Daily churn: 5% changed, 1% left, 1% joined
+        changed = rows[:]
+        for i in rng.sample(range(len(changed)), len(changed) // 20):
+            changed[i] = dict(changed[i], band="Band 4")
+        for i in sorted(rng.sample(range(len(changed)), len(changed) // 100), reverse=True):
+            del changed[i]
+        changed += [directory_row(i, rng) for i in range(args.users * 2, args.users * 2 + args.users // 100)]
+        results["daily_delta"] = sync_directory(db, to_csv(changed))
+    finally:
+        db.close()
+
+    for result in results.values():
+        result.pop("errors", None)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
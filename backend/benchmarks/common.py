@@ -0,0 +1,48 @@
+# Shared helpers for the benchmark scripts
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+
+# BENCH_DATABASE_URL (a throwaway database!) or a fresh SQLite file
+def bench_database_url(name):
+    return os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.mkdtemp(), name + '.db')}"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+# Latency samples in ms -> the numbers every benchmark reports
+def summarize(samples_ms, seconds=None):
+    summary = {
+        "count": len(samples_ms),
+        "p50_ms": round(statistics.median(samples_ms), 3) if samples_ms else 0.0,
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+    seconds = seconds if seconds is not None else sum(samples_ms) / 1000
+    summary["ops_per_sec"] = round(len(samples_ms) / seconds, 1) if seconds else 0.0
+    return summary
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
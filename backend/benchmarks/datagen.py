@@ -0,0 +1,126 @@
+# Synthetic users / questions / responses at configurable scale
+# Run from backend/: python -m benchmarks.datagen --users 50000 --questions 10000 --responses 10000000
+# Writes to DATABASE_URL; point it at a throwaway database.
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+WORDS = (
+    "team manager deploy release tooling devops oncall pipeline review sprint meeting roadmap "
+    "culture growth career feedback workload balance remote office laptop build test coverage "
+    "incident pager hiring onboarding training mentor goals clarity recognition salary benefits "
+    "collaboration communication leadership strategy customer quality latency outage process "
+    "great good fine slow broken love hate frustrating helpful unclear supportive stressful"
+).split()
+DEPARTMENTS = ["Engineering", "Product", "Design", "Sales", "Support", "Finance", "People", "Operations"]
+BANDS = ["Band 1", "Band 2", "Band 3", "Band 4", "Band 5"]
+CATEGORIES = ["Technology", "Culture", "Leadership", "Colleague Experience", "Growth", "Wellbeing"]
+QUESTION_TYPES = ["comment", "emoji", "radio"]
+RADIO_OPTIONS = ["Yes", "No", "Maybe"]
+CHUNK = 10_000
+
+
+def sentence(rng, min_words, max_words):
+    return " ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words)))
+
+
+def seeded_uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def generate(db, users, questions, responses, days=365, seed=42, progress=True):
+    from app.models import User, Question, Response
+    from app.services.org_hierarchy import rebuild_org_closure
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    # Org tree: the first 2% of users are managers (ten reports each among themselves),
+    # everyone else reports to a random manager; the top of the org reports outside the directory
+    employee_ids = [f"EMP{i:07d}" for i in range(users)]
+    managers = employee_ids[: max(1, users // 50)]
+    user_rows = []
+    for i, employee_id in enumerate(employee_ids):
+        if i == 0:
+            manager = "EMP-BOARD"
+        elif i < len(managers):
+            manager = managers[(i - 1) // 10]
+        else:
+            manager = managers[rng.randrange(len(managers))]
+        user_rows.append({
+            "user_id": seeded_uuid(rng), "employee_id": employee_id, "full_name": f"User {i}",
+            "ads_id": f"ADS{i:07d}", "manager_id": manager, "manager_name": f"Manager {manager}",
+            "manager_email_hash": f"mgrhash{manager}", "department": rng.choice(DEPARTMENTS),
+            "band": rng.choice(BANDS), "job_title": "Employee", "is_active": rng.random() > 0.02,
+            "email_hash": f"hash{i:07d}",
+        })
+    for start in range(0, len(user_rows), CHUNK):
+        db.execute(insert(User), user_rows[start:start + CHUNK])
+    db.commit()
+    rebuild_org_closure(db)
+
+    question_rows = [{
+        "question_id": seeded_uuid(rng), "question_text": sentence(rng, 6, 14) + "?",
+        "category": rng.choice(CATEGORIES), "question_type": QUESTION_TYPES[i % 3],
+        "difficulty_level": rng.randint(1, 5),
+    } for i in range(questions)]
+    db.execute(insert(Question), question_rows)
+    db.commit()
+
+    user_ids = [row["user_id"] for row in user_rows]
+    now = datetime.utcnow()
+    written = 0
+    while written < responses:
+        rows = []
+        for _ in range(min(CHUNK, responses - written)):
+            question = question_rows[rng.randrange(len(question_rows))]
+            row = {
+                "response_id": seeded_uuid(rng), "question_id": question["question_id"],
+                "user_id": user_ids[rng.randrange(len(user_ids))] if rng.random() > 0.05 else None,
+                "response_text": None, "response_emoji": None, "response_radio": None,
+                "sentiment": None, "submitted_at": now - timedelta(seconds=rng.randrange(days * 86400)),
+            }
+            if question["question_type"] == "comment":
+                row["response_text"] = sentence(rng, 3, 30)
+                row["sentiment"] = rng.choice(["Positive", "Neutral", "Negative"])
+            elif question["question_type"] == "emoji":
+                row["response_emoji"] = rng.randint(1, 5)
+            else:
+                row["response_radio"] = rng.choice(RADIO_OPTIONS)
+            rows.append(row)
+        db.execute(insert(Response), rows)
+        db.commit()
+        written += len(rows)
+        if progress and written % (CHUNK * 20) == 0:
+            print(f"  {written:,}/{responses:,} responses ({written / (time.perf_counter() - started):,.0f} rows/s)")
+
+    return {
+        "users": users, "questions": questions, "responses": responses,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--questions", type=int, default=1_000)
+    parser.add_argument("--responses", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app import models  # noqa: F401  (registers the tables on Base)
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(generate(db, args.users, args.questions, args.responses, seed=args.seed))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# HTTP load driver for the popup-facing endpoints
+# Run from backend/: python -m benchmarks.load --url http://localhost:8000 [--clients 32] [--seconds 20]
+# (reads question and user ids through DATABASE_URL), or let benchmarks.run spawn a local server.
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import requests
+from benchmarks.common import summarize
+
+ENDPOINTS = ("GET /questions/{type}", "POST /responses/", "POST /responses/update_state")
+
+
+def client_loop(base_url, question_ids, user_ids, deadline, samples, errors, seed):
+    rng = random.Random(seed)
+    session = requests.Session()
+    step = 0
+    while time.perf_counter() < deadline:
+        endpoint = ENDPOINTS[step % len(ENDPOINTS)]
+        step += 1
+        start = time.perf_counter()
+        status = None
+        try:
+            if endpoint == "GET /questions/{type}":
+                response = session.get(f"{base_url}/questions/{rng.choice(['comment', 'emoji', 'radio'])}")
+            elif endpoint == "POST /responses/":
+                response = session.post(f"{base_url}/responses/", json={
+                    "question_id": rng.choice(question_ids), "user_id": rng.choice(user_ids),
+                    "response_text": "load test answer",
+                })
+            else:
+                response = session.post(f"{base_url}/responses/update_state", json={
+                    "user_id": rng.choice(user_ids), "question_id": rng.choice(question_ids),
+                    "action": rng.choice(["defer", "skip"]),
+                })
+            status = response.status_code
+        except requests.RequestException:
+            pass
+        samples[endpoint].append((time.perf_counter() - start) * 1000)
+        if status is None or status >= 400:
+            errors[endpoint].append(status)
+
+
+def run_load(base_url, question_ids, user_ids, clients=32, seconds=20):
+    samples = {endpoint: [] for endpoint in ENDPOINTS}
+    errors = {endpoint: [] for endpoint in ENDPOINTS}
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=client_loop, args=(base_url, question_ids, user_ids, deadline, samples, errors, seed))
+        for seed in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = {endpoint: dict(summarize(samples[endpoint], seconds), errors=len(errors[endpoint])) for endpoint in ENDPOINTS}
+    all_samples = [sample for endpoint in ENDPOINTS for sample in samples[endpoint]]
+    total_errors = sum(len(errors[endpoint]) for endpoint in ENDPOINTS)
+    results["total"] = dict(summarize(all_samples, seconds), errors=total_errors, clients=clients)
+    return results
+
+
+def load_ids(db, limit=1000):
+    from app.models import Question, User
+
+    question_ids = [str(row.question_id) for row in db.query(Question.question_id).limit(limit)]
+    user_ids = [str(row.user_id) for row in db.query(User.user_id).limit(limit)]
+    return question_ids, user_ids
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Local uvicorn on a free loopback port with the given environment
+def spawn_server(env, workers=1):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=dict(os.environ, **env),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            if requests.get(f"{base_url}/", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("API server did not become ready")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        question_ids, user_ids = load_ids(db)
+    finally:
+        db.close()
+    print(json.dumps(run_load(args.url, question_ids, user_ids, args.clients, args.seconds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
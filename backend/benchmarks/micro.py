@@ -0,0 +1,98 @@
+# Micro-benchmarks for the ML and CRUD paths against an already generated database
+# Run from backend/: python -m benchmarks.micro [--iterations 200]  (uses DATABASE_URL)
+import argparse
+import itertools
+import json
+import time
+import uuid
+from benchmarks.common import summarize, timed
+from benchmarks.datagen import sentence
+
+
+def run_micro(db, iterations=200):
+    import random
+    from sqlalchemy import func
+    from app import crud
+    from app.models import Question, Response
+    from app.schemas import ResponseCreate, UserCreate
+    from app.services.ml import analyze_sentiment, get_ml_selected_questions
+    from app.services.question_index import get_question_index
+    from app.services.rollups import query_insights, refresh_rollups
+
+    rng = random.Random(7)
+    results = {}
+
+    texts = itertools.cycle([sentence(rng, 3, 30) for _ in range(500)])
+    try:
+        analyze_sentiment("warm up")
+        results["analyze_sentiment"] = summarize(timed(lambda: analyze_sentiment(next(texts)), iterations))
+    except LookupError as e:
+        results["analyze_sentiment"] = {"skipped": f"VADER lexicon not available: {str(e).splitlines()[0]}"}
+
+    active = [
+        row.user_id for row in db.query(Response.user_id)
+        .filter(Response.user_id.isnot(None), Response.response_text.isnot(None))
+        .group_by(Response.user_id).order_by(func.count().desc()).limit(50)
+    ]
+    start = time.perf_counter()
+    index = get_question_index(db)
+    results["question_index_build"] = {"seconds": round(time.perf_counter() - start, 3), "questions": len(index)}
+    if active:
+        active_users = itertools.cycle(active)
+        results["get_ml_selected_questions"] = summarize(
+            timed(lambda: get_ml_selected_questions(db, next(active_users)), max(10, iterations // 10))
+        )
+    else:
+        results["get_ml_selected_questions"] = {"skipped": "no users with comment responses"}
+
+    question_types = itertools.cycle(["comment", "emoji", "radio"])
+    results["crud.get_questions_by_type"] = summarize(
+        timed(lambda: crud.get_questions_by_type(db, next(question_types)), max(10, iterations // 10))
+    )
+
+    question_ids = [row.question_id for row in db.query(Question.question_id).limit(200)]
+    # Anonymous submissions when no user has answered yet
+    user_ids = itertools.cycle(active or [None])
+
+    def payload():
+        return ResponseCreate(question_id=rng.choice(question_ids), user_id=next(user_ids), response_text=next(texts))
+
+    results["crud.submit_response"] = summarize(timed(lambda: crud.submit_response(db, payload()), iterations))
+    batch_samples = timed(lambda: crud.submit_responses_batch(db, [payload() for _ in range(100)]), max(5, iterations // 20))
+    results["crud.submit_responses_batch[100]"] = summarize(batch_samples)
+    results["crud.submit_responses_batch[100]"]["rows_per_sec"] = round(100 * 1000 / (sum(batch_samples) / len(batch_samples)), 1)
+
+    def new_user():
+        suffix = uuid.uuid4().hex
+        return UserCreate(
+            employee_id=f"BENCH-{suffix}", full_name="Bench User", ads_id=f"ads-{suffix}", manager_id="EMP0000000",
+            manager_name="Bench Manager", manager_email_hash="bench", department="Engineering", band="Band 3",
+            job_title="Engineer", is_active=True, email_hash=f"bench-{suffix}",
+        )
+
+    results["crud.create_user"] = summarize(timed(lambda: crud.create_user(db, new_user()), iterations))
+
+    start = time.perf_counter()
+    refreshed = refresh_rollups(db, lag_seconds=0)
+    results["rollups.refresh_full"] = {"seconds": round(time.perf_counter() - start, 3), "rows": refreshed["rows"]}
+    groupings = itertools.cycle([(), ("department",), ("day",), ("question_id",), ("department", "band")])
+    results["insights.query"] = summarize(timed(lambda: query_insights(db, next(groupings)), max(10, iterations // 10)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(json.dumps(run_micro(db, args.iterations), indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Full benchmark run: generate data, micro-benchmarks, HTTP load, JSON results
+# Run from backend/: python -m benchmarks.run --scale small [--compare benchmarks/results/<previous>.json]
+# Uses BENCH_DATABASE_URL (a throwaway database!) or a fresh SQLite file; no network access needed.
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+from benchmarks.common import bench_database_url, git_revision
+
+SCALES = {
+    "tiny": {"users": 500, "questions": 200, "responses": 10_000},
+    "small": {"users": 5_000, "questions": 1_000, "responses": 100_000},
+    "medium": {"users": 20_000, "questions": 5_000, "responses": 1_000_000},
+    "large": {"users": 50_000, "questions": 10_000, "responses": 10_000_000},
+}
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+# Print latency/throughput changes against an earlier results file
+def compare(previous_path, current):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before, after = flatten(previous["results"]), flatten(current["results"])
+    print(f"\nvs {previous['revision']} ({previous['timestamp']}):")
+    for key in sorted(before.keys() & after.keys()):
+        if not key.endswith(("p50_ms", "p95_ms", "p99_ms", "ops_per_sec", "rows_per_sec", "seconds")):
+            continue
+        old, new = before[key], after[key]
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"  {key:70s} {old:12.3f} -> {new:12.3f}  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--questions", type=int)
+    parser.add_argument("--responses", type=int)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    scale.update({key: getattr(args, key) for key in scale if getattr(args, key) is not None})
+    os.environ["DATABASE_URL"] = bench_database_url("bench_suite")
+
+    from app import models  # noqa: F401  (registers the tables on Base)
+    from app.database import Base, SessionLocal, engine
+    from benchmarks.datagen import generate
+    from benchmarks.micro import run_micro
+    from benchmarks.load import load_ids, run_load, spawn_server
+
+    run = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "database": engine.url.get_backend_name(),
+        "python": platform.python_version(),
+        "scale": scale,
+        "results": {},
+    }
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(f"Generating {scale} ...")
+        run["results"]["datagen"] = generate(db, **scale)
+        print("Micro-benchmarks ...")
+        run["results"]["micro"] = run_micro(db, args.iterations)
+        question_ids, user_ids = load_ids(db)
+    finally:
+        db.close()
+    engine.dispose()
+
+    if not args.skip_load:
+        print(f"HTTP load ({args.clients} clients, {args.seconds}s) ...")
+        process, base_url = spawn_server({"DATABASE_URL": os.environ["DATABASE_URL"]})
+        try:
+            time.sleep(0.5)
+            run["results"]["load"] = run_load(base_url, question_ids, user_ids, args.clients, args.seconds)
+        finally:
+            process.terminate()
+            process.wait()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{run['revision']}-{args.scale}-{run['database']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(json.dumps(run["results"], indent=2))
+    print(f"\nSaved {output}")
+    if args.compare:
+        compare(args.compare, run)
+
+
+if __name__ == "__main__":
+    main()
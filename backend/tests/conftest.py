@@ -0,0 +1,99 @@
+# Tests run against a throwaway SQLite file; every test starts from empty tables
+import os
+import tempfile
+import uuid
+
+TEST_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TEST_DIR, "pulsebot-test.db")
+# backend/.env points the saved question index into the source tree
+os.environ["ML_INDEX_PATH"] = os.path.join(TEST_DIR, "question_index.joblib")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.database import Base, SessionLocal, async_database_url, engine, get_async_db
+from app.main import app
+from app.models import Question, User
+from app.services import question_index as index_module
+from app.services.idempotency import idempotency_cache
+from app.services.question_cache import question_catalog
+
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        # Row deletes rather than drop_all, so the SQLite FTS table and its triggers stay in step
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
+        idempotency_cache.clear()
+        question_catalog.invalidate()
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+
+# The DB_ASYNC=1 routes on their own app, with aiosqlite sessions on the same test database
+@pytest.fixture
+def async_client(db):
+    from app.routes import async_api
+    async_engine = create_async_engine(async_database_url(engine.url), poolclass=NullPool)
+    sessions = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def get_db():
+        async with sessions() as session:
+            yield session
+
+    async_app = FastAPI()
+    async_app.include_router(async_api.users_router, prefix="/users")
+    async_app.include_router(async_api.questions_router, prefix="/questions")
+    async_app.include_router(async_api.responses_router, prefix="/responses")
+    async_app.dependency_overrides[get_async_db] = get_db
+    with TestClient(async_app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(db):
+    def make(employee_id=None, manager_id="CEO", **fields):
+        employee_id = employee_id or f"E{uuid.uuid4().hex[:8]}"
+        user = User(**{
+            "employee_id": employee_id, "full_name": f"User {employee_id}", "ads_id": f"ads-{employee_id}",
+            "manager_id": manager_id, "manager_name": "Manager", "manager_email_hash": "hash", "department": "Engineering",
+            "band": "Band 3", "job_title": "Engineer", "email_hash": f"hash-{employee_id}", **fields,
+        })
+        db.add(user)
+        db.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def make_question(db):
+    def make(question_type="comment", text="How was your week?"):
+        question = Question(question_text=text, category="Culture", question_type=question_type, difficulty_level=1)
+        db.add(question)
+        db.commit()
+        return question
+    return make
+
+
+# The process-wide question index outlives each test's rows; this swaps in an empty one
+@pytest.fixture
+def fresh_index(monkeypatch):
+    index = index_module.QuestionIndex()
+    monkeypatch.setattr(index_module, "question_index", index)
+    monkeypatch.setattr(index_module, "_checked_at", float("-inf"))
+    return index
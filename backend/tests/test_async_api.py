@@ -0,0 +1,54 @@
+import uuid
+from app.database import async_database_url
+from app.models import OrgClosure, Response, UserQuestionState
+
+
+def user_body(employee_id, manager_id="CEO"):
+    return {
+        "employee_id": employee_id, "full_name": employee_id, "ads_id": f"ads-{employee_id}", "manager_id": manager_id,
+        "manager_name": "Manager", "manager_email_hash": "hash", "department": "Engineering", "band": "Band 3",
+        "job_title": "Engineer", "is_active": True, "email_hash": f"hash-{employee_id}",
+    }
+
+
+def test_async_url_picks_the_async_driver():
+    assert async_database_url("sqlite:///x.db").drivername == "sqlite+aiosqlite"
+    url = async_database_url("postgresql://u@localhost/pulse")
+    assert url.drivername == "postgresql+asyncpg" and "prepared_statement_cache_size" in url.query
+
+
+def test_async_user_creation_updates_the_hierarchy(async_client, db):
+    boss = async_client.post("/users/", json=user_body("B1")).json()
+    async_client.post("/users/", json=user_body("R1", manager_id="B1"))
+    assert boss["employee_id"] == "B1"
+    assert db.query(OrgClosure).filter(OrgClosure.ancestor_id == "B1", OrgClosure.descendant_id == "R1").count() == 1
+
+
+def test_async_catalog_matches_the_sync_etag(async_client, client, make_question):
+    make_question()
+    make_question(text="Anything else?")
+    sync, via_async = client.get("/questions/comment"), async_client.get("/questions/comment")
+    assert via_async.json() == sync.json()
+    assert via_async.headers["etag"] == sync.headers["etag"]
+    assert async_client.get("/questions/comment", headers={"If-None-Match": sync.headers["etag"]}).status_code == 304
+
+
+def test_async_next_skips_blocked_questions(async_client, db, make_user, make_question):
+    user, blocked, left = make_user(), make_question(), make_question()
+    db.add(UserQuestionState(user_id=user.user_id, question_id=blocked.question_id, skipped=True, defer_count=0))
+    db.commit()
+    for _ in range(5):
+        picked = async_client.get("/questions/comment/next", params={"user_id": str(user.user_id)}).json()
+        assert picked["question_id"] == str(left.question_id)
+
+
+def test_async_submit_and_keyed_replay(async_client, db, make_question):
+    question = make_question()
+    body = {"question_id": str(question.question_id), "user_id": None, "response_text": "fine"}
+    assert async_client.post("/responses/", json=body).status_code == 200
+    assert async_client.post("/responses/", json={**body, "response_text": None}).status_code == 422
+    key = str(uuid.uuid4())
+    first = async_client.post("/responses/", json={**body, "idempotency_key": key}).json()
+    again = async_client.post("/responses/", json={**body, "idempotency_key": key}).json()
+    assert again["response_id"] == first["response_id"]
+    assert db.query(Response).count() == 2
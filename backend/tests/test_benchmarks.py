@@ -0,0 +1,17 @@
+# Smoke test: the micro-benchmarks run end to end on a tiny generated dataset
+from benchmarks.datagen import generate
+from benchmarks.micro import run_micro
+
+
+def test_run_micro_on_a_tiny_dataset(db):
+    generate(db, users=20, questions=10, responses=200, days=30, progress=False)
+    results = run_micro(db, iterations=5)
+    assert results["question_index_build"]["questions"] == 10
+    assert results["get_ml_selected_questions"]["p50_ms"] >= 0
+    assert results["rollups.refresh_full"]["rows"] >= 200
+
+
+def test_run_micro_without_any_comments(db, make_question):
+    make_question()
+    results = run_micro(db, iterations=5)
+    assert "skipped" in results["get_ml_selected_questions"]
@@ -0,0 +1,60 @@
+from datetime import timedelta
+import pytest
+from app.database import db_now
+from app.models import CommentCluster, CommentClusterMember, Response
+from app.services.comment_clusters import CommentClusterIndex, refresh_clusters, shingles
+
+pytest.importorskip("numpy")
+
+ONCALL = ["the on-call rotation is exhausting", "on-call rotation is exhausting everyone", "The on-call rotation is so exhausting!"]
+LUNCH = ["free lunch on fridays would be great", "Free lunch on Fridays would be great!"]
+
+
+def add_comments(db, question, texts, minutes_ago=60, sentiment=None):
+    db.add_all([
+        Response(question_id=question.question_id, response_text=text, sentiment=sentiment,
+                 submitted_at=db_now(db) - timedelta(minutes=minutes_ago, seconds=i))
+        for i, text in enumerate(texts)
+    ])
+    db.commit()
+
+
+def test_shingles_drop_stopwords_unless_nothing_else_is_left():
+    assert shingles("The build is slow") == {"build", "slow", "build slow"}
+    assert shingles("it is") == {"it", "is", "it is"}
+    assert shingles(":)") == set()
+
+
+def test_near_duplicates_share_a_cluster():
+    index = CommentClusterIndex()
+    ids = [index.assign("q1", index.signature(text))[0] for text in ONCALL + LUNCH]
+    assert len(set(ids[:3])) == 1 and len(set(ids[3:])) == 1 and ids[0] != ids[3]
+    # Same words under another question: a cluster of its own
+    assert index.assign("q2", index.signature(ONCALL[0]))[2] is True
+    assert index.signature("!!!") is None
+
+
+def test_refresh_persists_and_a_new_process_carries_on(db, make_question):
+    question = make_question()
+    add_comments(db, question, ONCALL + LUNCH)
+    first = refresh_clusters(db, index=CommentClusterIndex(), lag_seconds=600)
+    assert (first["comments"], first["new_clusters"]) == (5, 2)
+
+    add_comments(db, question, ["our on-call rotation is exhausting"], minutes_ago=5)
+    # A fresh index (another process, or a restart) loads the clusters table
+    second = refresh_clusters(db, index=CommentClusterIndex(), lag_seconds=0)
+    assert (second["comments"], second["new_clusters"], second["clusters"]) == (1, 0, 2)
+    assert sorted(cluster.size for cluster in db.query(CommentCluster)) == [2, 4]
+    assert db.query(CommentClusterMember).count() == 6
+    assert refresh_clusters(db, index=CommentClusterIndex(), lag_seconds=0)["comments"] == 0
+
+
+def test_clusters_endpoint(client, db, make_question):
+    question = make_question()
+    add_comments(db, question, ONCALL, sentiment="Negative")
+    add_comments(db, question, ["a lone remark about parking"], minutes_ago=90)
+    refresh_clusters(db, index=CommentClusterIndex(), lag_seconds=0)
+    [cluster] = client.get("/insights/clusters", params={"question_id": str(question.question_id), "examples": 5}).json()
+    assert cluster["size"] == 3 and cluster["representative"] in ONCALL
+    assert sorted(cluster["examples"] + [cluster["representative"]]) == sorted(ONCALL)
+    assert cluster["sentiment"] == {"Positive": 0, "Neutral": 0, "Negative": 3}
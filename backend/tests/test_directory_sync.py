@@ -0,0 +1,63 @@
+import io
+from app.models import User
+from app.services.directory_sync import SYNC_FIELDS, sync_directory
+
+HEADER = ",".join(SYNC_FIELDS) + ",is_active"
+
+
+def row(employee_id, job_title="Engineer", is_active="true", manager_id="CEO"):
+    values = {
+        "employee_id": employee_id, "full_name": f"User {employee_id}", "ads_id": f"ads-{employee_id}",
+        "manager_id": manager_id, "manager_name": "Manager", "manager_email_hash": "hash",
+        "department": "Engineering", "band": "Band 3", "job_title": job_title, "email_hash": f"hash-{employee_id}",
+    }
+    return ",".join(values[field] for field in SYNC_FIELDS) + f",{is_active}"
+
+
+def sync(db, *rows, **options):
+    return sync_directory(db, io.BytesIO("\n".join((HEADER,) + rows).encode()), "csv", **options)
+
+
+def users(db):
+    return {user.employee_id: user for user in db.query(User)}
+
+
+def test_create_update_and_deactivate(db):
+    report = sync(db, row("E1"), row("E2"))
+    assert (report["inserted"], report["updated"], report["deactivated"]) == (2, 0, 0)
+
+    report = sync(db, row("E1", job_title="Staff Engineer"), row("E2"))
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (0, 1, 1)
+    assert users(db)["E1"].job_title == "Staff Engineer"
+
+    report = sync(db, row("E1", job_title="Staff Engineer"))
+    assert report["deactivated"] == 1
+    db.expire_all()
+    assert users(db)["E2"].is_active is False and users(db)["E1"].is_active is True
+
+
+def test_returning_employee_is_reactivated(db):
+    sync(db, row("E1"), row("E2"))
+    sync(db, row("E1"))
+    report = sync(db, row("E1"), row("E2"))
+    assert report["updated"] == 1
+    db.expire_all()
+    assert users(db)["E2"].is_active is True
+
+
+def test_blank_is_active_means_active(db):
+    report = sync(db, row("E1", is_active=""), row("E2", is_active="false"))
+    assert report["failed"] == 0
+    assert users(db)["E1"].is_active is True and users(db)["E2"].is_active is False
+
+
+def test_bad_records_are_reported_not_applied(db):
+    report = sync(db, row("E1"), row("E2", is_active="maybe"), row("E1"))
+    assert report["inserted"] == 1
+    assert [error["record"] for error in report["errors"]] == [2, 3]
+
+
+def test_dry_run_writes_nothing(db):
+    report = sync(db, row("E1"), dry_run=True)
+    assert report["inserted"] == 1 and report["dry_run"] is True
+    assert users(db) == {}
@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+from app.models import Response
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_resume_after_the_last_row(client, db, make_question):
+    question = make_question()
+    # Server-default timestamps: several rows share one second, the response_id tiebreak orders them
+    db.add_all([Response(question_id=question.question_id, response_text=f"answer {i}") for i in range(5)])
+    db.commit()
+    rows = ndjson(client.get("/responses/export"))
+    assert len(rows) == 5
+    last = rows[1]
+    rest = ndjson(client.get("/responses/export", params={
+        "after_submitted_at": last["submitted_at"], "after_response_id": last["response_id"],
+    }))
+    assert [row["response_id"] for row in rest] == [row["response_id"] for row in rows[2:]]
+
+
+def test_filters_and_csv(client, db, make_user, make_question):
+    question, other = make_question(), make_question()
+    sales = make_user(department="Sales")
+    db.add_all([
+        Response(question_id=question.question_id, user_id=sales.user_id, response_text="from sales"),
+        Response(question_id=question.question_id, response_text="anonymous"),
+        Response(question_id=other.question_id, response_emoji=2),
+    ])
+    db.commit()
+    assert len(ndjson(client.get("/responses/export", params={"question_id": str(question.question_id)}))) == 2
+    [row] = ndjson(client.get("/responses/export", params={"department": "Sales"}))
+    assert (row["response_text"], row["department"]) == ("from sales", "Sales")
+
+    response = client.get("/responses/export", params={"format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 3 and {row["response_emoji"] for row in rows} == {"", "2"}
+
+
+def test_bad_requests(client):
+    assert client.get("/responses/export", params={"format": "xml"}).status_code == 400
+    assert client.get("/responses/export", params={"after_submitted_at": "2026-01-01T00:00:00"}).status_code == 400
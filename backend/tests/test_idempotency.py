@@ -0,0 +1,78 @@
+from sqlalchemy import func, select
+from app.models import Response
+from app.services.idempotency import idempotency_cache
+
+
+def answer(question, user=None, key="k1", text="fine"):
+    return {
+        "question_id": str(question.question_id), "user_id": str(user.user_id) if user else None,
+        "response_text": text, "idempotency_key": key,
+    }
+
+
+def count_responses(db):
+    return db.execute(select(func.count()).select_from(Response)).scalar()
+
+
+def test_replay_returns_the_first_result(client, db, make_question):
+    question = make_question()
+    first = client.post("/responses/", json=answer(question))
+    again = client.post("/responses/", json=answer(question))
+    assert first.status_code == again.status_code == 200
+    assert again.json()["response_id"] == first.json()["response_id"]
+    assert count_responses(db) == 1
+
+
+def test_replay_from_the_table_after_the_cache_is_gone(client, db, make_question):
+    question = make_question()
+    first = client.post("/responses/", json=answer(question)).json()
+    idempotency_cache.clear()
+    assert client.post("/responses/", json=answer(question)).json()["response_id"] == first["response_id"]
+    assert count_responses(db) == 1
+
+
+def test_same_key_with_another_answer_conflicts(client, db, make_question):
+    question = make_question()
+    client.post("/responses/", json=answer(question))
+    response = client.post("/responses/", json=answer(question, text="different"))
+    assert response.status_code == 422
+    assert count_responses(db) == 1
+
+
+def test_keys_are_scoped_per_user(client, db, make_question, make_user):
+    question = make_question()
+    alice, bob = make_user(), make_user()
+    first = client.post("/responses/", json=answer(question, alice)).json()
+    other = client.post("/responses/", json=answer(question, bob, text="different"))
+    assert other.status_code == 200
+    assert other.json()["response_id"] != first["response_id"]
+    assert count_responses(db) == 2
+
+
+def test_batch_duplicates_and_earlier_submissions(client, db, make_question):
+    question = make_question()
+    earlier = client.post("/responses/", json=answer(question, key="sent-before")).json()
+    batch = client.post("/responses/batch", json=[
+        answer(question, key="sent-before"),
+        answer(question, key="new"),
+        answer(question, key="new"),
+        answer(question, key="new", text="different"),
+    ]).json()
+    results = batch["results"]
+    assert batch["inserted"] == 1
+    assert [result["replayed"] for result in results] == [True, False, True, False]
+    assert results[0]["response_id"] == earlier["response_id"]
+    assert results[2]["response_id"] == results[1]["response_id"]
+    assert results[3]["error"]
+    assert count_responses(db) == 2
+
+
+def test_resent_batch_writes_nothing(client, db, make_question):
+    question = make_question()
+    items = [answer(question, key=f"k{i}") for i in range(5)]
+    first = client.post("/responses/batch", json=items).json()
+    again = client.post("/responses/batch", json=items).json()
+    assert first["inserted"] == 5
+    assert again["inserted"] == 0 and again["replayed"] == 5
+    assert [r["response_id"] for r in again["results"]] == [r["response_id"] for r in first["results"]]
+    assert count_responses(db) == 5
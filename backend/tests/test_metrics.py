@@ -0,0 +1,69 @@
+import re
+import time
+from app.services.metrics import Histogram, Registry, SamplingProfiler
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("work_seconds", "Work", ("kind",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, 'say "hi"')
+    assert histogram.render() == [
+        "# HELP work_seconds Work",
+        "# TYPE work_seconds histogram",
+        'work_seconds_bucket{kind="say \\"hi\\"",le="0.1"} 1',
+        'work_seconds_bucket{kind="say \\"hi\\"",le="1.0"} 3',
+        'work_seconds_bucket{kind="say \\"hi\\"",le="+Inf"} 4',
+        'work_seconds_sum{kind="say \\"hi\\""} 4.25',
+        'work_seconds_count{kind="say \\"hi\\""} 4',
+    ]
+
+
+def test_collectors_are_read_at_scrape_time():
+    registry, value = Registry(), [1]
+    registry.add_collector(lambda: [("queue_depth", "gauge", "Queued rows", [({"queue": "a"}, value[0]), ({}, 7)])])
+    value[0] = 5
+    assert registry.render().splitlines()[-2:] == ['queue_depth{queue="a"} 5', "queue_depth 7"]
+
+
+# Values of the `name` samples carrying all the given labels
+def sample(body, name, **labels):
+    values = []
+    for line in body.splitlines():
+        match = re.fullmatch(re.escape(name) + r"\{(.*)\} (\S+)", line)
+        if match and labels.items() <= dict(re.findall(r'(\w+)="([^"]*)"', match.group(1))).items():
+            values.append(float(match.group(2)))
+    return values
+
+
+def test_requests_are_labelled_by_route_template(client, make_question):
+    make_question()
+    labels = {"method": "GET", "route": "/questions/{question_type}", "status": "200"}
+    before = sum(sample(client.get("/metrics").text, "http_request_duration_seconds_count", **labels))
+    client.get("/questions/comment")
+    client.get("/questions/emoji")
+    client.get("/no/such/path")
+    scrape = client.get("/metrics")
+    assert scrape.headers["content-type"].startswith("text/plain")
+    assert sum(sample(scrape.text, "http_request_duration_seconds_count", **labels)) - before == 2
+    assert sample(scrape.text, "http_request_duration_seconds_count", route="unmatched", status="404")
+    assert sample(scrape.text, "db_query_duration_seconds_count", operation="SELECT")[0] > 0
+
+
+def test_profiler_routes_are_off_by_default(client):
+    assert client.get("/metrics/profile").status_code == 404
+    assert client.post("/metrics/profile/start").status_code == 404
+
+
+def busy_for_profiler(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_profiler_collects_collapsed_stacks():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy_for_profiler(0.2)
+    profiler.stop()
+    assert profiler.stats()["samples"] > 0 and not profiler.running
+    assert any("busy_for_profiler" in line for line in profiler.collapsed().splitlines())
@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from app.services import ml, ml_executor as executor_module
+from app.services.ml_executor import MLBusy, MLExecutor
+from app.services.question_index import QuestionIndex
+
+
+@pytest.fixture
+def executor():
+    # Threads stand in for the worker processes; everything around the pool is the real code
+    executor = MLExecutor(workers=1, max_pending=1)
+    executor._pool = ThreadPoolExecutor(2)
+    yield executor
+    executor.stop()
+
+
+@pytest.fixture
+def index():
+    index = QuestionIndex()
+    index.build([1, 2], ["deploy pipeline speed", "team morale"])
+    return index
+
+
+def test_disabled_executor_ranks_inline(index):
+    assert MLExecutor(workers=0).rank(index, ["the pipeline is slow"], 1)[0][0] == 1
+
+
+def test_identical_inputs_share_one_task(executor):
+    release = threading.Event()
+    first = executor.submit("key", release.wait)
+    assert executor.submit("key", release.wait) is first
+    with pytest.raises(MLBusy):
+        executor.submit("other", release.wait)
+    release.set()
+    first.result(1)
+    assert executor.stats()["coalesced"] == 1 and executor.stats()["rejected"] == 1
+
+
+def test_rank_falls_back_when_busy_slow_or_failing(executor, index, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(executor_module, "_worker_rank", lambda *args: release.wait(5))
+    assert executor.rank(index, ["pipeline"], 1, timeout=0.05) is None
+    # The slow task still holds the only slot
+    assert executor.rank(index, ["morale"], 1, timeout=0.05) is None
+    release.set()
+    deadline = time.monotonic() + 1
+    while executor.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    def broken(*args):
+        raise ValueError("worker crashed")
+    monkeypatch.setattr(executor_module, "_worker_rank", broken)
+    assert executor.rank(index, ["anything"], 1) is None
+    stats = executor.stats()
+    assert (stats["timeouts"], stats["rejected"], stats["failures"]) == (1, 1, 1)
+
+
+def test_broken_pool_is_replaced(executor):
+    pool = executor._pool
+
+    def die():
+        raise BrokenProcessPool("worker died")
+    with pytest.raises(BrokenProcessPool):
+        executor.submit(None, die).result(1)
+    assert executor._pool is None
+    pool.shutdown()
+
+
+def test_sentiment_falls_back_inline(executor, monkeypatch):
+    monkeypatch.setattr(ml, "analyze_sentiment", lambda text: "Neutral")
+    monkeypatch.setattr(executor_module, "_worker_sentiment", lambda texts: 1 / 0)
+    assert executor.sentiment_many(["a", "b"]) == ["Neutral", "Neutral"]
+    assert executor.stats()["failures"] == 1
+
+
+def test_slow_ranking_serves_the_default_order(db, make_user, make_question, monkeypatch):
+    easy, hard = make_question(text="Easy one?"), make_question(text="Hard one?")
+    hard.difficulty_level, easy.difficulty_level = 5, 1
+    db.commit()
+    user = make_user()
+    db.add(ml.Response(question_id=hard.question_id, user_id=user.user_id, response_text="hard one indeed"))
+    db.commit()
+    monkeypatch.setattr(ml.ml_executor, "rank", lambda *args: None)
+    assert [q.question_id for q in ml.get_ml_selected_questions(db, user.user_id, 2)] == [easy.question_id, hard.question_id]
+
+
+def test_worker_processes_rank_like_the_api_process(db, make_question, fresh_index):
+    from app.services.question_index import get_question_index
+
+    make_question(text="How is the deploy pipeline?")
+    make_question(text="How is team morale?")
+    index = get_question_index(db)
+    executor = MLExecutor(workers=1)
+    try:
+        ranked = executor.rank(index, ["pipeline keeps breaking"], 2, timeout=60)
+    finally:
+        executor.stop()
+    assert ranked == index.rank(["pipeline keeps breaking"], 2)
@@ -0,0 +1,53 @@
+from app.models import UserQuestionState
+from app.services.selection import MAX_DEFERS, WeightedCatalog, choose_question
+
+
+class RecordingRng:
+    def choices(self, population, weights, k):
+        self.population, self.weights = population, weights
+        return [population[0]]
+
+
+def test_next_returns_one_question_of_the_type(client, make_question):
+    comment = make_question()
+    make_question(question_type="emoji")
+    picked = client.get("/questions/comment/next").json()
+    assert picked["question_id"] == str(comment.question_id)
+    assert client.get("/questions/radio/next").status_code == 404
+
+
+def test_skipped_and_over_deferred_questions_are_not_offered(client, db, make_user, make_question):
+    user = make_user()
+    skipped, deferred, left = make_question(), make_question(), make_question()
+    db.add_all([
+        UserQuestionState(user_id=user.user_id, question_id=skipped.question_id, skipped=True, defer_count=0),
+        UserQuestionState(user_id=user.user_id, question_id=deferred.question_id, skipped=False, defer_count=MAX_DEFERS),
+    ])
+    db.commit()
+    for _ in range(10):
+        picked = client.get("/questions/comment/next", params={"user_id": str(user.user_id)}).json()
+        assert picked["question_id"] == str(left.question_id)
+
+    db.add(UserQuestionState(user_id=user.user_id, question_id=left.question_id, skipped=True, defer_count=0))
+    db.commit()
+    assert client.get("/questions/comment/next", params={"user_id": str(user.user_id)}).status_code == 404
+    # Without a user there is nothing to filter on
+    assert client.get("/questions/comment/next").status_code == 200
+
+
+def test_answered_questions_are_offered_less():
+    questions = [{"question_id": question_id} for question_id in ("a", "b", "c")]
+    rng = RecordingRng()
+    choose_question(questions, {"c"}, {"a": 1}, rng)
+    assert [question["question_id"] for question in rng.population] == ["a", "b"]
+    assert rng.weights == [0.25, 1.0]
+
+
+def test_weighted_catalog_matches_choose_question():
+    questions = [{"question_id": question_id} for question_id in ("a", "b", "c", "d")]
+    catalog = WeightedCatalog(questions, {"d": 0.5})
+    rng = RecordingRng()
+    catalog.choose({"c"}, {"a": 2, "unknown": 4}, rng)
+    assert rng.weights == [1 / 9, 1.0, 0.0, 0.5]
+    assert catalog.choose({"a", "b", "c", "d"}, {}, rng) is None
+    assert catalog.weights == [1.0, 1.0, 1.0, 0.5]
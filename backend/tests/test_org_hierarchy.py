@@ -0,0 +1,58 @@
+from app.models import OrgClosure, User
+from app.services.org_hierarchy import rebuild_org_closure, update_org_closure
+
+
+def ancestors(db, employee_id):
+    return {
+        row.ancestor_id: row.depth
+        for row in db.query(OrgClosure.ancestor_id, OrgClosure.depth).filter(OrgClosure.descendant_id == employee_id)
+    }
+
+
+def set_manager(db, employee_id, manager_id):
+    db.query(User).filter(User.employee_id == employee_id).update({"manager_id": manager_id})
+    db.commit()
+
+
+def org(make_user):
+    # CEO -> A -> B -> C, and CEO -> D
+    for employee_id, manager_id in (("A", "CEO"), ("B", "A"), ("C", "B"), ("D", "CEO")):
+        make_user(employee_id, manager_id=manager_id)
+
+
+def test_rebuild_links_every_ancestor(db, make_user):
+    org(make_user)
+    rebuild_org_closure(db)
+    assert ancestors(db, "C") == {"C": 0, "B": 1, "A": 2, "CEO": 3}
+
+
+def test_moving_a_manager_moves_their_subtree(db, make_user):
+    org(make_user)
+    rebuild_org_closure(db)
+    set_manager(db, "B", "D")
+    report = update_org_closure(db, ["B"])
+    assert report["moved"] == 1 and report["cycles"] == 0
+    assert ancestors(db, "B") == {"B": 0, "D": 1, "CEO": 2}
+    assert ancestors(db, "C") == {"C": 0, "B": 1, "D": 2, "CEO": 3}
+    assert "A" not in ancestors(db, "C")
+
+
+def test_incremental_matches_a_rebuild(db, make_user):
+    org(make_user)
+    rebuild_org_closure(db)
+    set_manager(db, "B", "D")
+    set_manager(db, "D", "A")
+    update_org_closure(db, ["B", "D"])
+    incremental = {(row.ancestor_id, row.descendant_id, row.depth) for row in db.query(OrgClosure)}
+    rebuild_org_closure(db)
+    assert {(row.ancestor_id, row.descendant_id, row.depth) for row in db.query(OrgClosure)} == incremental
+
+
+def test_cycle_is_rejected_and_the_old_manager_kept(db, make_user):
+    org(make_user)
+    rebuild_org_closure(db)
+    set_manager(db, "A", "C")  # C reports (indirectly) to A
+    report = update_org_closure(db, ["A"])
+    assert report["moved"] == 0 and report["cycles"] == 1
+    assert ancestors(db, "A") == {"A": 0, "CEO": 1}
+    assert ancestors(db, "C") == {"C": 0, "B": 1, "A": 2, "CEO": 3}
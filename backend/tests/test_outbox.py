@@ -0,0 +1,79 @@
+import pytest
+import requests
+from app.popup.outbox import Outbox, OutboxFlusher
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.text = str(body)
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+class FakeServer:
+    """Answers the batch endpoints: `status` for every call, or 422 for any batch holding a "bad" item."""
+
+    def __init__(self, status=200, item_errors=()):
+        self.status = status
+        self.item_errors = set(item_errors)
+        self.calls = []
+
+    def post(self, url, json, timeout):
+        self.calls.append(json)
+        if self.status != 200:
+            return FakeResponse(self.status, {"detail": "nope"})
+        if any(item.get("bad") for item in json):
+            return FakeResponse(422, {"detail": "invalid item"})
+        return FakeResponse(200, {"results": [
+            {"index": i, "error": "unknown question_id" if item["n"] in self.item_errors else None}
+            for i, item in enumerate(json)
+        ]})
+
+
+def flusher(server, *payloads):
+    outbox = Outbox(":memory:")
+    for payload in payloads:
+        outbox.put("response", payload)
+    return outbox, OutboxFlusher(outbox, server, "http://api", batch_size=10)
+
+
+def queued(outbox):
+    return [payload["n"] for _, payload in outbox.peek("response", 100)]
+
+
+@pytest.mark.parametrize("status", [500, 503, 404, 405, 408, 429])
+def test_unavailable_server_keeps_everything_queued(status):
+    outbox, flush = flusher(FakeServer(status), {"n": 1}, {"n": 2})
+    with pytest.raises(requests.HTTPError):
+        flush.flush_once()
+    assert queued(outbox) == [1, 2]
+    assert outbox.dead_letters() == []
+
+
+def test_accepted_batch_leaves_the_outbox():
+    outbox, flush = flusher(FakeServer(), {"n": 1}, {"n": 2})
+    assert flush.flush_once() == 2
+    assert queued(outbox) == []
+
+
+def test_rejected_batch_is_split_down_to_the_bad_entry():
+    server = FakeServer()
+    outbox, flush = flusher(server, *[{"n": n, "bad": n == 3} for n in range(1, 7)])
+    assert flush.flush_once() == 6
+    assert queued(outbox) == []
+    assert [(payload["n"], error.split()[0]) for _, _, payload, error in outbox.dead_letters()] == [(3, "422")]
+    assert len(server.calls) > 1
+
+
+def test_items_the_server_fails_go_to_dead_letters():
+    outbox, flush = flusher(FakeServer(item_errors={2}), {"n": 1}, {"n": 2}, {"n": 3})
+    flush.flush_once()
+    assert queued(outbox) == []
+    assert [(payload["n"], error) for _, _, payload, error in outbox.dead_letters()] == [(2, "unknown question_id")]
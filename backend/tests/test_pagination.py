@@ -0,0 +1,45 @@
+from app.models import Response
+
+
+def test_cursor_pages_cover_every_row_once(client, db, make_question):
+    question = make_question()
+    # Same submitted_at second for all: the response_id tiebreak keeps pages apart
+    db.add_all([Response(question_id=question.question_id, response_text=f"answer {i}") for i in range(25)])
+    db.commit()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 10, "order": "asc", **({"cursor": cursor} if cursor else {})}
+        page = client.get("/responses/", params=params).json()
+        seen += [item["response_id"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 25
+
+
+def test_cursor_replayed_with_other_filters_is_rejected(client, db, make_question):
+    question = make_question()
+    db.add_all([Response(question_id=question.question_id, response_text=f"answer {i}") for i in range(3)])
+    db.commit()
+    cursor = client.get("/responses/", params={"limit": 1}).json()["next_cursor"]
+    assert client.get("/responses/", params={"limit": 1, "cursor": cursor}).status_code == 200
+    other = client.get("/responses/", params={"limit": 1, "cursor": cursor, "question_id": str(question.question_id)})
+    assert other.status_code == 400
+    assert client.get("/responses/", params={"limit": 1, "cursor": cursor, "order": "asc"}).status_code == 400
+    assert client.get("/responses/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_fields_projection_and_declared_page_schema(client, make_question):
+    make_question(text="How was your week?")
+    page = client.get("/questions/", params={"fields": "question_id,question_text"}).json()
+    assert [set(item) for item in page["items"]] == [{"question_id", "question_text"}]
+    assert page["next_cursor"] is None
+    assert client.get("/questions/", params={"fields": "nope"}).status_code == 400
+
+    paths = client.get("/openapi.json").json()["paths"]
+    for path in ("/questions/", "/responses/"):
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema == {"$ref": "#/components/schemas/Page"}
@@ -0,0 +1,38 @@
+from datetime import date, datetime
+import pytest
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from app.services.partitions import BOUND_RE, PartitionJob, _arrow_type, add_months, archive_partitions, maintain_partitions
+
+
+@pytest.mark.parametrize("day, months, expected", [
+    (date(2026, 1, 31), 1, date(2026, 2, 1)),
+    (date(2026, 11, 15), 3, date(2027, 2, 1)),
+    (date(2026, 1, 1), -1, date(2025, 12, 1)),
+    (date(2026, 3, 1), -15, date(2024, 12, 1)),
+])
+def test_add_months_lands_on_the_first(day, months, expected):
+    assert add_months(day, months) == expected
+
+
+def test_bound_expression_parses():
+    bound = "FOR VALUES FROM ('2026-03-01 00:00:00') TO ('2026-04-01 00:00:00')"
+    lower, upper = BOUND_RE.search(bound).groups()
+    assert (datetime.fromisoformat(lower), datetime.fromisoformat(upper)) == (datetime(2026, 3, 1), datetime(2026, 4, 1))
+    assert BOUND_RE.search("DEFAULT") is None
+
+
+def test_unpartitioned_database_is_left_alone(db):
+    assert maintain_partitions(db) == {"partitioned": False}
+    assert archive_partitions(db, retention_months=0) == []
+    job = PartitionJob(interval=0)
+    assert not job.enabled
+    assert job.run_once(db) == {"partitioned": False}
+
+
+def test_archive_column_types():
+    pa = pytest.importorskip("pyarrow")
+    assert _arrow_type(Integer()) == pa.int64()
+    assert _arrow_type(DateTime()) == pa.timestamp("us")
+    assert _arrow_type(String()) == pa.string()
+    assert _arrow_type(UUID()) == pa.string()
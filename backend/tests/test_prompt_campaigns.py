@@ -0,0 +1,77 @@
+import random
+import time
+import pytest
+from app.database import SessionLocal, db_now
+from app.models import Response
+from app.services.prompt_scheduler import PromptScheduler, create_campaign
+
+
+class RecordingBroker:
+    def __init__(self, user_ids):
+        self.user_ids = list(user_ids)
+        self.events = []
+
+    def connected_users(self):
+        return list(self.user_ids)
+
+    def is_connected(self, user_id):
+        return user_id in self.user_ids
+
+    def send_many(self, events):
+        self.events.extend(events)
+
+    def broadcast(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def campaign_setup(db, make_user, make_question):
+    def setup(users=3, send_rate=1.0, department=None):
+        question = make_question()
+        people = [make_user() for _ in range(users)]
+        broker = RecordingBroker(user.user_id for user in people)
+        scheduler = PromptScheduler(broker, tick=0, session_factory=SessionLocal, rng=random.Random(0))
+        for user in people:
+            scheduler.register(user.user_id)
+        campaign = create_campaign(db, question.question_id, send_rate, department=department)
+        return scheduler, broker, campaign, people
+    return setup
+
+
+def test_rate_below_one_per_second_still_sends(db, campaign_setup):
+    scheduler, broker, campaign, _ = campaign_setup(send_rate=0.5)
+    start, db_time = time.monotonic(), db_now(db)
+    assert scheduler.send_campaigns(db, start, db_time) == 0
+    assert scheduler.send_campaigns(db, start + 1, db_time) == 0
+    assert scheduler.send_campaigns(db, start + 2.1, db_time) == 1
+    assert scheduler.send_campaigns(db, start + 2.2, db_time) == 0
+    assert scheduler.send_campaigns(db, start + 4.3, db_time) == 1
+    db.refresh(campaign)
+    assert campaign.sent_count == 2 and len(broker.events) == 2
+
+
+def test_at_most_one_seconds_worth_is_banked(db, campaign_setup):
+    scheduler, broker, _, _ = campaign_setup(users=5, send_rate=2.0)
+    start, db_time = time.monotonic(), db_now(db)
+    scheduler.send_campaigns(db, start, db_time)
+    assert scheduler.send_campaigns(db, start + 60, db_time) == 2
+
+
+def test_each_user_gets_the_campaign_once(db, campaign_setup):
+    scheduler, broker, campaign, people = campaign_setup(users=3, send_rate=100.0)
+    db.add(Response(question_id=campaign.question_id, user_id=people[0].user_id, response_text="done"))
+    db.commit()
+    start, db_time = time.monotonic(), db_now(db)
+    scheduler.send_campaigns(db, start, db_time)
+    assert scheduler.send_campaigns(db, start + 1, db_time) == 2
+    assert scheduler.send_campaigns(db, start + 2, db_time) == 0
+    assert {user_id for user_id, _ in broker.events} == {people[1].user_id, people[2].user_id}
+
+
+def test_stats_endpoint_shape(client):
+    stats = client.get("/prompts/stats").json()
+    assert set(stats) == {"connections", "users", "sent", "delivered", "dropped", "campaigns"}
+    assert set(stats["sent"]) == {"scheduled", "campaign"}
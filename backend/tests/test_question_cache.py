@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import event
+from app.database import engine
+from app.services.question_cache import etag_matches
+
+
+@pytest.fixture
+def queries():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_unchanged_copy_gets_304(client, make_question):
+    make_question()
+    first = client.get("/questions/comment")
+    assert first.status_code == 200 and len(first.json()) == 1
+    etag = first.headers["etag"]
+    again = client.get("/questions/comment", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    assert client.get("/questions/comment", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_cached_catalog_needs_no_queries(client, make_question, queries):
+    make_question()
+    client.get("/questions/comment")
+    queries.clear()
+    assert client.get("/questions/comment").status_code == 200
+    assert queries == []
+
+
+def test_writes_change_the_etag(client, make_question):
+    question = make_question()
+    etag = client.get("/questions/comment").headers["etag"]
+    body = {"question_text": "Edited?", "category": "Culture", "question_type": "comment", "difficulty_level": 2}
+    assert client.put(f"/questions/{question.question_id}", json=body).status_code == 200
+    edited = client.get("/questions/comment", headers={"If-None-Match": etag})
+    assert edited.status_code == 200 and edited.json()[0]["question_text"] == "Edited?"
+    assert client.post("/questions/", json={**body, "question_text": "New?"}).status_code == 200
+    assert len(client.get("/questions/comment").json()) == 2
+
+
+def test_etag_matches():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches('"a"', '"b"')
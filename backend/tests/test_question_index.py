@@ -0,0 +1,63 @@
+import importlib.util
+from app.services import question_index as index_module
+from app.services.question_index import QuestionIndex, catalog_digest
+
+
+def test_upsert_adds_and_replaces_questions():
+    index = QuestionIndex()
+    index.build([1, 2], ["team morale and culture", "deploy pipeline speed"])
+    index.upsert(3, "on-call rotation load")
+    assert index.rank(["my on-call rotation is exhausting"], 1)[0][0] == 3
+
+    version = index.version
+    index.upsert(1, "release tooling quality")
+    assert index.version > version
+    assert index.rank(["release tooling keeps breaking"], 1)[0][0] == 1
+    assert len(index) == 3
+    assert index.digest == catalog_digest([1, 2, 3], ["release tooling quality", "deploy pipeline speed", "on-call rotation load"])
+
+
+def test_rank_many_skips_histories_without_known_words():
+    index = QuestionIndex()
+    index.build([1, 2], ["team morale", "deploy pipeline"])
+    assert index.rank_many([["pipeline is slow"], ["zzz qqq"], []], 2)[1:] == [[], []]
+
+
+def test_index_built_outside_get_question_index_is_usable(db, make_question):
+    # A freshly imported copy of the module: no get_question_index call has happened in it yet
+    spec = importlib.util.spec_from_file_location("question_index_pristine", index_module.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    make_question(text="How is team morale?")
+    module.question_index.build_from_db(db)
+    assert module.get_question_index(db) is module.question_index
+
+
+def test_edits_by_another_worker_are_picked_up(db, make_question, fresh_index, monkeypatch):
+    question = make_question(text="How is team morale?")
+    index = index_module.get_question_index(db)
+    version = index.version
+    question.question_text = "Is the deploy pipeline fast enough?"
+    db.commit()
+
+    # Within the check interval the index is trusted as is
+    assert index_module.get_question_index(db).question_texts == ["How is team morale?"]
+    monkeypatch.setattr(index_module, "_checked_at", float("-inf"))
+    assert index_module.get_question_index(db).question_texts == ["Is the deploy pipeline fast enough?"]
+    assert index.version > version
+
+
+def test_saved_index_is_reused_only_while_it_matches_the_catalog(db, make_question, fresh_index, monkeypatch, tmp_path):
+    path = str(tmp_path / "index.joblib")
+    monkeypatch.setattr(index_module, "ML_INDEX_PATH", path)
+    make_question(text="How is team morale?")
+    saved = QuestionIndex()
+    saved.build_from_db(db)
+    saved.save(path)
+
+    assert index_module.get_question_index(db).digest == saved.digest
+
+    make_question(text="Is the deploy pipeline fast enough?")
+    monkeypatch.setattr(index_module, "question_index", QuestionIndex())
+    monkeypatch.setattr(index_module, "_checked_at", float("-inf"))
+    assert len(index_module.get_question_index(db)) == 2
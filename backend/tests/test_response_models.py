@@ -0,0 +1,42 @@
+from app.schemas import QuestionOut, ResponseOut, UserOut
+
+# Served as raw bodies on purpose (streams, Prometheus text, SSE, the profiler) or the health check
+UNTYPED = {
+    ("GET", "/"), ("GET", "/responses/export"), ("GET", "/metrics"), ("GET", "/metrics/profile"),
+    ("POST", "/metrics/profile/start"), ("POST", "/metrics/profile/stop"), ("GET", "/prompts/stream"),
+}
+
+
+def user_body(employee_id):
+    return {
+        "employee_id": employee_id, "full_name": "Ada", "ads_id": f"ads-{employee_id}", "manager_id": "CEO",
+        "manager_name": "Manager", "manager_email_hash": "hash", "department": "Engineering", "band": "Band 3",
+        "job_title": "Engineer", "is_active": True, "email_hash": f"hash-{employee_id}",
+    }
+
+
+def test_every_json_route_declares_its_schema(client):
+    paths = client.get("/openapi.json").json()["paths"]
+    missing = [
+        (method.upper(), path) for path, operations in paths.items() for method, operation in operations.items()
+        if (method.upper(), path) not in UNTYPED
+        and "schema" not in operation["responses"].get("200", {}).get("content", {}).get("application/json", {})
+    ]
+    assert missing == []
+
+
+def test_user_output_is_exactly_the_schema(client):
+    user = client.post("/users/", json=user_body("E1")).json()
+    assert set(user) == set(UserOut.model_fields)
+    assert "fingerprint" not in user
+
+
+def test_question_and_response_outputs(client, make_question):
+    question = make_question()
+    listed = client.get("/questions/comment").json()
+    assert [set(item) for item in listed] == [set(QuestionOut.model_fields)]
+    response = client.post("/responses/", json={
+        "question_id": str(question.question_id), "user_id": None, "response_emoji": 5,
+    }).json()
+    assert set(response) == set(ResponseOut.model_fields)
+    assert ResponseOut.model_validate(response).response_emoji == 5
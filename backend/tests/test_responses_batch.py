@@ -0,0 +1,45 @@
+import uuid
+from sqlalchemy import func, select
+from app.models import Response
+
+
+def item(question, user=None, **answer):
+    return {"question_id": str(question.question_id), "user_id": str(user.user_id) if user else None, **answer}
+
+
+def count_responses(db):
+    return db.execute(select(func.count()).select_from(Response)).scalar()
+
+
+def test_invalid_items_fail_alone(client, db, make_question, make_user):
+    question, user = make_question(), make_user()
+    body = [
+        item(question, user, response_text="good"),
+        item(question, user),
+        item(question, user, response_emoji=9),
+        {"question_id": str(uuid.uuid4()), "user_id": None, "response_text": "orphan"},
+        item(question, user, response_emoji=4),
+    ]
+    response = client.post("/responses/batch", json=body)
+    assert response.status_code == 200
+    out = response.json()
+    assert (out["inserted"], out["failed"], out["replayed"]) == (2, 3, 0)
+    assert [result["error"] for result in out["results"]] == [
+        None, "no answer given", "response_emoji must be between 1 and 5", "unknown question_id", None,
+    ]
+    assert out["results"][0]["response_id"] and out["results"][1]["response_id"] is None
+    assert count_responses(db) == 2
+
+
+def test_single_submit_still_rejects_a_missing_answer(client, db, make_question):
+    question = make_question()
+    assert client.post("/responses/", json=item(question)).status_code == 422
+    assert client.post("/responses/", json=item(question, response_emoji=0)).status_code == 422
+    assert count_responses(db) == 0
+
+
+def test_oversized_batch_is_rejected(client, make_question, monkeypatch):
+    from app.routes import responses
+    monkeypatch.setattr(responses, "MAX_BATCH_SIZE", 2)
+    question = make_question()
+    assert client.post("/responses/batch", json=[item(question, response_text="x")] * 3).status_code == 413
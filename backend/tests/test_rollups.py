@@ -0,0 +1,49 @@
+from datetime import timedelta
+from app.database import db_now
+from app.models import Response
+from app.services.rollups import query_insights, refresh_rollups
+
+
+def add_responses(db, question, submitted_at, emojis=(), texts=()):
+    rows = [Response(question_id=question.question_id, response_emoji=emoji, submitted_at=submitted_at) for emoji in emojis]
+    rows += [Response(question_id=question.question_id, response_text=text, submitted_at=submitted_at) for text in texts]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def totals(db):
+    groups = query_insights(db)
+    return groups[0] if groups else None
+
+
+def test_refresh_only_folds_in_new_responses(db, make_question):
+    question = make_question("emoji")
+    now = db_now(db)
+    add_responses(db, question, now - timedelta(hours=2), emojis=(5, 3))
+    assert refresh_rollups(db, lag_seconds=3600)["rows"] == 2
+
+    add_responses(db, question, now - timedelta(minutes=30), emojis=(1,))
+    assert refresh_rollups(db, lag_seconds=600)["rows"] == 1
+    # Nothing new: the same window isn't counted twice
+    assert refresh_rollups(db, lag_seconds=600)["rows"] == 0
+
+    result = totals(db)
+    assert result["responses"] == 3
+    assert result["emoji"]["histogram"] == {"1": 1, "2": 0, "3": 1, "4": 0, "5": 1}
+    assert result["emoji"]["average"] == 3.0
+
+
+def test_sentiment_scored_after_the_rollup_is_counted_once(db, make_question):
+    question = make_question()
+    now = db_now(db)
+    late, = add_responses(db, question, now - timedelta(hours=2), texts=("great week",))
+    refresh_rollups(db, lag_seconds=600)
+    assert totals(db)["sentiment"] == {"Positive": 0, "Neutral": 0, "Negative": 0}
+
+    late.sentiment, late.sentiment_scored_at = "Positive", now - timedelta(minutes=5)
+    db.commit()
+    assert refresh_rollups(db, lag_seconds=0)["scored"] == 1
+    refresh_rollups(db, lag_seconds=-60)
+    assert totals(db)["responses"] == 1
+    assert totals(db)["sentiment"]["Positive"] == 1
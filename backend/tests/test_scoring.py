@@ -0,0 +1,57 @@
+from datetime import timedelta
+import pytest
+from app.database import db_now
+from app.models import MLQuestionScore, MLUserWatermark, Response
+from app.services.scoring import get_top_questions, run_batch_scoring, users_needing_scores
+
+pytestmark = pytest.mark.usefixtures("fresh_index")
+
+
+def answer(db, question, user, text, minutes_ago):
+    db.add(Response(
+        question_id=question.question_id, user_id=user.user_id, response_text=text,
+        submitted_at=db_now(db) - timedelta(minutes=minutes_ago),
+    ))
+    db.commit()
+
+
+def test_rows_inside_the_lag_wait_for_a_later_run(db, make_user, make_question):
+    question, user = make_question(text="How is the deploy pipeline?"), make_user()
+    answer(db, question, user, "the deploy pipeline is slow", minutes_ago=1)
+    assert run_batch_scoring(db, lag_seconds=300)["users_scored"] == 0
+    assert run_batch_scoring(db, lag_seconds=30)["users_scored"] == 1
+    watermark = db.get(MLUserWatermark, user.user_id).scored_at
+    assert watermark <= db_now(db) - timedelta(seconds=30)
+
+
+def test_runs_only_pick_up_new_feedback(db, make_user, make_question):
+    question = make_question(text="How is the deploy pipeline?")
+    early, late = make_user(), make_user()
+    answer(db, question, early, "pipeline is slow", minutes_ago=60)
+    assert run_batch_scoring(db, lag_seconds=600)["users_scored"] == 1
+    assert run_batch_scoring(db, lag_seconds=600)["users_scored"] == 0
+
+    answer(db, question, early, "pipeline still slow", minutes_ago=5)
+    # Older than every watermark, but never scored: found from the users side
+    answer(db, question, late, "pipeline flaky", minutes_ago=120)
+    assert set(users_needing_scores(db, db_now(db))) == {early.user_id, late.user_id}
+
+
+def test_inactive_users_are_skipped(db, make_user, make_question):
+    question, user = make_question(), make_user(is_active=False)
+    answer(db, question, user, "week was fine", minutes_ago=60)
+    assert users_needing_scores(db, db_now(db)) == []
+
+
+def test_top_questions_come_from_the_stored_ranking(db, make_user, make_question):
+    pipeline = make_question(text="How is the deploy pipeline?")
+    morale = make_question(text="How is team morale?")
+    user, quiet = make_user(), make_user()
+    answer(db, pipeline, user, "deploy pipeline keeps failing", minutes_ago=60)
+    answer(db, pipeline, quiet, "zzz", minutes_ago=60)
+    run_batch_scoring(db, lag_seconds=0)
+
+    assert db.query(MLQuestionScore).filter(MLQuestionScore.user_id == user.user_id).count() >= 1
+    assert get_top_questions(db, user.user_id, k=1)[0].question_id == pipeline.question_id
+    # Scored without any overlap: the difficulty-ordered default rather than an inline ranking
+    assert {q.question_id for q in get_top_questions(db, quiet.user_id, k=2)} == {pipeline.question_id, morale.question_id}
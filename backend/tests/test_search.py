@@ -0,0 +1,56 @@
+import pytest
+from app.models import Response
+from app.schemas import SearchPage
+from app.services.search import fts5_query
+
+
+@pytest.mark.parametrize("q, expected", [
+    ("outage", '"outage"'),
+    ("devops pipeline", '"devops" "pipeline"'),
+    ('"release tooling"', '"release tooling"'),
+    ("latency -customer", '"latency" NOT "customer"'),
+    ('latency -"customer success"', '"latency" NOT "customer success"'),
+    ("great OR love", '"great" OR "love"'),
+    ("OR great OR", '"great"'),
+    ('say"hi', '"say""hi"'),
+    ("-customer", None),
+    ("OR", None),
+    ('""', None),
+])
+def test_fts5_query(q, expected):
+    assert fts5_query(q) == expected
+
+
+def test_search_finds_and_excludes(client, db, make_question):
+    question = make_question()
+    rows = {text: Response(question_id=question.question_id, response_text=text) for text in (
+        "The outage hurt customers", "Another outage, internal only", "Great release tooling",
+    )}
+    db.add_all(rows.values())
+    db.commit()
+    texts = {str(row.response_id): text for text, row in rows.items()}
+
+    def search(q):
+        page = client.get("/responses/search", params={"q": q}).json()
+        return sorted(texts[item["response_id"]] for item in page["items"])
+
+    assert search("outage") == ["Another outage, internal only", "The outage hurt customers"]
+    assert search("outage -customers") == ["Another outage, internal only"]
+    assert search('"release tooling"') == ["Great release tooling"]
+    assert search("-outage") == []
+
+
+def test_pages_match_the_declared_schema(client, db, make_question):
+    question = make_question()
+    db.add_all([Response(question_id=question.question_id, response_text=f"outage number {i}") for i in range(3)])
+    db.commit()
+    first = SearchPage.model_validate(client.get("/responses/search", params={"q": "outage", "limit": 2}).json())
+    assert first.total == 3 and len(first.items) == 2
+    assert first.facets["question"][0].value == str(question.question_id)
+    assert first.facets["question"][0].question_text == question.question_text
+    assert "<mark>" in first.items[0].snippet
+
+    rest = client.get("/responses/search", params={"q": "outage", "limit": 2, "cursor": first.next_cursor}).json()
+    rest = SearchPage.model_validate(rest)
+    assert rest.total is None and rest.facets is None and rest.next_cursor is None
+    assert {item.response_id for item in first.items + rest.items} == {row.response_id for row in db.query(Response)}
@@ -0,0 +1,66 @@
+import uuid
+import pytest
+from app import crud
+from app.database import SessionLocal
+from app.models import Response
+from app.services import sentiment_worker as worker_module
+from app.services.sentiment_worker import SentimentWorker, text_key
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    calls = []
+
+    def sentiment_many(texts):
+        calls.append(list(texts))
+        return ["Positive" if "good" in text.lower() else "Negative" for text in texts]
+    monkeypatch.setattr(worker_module.ml_executor, "sentiment_many", sentiment_many)
+    return calls
+
+
+def test_text_key_ignores_case_and_spacing():
+    assert text_key("  Pretty   GOOD week ") == text_key("pretty good week")
+    assert text_key("good") != text_key("not good")
+
+
+def test_repeated_answers_are_scored_once(scored):
+    worker = SentimentWorker(session_factory=SessionLocal)
+    assert worker.score_many(["Good", "good ", "bad", "good"]) == ["Positive", "Positive", "Negative", "Positive"]
+    assert scored == [["Good", "bad"]]
+    assert worker.score("GOOD") == "Positive"
+    assert len(scored) == 1 and worker.cache_hits == 3
+
+
+def test_cache_is_bounded(scored):
+    worker = SentimentWorker(session_factory=SessionLocal, cache_size=2)
+    worker.score_many(["a", "b", "c"])
+    assert len(worker.cache) == 2 and text_key("a") not in worker.cache
+
+
+def test_submissions_are_labelled_by_the_worker_thread(client, db, make_question, scored, monkeypatch):
+    worker = SentimentWorker(session_factory=SessionLocal, flush_seconds=0.05)
+    monkeypatch.setattr(crud, "sentiment_worker", worker)
+    question = make_question()
+    good = client.post("/responses/", json={"question_id": str(question.question_id), "user_id": None, "response_text": "good"})
+    emoji = client.post("/responses/", json={"question_id": str(question.question_id), "user_id": None, "response_emoji": 3})
+    assert worker.queue.qsize() == 1
+    worker.start()
+    worker.stop()
+    db.expire_all()
+    assert db.get(Response, uuid.UUID(good.json()["response_id"])).sentiment == "Positive"
+    assert db.get(Response, uuid.UUID(emoji.json()["response_id"])).sentiment is None
+    assert worker.stats()["rows_scored"] == 1 and worker.stats()["queue_depth"] == 0
+
+
+def test_backfill_streams_unscored_rows(db, make_question, scored):
+    question = make_question()
+    db.add_all(
+        [Response(question_id=question.question_id, response_text=f"good {i}") for i in range(5)]
+        + [Response(question_id=question.question_id, response_text="awful", sentiment="Negative"),
+           Response(question_id=question.question_id, response_emoji=4)]
+    )
+    db.commit()
+    worker = SentimentWorker(session_factory=SessionLocal)
+    assert worker.backfill(chunk_size=2)["rows"] == 5
+    assert db.query(Response).filter(Response.sentiment == "Positive").count() == 5
+    assert worker.backfill(chunk_size=2)["rows"] == 0
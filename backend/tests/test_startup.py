@@ -0,0 +1,44 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from app.services import ml
+
+IMPORT_CHECK = """
+import sys
+import app.main
+from sqlalchemy import inspect
+from app.database import engine
+print(sorted(name for name in ("nltk", "sklearn") if name in sys.modules), inspect(engine).get_table_names())
+"""
+
+
+def test_importing_the_app_loads_no_ml_and_creates_no_tables(tmp_path):
+    env = {"DATABASE_URL": f"sqlite:///{tmp_path / 'cold.db'}", "PATH": ""}
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_CHECK], env=env, cwd=Path(__file__).parents[1], capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "[] []"
+
+
+@pytest.fixture
+def no_lexicon(monkeypatch, tmp_path):
+    nltk = pytest.importorskip("nltk")
+    downloads = []
+    monkeypatch.setattr(nltk.data, "path", [])
+    monkeypatch.setattr(nltk, "download", lambda *args, **kwargs: downloads.append(kwargs))
+    monkeypatch.setattr(ml, "NLTK_DATA_DIR", str(tmp_path))
+    return downloads
+
+
+def test_missing_lexicon_fails_without_touching_the_network(no_lexicon):
+    with pytest.raises(LookupError):
+        ml._load_sentiment_analyzer()
+    assert no_lexicon == []
+
+
+def test_download_only_when_allowed_and_into_the_data_dir(no_lexicon, monkeypatch, tmp_path):
+    monkeypatch.setattr(ml, "NLTK_ALLOW_DOWNLOAD", True)
+    with pytest.raises(LookupError):
+        ml._load_sentiment_analyzer()
+    assert no_lexicon == [{"download_dir": str(tmp_path), "quiet": True}]
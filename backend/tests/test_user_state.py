@@ -0,0 +1,86 @@
+import uuid
+import pytest
+from app.database import SessionLocal, engine
+from app.models import UserQuestionState
+from app.services import user_state
+from app.services.user_state import StateWriteBuffer
+
+
+def state(db, user, question):
+    db.expire_all()
+    return db.get(UserQuestionState, (user.user_id, question.question_id))
+
+
+def body(user, question, action):
+    return {"user_id": str(user.user_id), "question_id": str(question.question_id), "action": action}
+
+
+def test_single_update_counts_defers_and_keeps_skip(client, db, make_user, make_question):
+    user, question = make_user(), make_question()
+    for action in ("defer", "defer", "skip", "defer"):
+        assert client.post("/responses/update_state", json=body(user, question, action)).status_code == 200
+    row = state(db, user, question)
+    assert (row.defer_count, row.skipped) == (3, True)
+
+
+def test_single_update_with_unknown_ids_is_404(client, db, make_user, make_question):
+    user, question = make_user(), make_question()
+    unknown = {"user_id": str(uuid.uuid4()), "question_id": str(question.question_id), "action": "skip"}
+    assert client.post("/responses/update_state", json=unknown).status_code == 404
+    unknown = {"user_id": str(user.user_id), "question_id": str(uuid.uuid4()), "action": "skip"}
+    assert client.post("/responses/update_state", json=unknown).status_code == 404
+    assert client.post("/responses/update_state", json=body(user, question, "nope")).status_code == 400
+    assert db.query(UserQuestionState).count() == 0
+
+
+def test_async_update_with_unknown_ids_is_404(async_client, db, make_user, make_question):
+    user, question = make_user(), make_question()
+    unknown = {"user_id": str(uuid.uuid4()), "question_id": str(question.question_id), "action": "skip"}
+    assert async_client.post("/responses/update_state", json=unknown).status_code == 404
+    assert async_client.post("/responses/update_state", json=body(user, question, "skip")).status_code == 200
+    assert state(db, user, question).skipped is True
+
+
+def test_batch_merges_repeats_and_ignores_unknown_ids(client, db, make_user, make_question):
+    user, question = make_user(), make_question()
+    stale = {"user_id": str(uuid.uuid4()), "question_id": str(question.question_id), "action": "defer"}
+    out = client.post("/responses/update_state/batch", json=[body(user, question, "defer")] * 3 + [stale]).json()
+    assert (out["updated"], out["ignored"]) == (3, 1)
+    assert state(db, user, question).defer_count == 3
+
+
+def test_write_behind_buffers_until_flush(client, db, make_user, make_question, monkeypatch):
+    buffer = StateWriteBuffer(session_factory=SessionLocal)
+    monkeypatch.setattr(user_state, "STATE_WRITE_BEHIND", True)
+    monkeypatch.setattr(user_state, "state_buffer", buffer)
+    user, question = make_user(), make_question()
+    client.post("/responses/update_state", json=body(user, question, "defer"))
+    client.post("/responses/update_state/batch", json=[body(user, question, "defer"), body(user, question, "skip")])
+    assert state(db, user, question) is None
+    assert buffer.flush() == 1
+    row = state(db, user, question)
+    assert (row.defer_count, row.skipped) == (2, True)
+    assert buffer.flush() == 0
+
+
+class FailingSession:
+    def get_bind(self):
+        return engine
+
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("database is down")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_failed_flush_keeps_the_changes():
+    buffer = StateWriteBuffer(session_factory=FailingSession)
+    buffer.record("u1", "q1", "defer")
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    buffer.record("u1", "q1", "defer")
+    assert buffer.pending[("u1", "q1")]["defer_count"] == 2
@@ -0,0 +1,120 @@
+-- Optional storage layout: range-partition responses by submitted_at month
+-- Run once after schema.sql (existing rows are moved over):
+--   psql -d pulsebot -f partitioning.sql
+-- Future partitions and archival are then handled by backend/app/services/partitions.py.
+-- The application keeps using the same table name and columns, nothing else changes.
+
+BEGIN;
+
+-- Creates the missing monthly partitions covering [from_month, to_month); returns how many were added.
+-- Partitions are named responses_pYYYY_MM. Rows of that month already sitting in responses_default
+-- (which would make the CREATE fail) are moved into the new partition first.
+CREATE OR REPLACE FUNCTION create_response_partitions(from_month DATE, to_month DATE) RETURNS INT AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_month);
+    month_end DATE;
+    created INT := 0;
+    partition_name TEXT;
+    stray BOOLEAN;
+    moved INT;
+    columns TEXT;
+BEGIN
+    -- Every stored column; the generated search vector is recomputed on insert
+    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO columns
+    FROM pg_attribute
+    WHERE attrelid = 'responses'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+    WHILE month_start < to_month LOOP
+        partition_name := format('responses_p%s', to_char(month_start, 'YYYY_MM'));
+        month_end := (month_start + INTERVAL '1 month')::DATE;
+        IF to_regclass(partition_name) IS NULL THEN
+            stray := FALSE;
+            IF to_regclass('responses_default') IS NOT NULL THEN
+                EXECUTE 'SELECT EXISTS (SELECT 1 FROM responses_default WHERE submitted_at >= $1 AND submitted_at < $2)'
+                    INTO stray USING month_start, month_end;
+            END IF;
+            IF stray THEN
+                ALTER TABLE responses DETACH PARTITION responses_default;
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF responses FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_end
+            );
+            IF stray THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM responses_default WHERE submitted_at >= $1 AND submitted_at < $2 RETURNING *) '
+                    'INSERT INTO responses (%s) SELECT %s FROM moved', columns, columns
+                ) USING month_start, month_end;
+                GET DIAGNOSTICS moved = ROW_COUNT;
+                ALTER TABLE responses ATTACH PARTITION responses_default DEFAULT;
+                RAISE WARNING 'moved % rows from responses_default into %', moved, partition_name;
+            END IF;
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE responses RENAME TO responses_unpartitioned;
+ALTER TABLE responses_unpartitioned RENAME CONSTRAINT responses_pkey TO responses_unpartitioned_pkey;
+ALTER INDEX idx_responses_user RENAME TO idx_responses_unpartitioned_user;
+ALTER INDEX idx_responses_question RENAME TO idx_responses_unpartitioned_question;
+ALTER INDEX idx_responses_submitted_at RENAME TO idx_responses_unpartitioned_submitted_at;
+ALTER INDEX idx_responses_search RENAME TO idx_responses_unpartitioned_search;
+ALTER INDEX idx_responses_sentiment_scored_at RENAME TO idx_responses_unpartitioned_sentiment_scored_at;
+
+-- The partition key has to be part of the primary key; response_id stays unique in practice (UUIDs),
+-- and nothing references responses by foreign key
+CREATE TABLE responses (
+    response_id UUID NOT NULL DEFAULT gen_random_uuid(),
+    question_id UUID REFERENCES questions(question_id) ON DELETE CASCADE,
+    user_id UUID REFERENCES users(user_id) ON DELETE SET NULL,
+
+    response_text TEXT,
+    response_emoji INT CHECK (response_emoji BETWEEN 1 AND 5),
+    response_radio TEXT,
+
+    sentiment TEXT CHECK (sentiment IN ('Positive', 'Neutral', 'Negative')),
+    submitted_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    sentiment_scored_at TIMESTAMP,
+    defer_count INT DEFAULT 0,
+    skipped BOOLEAN DEFAULT FALSE,
+    search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', COALESCE(response_text, ''))) STORED,
+    PRIMARY KEY (response_id, submitted_at)
+) PARTITION BY RANGE (submitted_at);
+
+-- Catches rows outside every monthly partition (e.g. clock skew) instead of failing the insert
+CREATE TABLE responses_default PARTITION OF responses DEFAULT;
+
+-- Declared on the parent, so every partition gets its own copy.
+-- Responses arrive in submitted_at order, so a BRIN index answers time-window scans (rollups,
+-- insights backfills) at a tiny fraction of a btree's size; the btree on (submitted_at, response_id)
+-- serves the keyset-ordered readers (export, comment clustering, GET /responses/), which the
+-- per-user and per-question indexes end in as well
+CREATE INDEX idx_responses_user ON responses(user_id, submitted_at, response_id);
+CREATE INDEX idx_responses_question ON responses(question_id, submitted_at, response_id);
+CREATE INDEX idx_responses_submitted_at ON responses(submitted_at, response_id);
+CREATE INDEX idx_responses_search ON responses USING GIN (search_vector);
+CREATE INDEX idx_responses_sentiment_scored_at ON responses(sentiment_scored_at);
+CREATE INDEX idx_responses_submitted_brin ON responses USING BRIN (submitted_at) WITH (pages_per_range = 32);
+
+SELECT create_response_partitions(
+    COALESCE((SELECT min(submitted_at) FROM responses_unpartitioned), NOW())::DATE,
+    (date_trunc('month', NOW()) + INTERVAL '4 months')::DATE
+);
+
+INSERT INTO responses (
+    response_id, question_id, user_id, response_text, response_emoji, response_radio,
+    sentiment, submitted_at, sentiment_scored_at, defer_count, skipped
+)
+SELECT
+    response_id, question_id, user_id, response_text, response_emoji, response_radio,
+    sentiment, COALESCE(submitted_at, NOW()), sentiment_scored_at, defer_count, skipped
+FROM responses_unpartitioned;
+
+DROP TABLE responses_unpartitioned;
+
+COMMIT;
+
+ANALYZE responses;
@@ -1,5 +1,5 @@
 -- Drop tables if they exist to avoid conflicts
-DROP TABLE IF EXISTS users, questions, responses, ml_question_scores CASCADE;
+DROP TABLE IF EXISTS users, questions, responses, user_question_state, ml_question_scores, ml_user_watermarks, response_rollups, response_radio_rollups, org_closure, comment_clusters, comment_cluster_members, prompt_campaigns, prompt_campaign_deliveries, response_idempotency, job_watermarks CASCADE;
 
 -- Users Table (Anonymized & Secure)
 CREATE TABLE users (
@@ -15,7 +15,8 @@ CREATE TABLE users (
     job_title TEXT NOT NULL,
     is_active BOOLEAN DEFAULT TRUE,  -- Indicates if user is currently active
     email_hash TEXT UNIQUE NOT NULL,  -- Hashed for anonymity
-    created_at TIMESTAMP DEFAULT NOW()
+    created_at TIMESTAMP DEFAULT NOW(),
+    fingerprint TEXT  -- Hash of the directory fields, maintained by /users/sync
 );
 
 -- Questions Table (Categorized & Adaptive)
@@ -40,13 +41,22 @@ CREATE TABLE responses (
 
     sentiment TEXT CHECK (sentiment IN ('Positive', 'Neutral', 'Negative')),  
     submitted_at TIMESTAMP DEFAULT NOW(),
+    sentiment_scored_at TIMESTAMP,  -- set with sentiment; the rollups fold labels in by this time
     defer_count INT DEFAULT 0,
-	skipped BOOLEAN DEFAULT FALSE;
+	skipped BOOLEAN DEFAULT FALSE,
+    -- Full-text search (/responses/search); kept current by Postgres on every insert and update
+    search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', COALESCE(response_text, ''))) STORED
 );
 
-ALTER TABLE responses 
-ADD COLUMN defer_count INT DEFAULT 0,
-ADD COLUMN skipped BOOLEAN DEFAULT FALSE;
+-- Per-user Question State (defer/skip, one row per user and question)
+CREATE TABLE user_question_state (
+    user_id UUID REFERENCES users(user_id) ON DELETE CASCADE,
+    question_id UUID REFERENCES questions(question_id) ON DELETE CASCADE,
+    defer_count INT NOT NULL DEFAULT 0,
+    skipped BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (user_id, question_id) INCLUDE (defer_count, skipped)  -- covers the selection lookups
+);
 
 -- ML Scores Table (Ranking Questions per User)
 CREATE TABLE ml_question_scores (
@@ -57,11 +67,128 @@ CREATE TABLE ml_question_scores (
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Last Batch Scoring Run per User (also for users whose feedback matched no question)
+CREATE TABLE ml_user_watermarks (
+    user_id UUID PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    scored_at TIMESTAMP NOT NULL
+);
+
+-- Daily Response Rollups (per question, department, band and direct manager)
+CREATE TABLE response_rollups (
+    day DATE NOT NULL,
+    question_id UUID REFERENCES questions(question_id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    department TEXT NOT NULL,  -- '' for anonymous responses
+    band TEXT NOT NULL,
+    manager_id TEXT NOT NULL,
+    response_count INT NOT NULL DEFAULT 0,
+    emoji_count INT NOT NULL DEFAULT 0,
+    emoji_sum INT NOT NULL DEFAULT 0,
+    emoji_1 INT NOT NULL DEFAULT 0,
+    emoji_2 INT NOT NULL DEFAULT 0,
+    emoji_3 INT NOT NULL DEFAULT 0,
+    emoji_4 INT NOT NULL DEFAULT 0,
+    emoji_5 INT NOT NULL DEFAULT 0,
+    sentiment_positive INT NOT NULL DEFAULT 0,
+    sentiment_neutral INT NOT NULL DEFAULT 0,
+    sentiment_negative INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, question_id, category, department, band, manager_id)
+);
+
+-- Radio Option Tallies (same keys as response_rollups plus the option)
+CREATE TABLE response_radio_rollups (
+    day DATE NOT NULL,
+    question_id UUID REFERENCES questions(question_id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    department TEXT NOT NULL,
+    band TEXT NOT NULL,
+    manager_id TEXT NOT NULL,
+    option TEXT NOT NULL,
+    response_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, question_id, category, department, band, manager_id, option)
+);
+
+-- Manager Hierarchy Closure (every ancestor/descendant pair of employee ids; depth 0 = self)
+CREATE TABLE org_closure (
+    ancestor_id TEXT NOT NULL,
+    descendant_id TEXT NOT NULL,
+    depth INT NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+-- Comment Clusters (MinHash LSH over comment responses, one set per question)
+CREATE TABLE comment_clusters (
+    cluster_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    question_id UUID NOT NULL REFERENCES questions(question_id) ON DELETE CASCADE,
+    representative_id UUID NOT NULL,  -- Response that founded the cluster
+    representative_text TEXT NOT NULL,
+    signature BYTEA NOT NULL,  -- MinHash signature of the representative (uint32 little-endian)
+    size INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Cluster Membership (response ids are not foreign keys: written in bulk, survive archiving)
+CREATE TABLE comment_cluster_members (
+    response_id UUID PRIMARY KEY,
+    cluster_id UUID NOT NULL REFERENCES comment_clusters(cluster_id) ON DELETE CASCADE,
+    similarity FLOAT NOT NULL  -- Estimated Jaccard similarity to the representative
+);
+
+-- Pulse Campaigns (one question pushed to connected users at a controlled rate)
+CREATE TABLE prompt_campaigns (
+    campaign_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    question_id UUID NOT NULL REFERENCES questions(question_id) ON DELETE CASCADE,
+    department TEXT,  -- NULL: everyone
+    send_rate FLOAT NOT NULL CHECK (send_rate > 0),  -- Prompts per second (per API process)
+    status TEXT NOT NULL DEFAULT 'active' CHECK (status IN ('active', 'stopped')),
+    sent_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW(),
+    ends_at TIMESTAMP NOT NULL
+);
+
+-- Campaign Deliveries (one row per user reached; claimed before the push)
+CREATE TABLE prompt_campaign_deliveries (
+    campaign_id UUID REFERENCES prompt_campaigns(campaign_id) ON DELETE CASCADE,
+    user_id UUID REFERENCES users(user_id) ON DELETE CASCADE,
+    delivered_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (campaign_id, user_id)
+);
+
+-- Idempotency Keys for Submitted Responses (a retried submission replays the stored result)
+CREATE TABLE response_idempotency (
+    idempotency_key TEXT PRIMARY KEY,  -- "<user_id>:<client key>" ("anonymous:..." without a user)
+    fingerprint TEXT NOT NULL,  -- hash of the submitted answer
+    response TEXT NOT NULL,  -- ResponseOut JSON first returned for the key
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- High-water Marks for Incremental Jobs
+CREATE TABLE job_watermarks (
+    job_name TEXT PRIMARY KEY,
+    watermark TIMESTAMP NOT NULL
+);
+
 -- Indexes for Optimized Query Performance
-CREATE INDEX idx_questions_category ON questions(category);
-CREATE INDEX idx_responses_user ON responses(user_id);
-CREATE INDEX idx_responses_question ON responses(question_id);
-CREATE INDEX idx_ml_scores ON ml_question_scores(user_id, question_id);
+-- Keyset pagination: filter column(s) first, then the listing's sort key
+CREATE INDEX idx_questions_category ON questions(category, difficulty_level, question_id);
+CREATE INDEX idx_questions_type ON questions(question_type, difficulty_level, question_id);
+CREATE INDEX idx_questions_difficulty ON questions(difficulty_level, question_id);
+CREATE INDEX idx_responses_user ON responses(user_id, submitted_at, response_id);
+CREATE INDEX idx_responses_question ON responses(question_id, submitted_at, response_id);
+CREATE INDEX idx_responses_submitted_at ON responses(submitted_at, response_id);
+CREATE INDEX idx_responses_search ON responses USING GIN (search_vector);
+CREATE INDEX idx_responses_sentiment_scored_at ON responses(sentiment_scored_at);
+CREATE INDEX idx_response_rollups_question ON response_rollups(question_id, day);
+CREATE INDEX idx_response_rollups_department ON response_rollups(department, day);
+CREATE INDEX idx_response_rollups_manager ON response_rollups(manager_id, day);
+CREATE INDEX idx_response_radio_rollups_manager ON response_radio_rollups(manager_id, day);
+CREATE INDEX idx_org_closure_descendant ON org_closure(descendant_id, depth);
+CREATE INDEX idx_response_idempotency_created_at ON response_idempotency(created_at);
+CREATE INDEX idx_comment_clusters_question ON comment_clusters(question_id, size);
+CREATE INDEX idx_comment_cluster_members_cluster ON comment_cluster_members(cluster_id, similarity);
+CREATE INDEX idx_prompt_campaigns_active ON prompt_campaigns(status, ends_at);
+CREATE UNIQUE INDEX idx_ml_scores ON ml_question_scores(user_id, question_id);
+CREATE INDEX idx_ml_scores_rank ON ml_question_scores(user_id, relevance_score DESC);
 
 -- ===========================
 -- Insert Sample Data